@@ -0,0 +1,47 @@
+"""Drugs co-mentioned with a drug in the same journals.
+
+Reads the edges persisted by the DAG and answers, for each drug given by
+atccode or name, which other drugs appear in the same journals (PubMed
+mentions only unless ``--include-clinical``). Usage::
+
+    python Other_questions/comentions.py Diphenhydramine
+    python Other_questions/comentions.py A04AD --top 5 --include-clinical
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add repo root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.medmentions.comentions import CoMentionIndex  # noqa: E402
+from src.medmentions.intermediary_io import load_df  # noqa: E402
+
+# Paths relative to this script: ../data/intermediary/
+INTER_DIR = Path(__file__).resolve().parent.parent / "data" / "intermediary"
+INTER_FORMAT = os.environ.get("PIPELINE_INTER_FORMAT", "parquet")
+MENTIONS_INTER = INTER_DIR / f"mentions_edges.{INTER_FORMAT}"
+
+EDGE_COLUMNS = ["drug_atccode", "drug_name", "source_type", "journal"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("drugs", nargs="+", help="atccodes or drug names")
+    parser.add_argument("--top", type=int, default=None, help="only the k most co-mentioned")
+    parser.add_argument("--include-clinical", action="store_true")
+    parser.add_argument("--edges", type=Path, default=MENTIONS_INTER)
+    args = parser.parse_args()
+
+    excluded = () if args.include_clinical else ("clinical",)
+    index = CoMentionIndex.build(load_df(args.edges, columns=EDGE_COLUMNS), excluded)
+    for drug in args.drugs:
+        print(drug, index.co_mentioned(drug, k=args.top))
+
+
+if __name__ == "__main__":
+    main()
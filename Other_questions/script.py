@@ -3,37 +3,82 @@ from __future__ import annotations
 import os
 import sys
 from pathlib import Path
-from typing import Any, Dict
 
 import pandas as pd
 
 # Add repo root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-# Path to mentions_edges.csv relative to this script: ../data/intermediary/mentions_edges.csv
-MENTIONS_INTER = (
-    Path(__file__).resolve().parent.parent / "data" / "intermediary" / "mentions_edges.csv"
+from src.medmentions.aggregates import load_aggregates  # noqa: E402
+from src.medmentions.cache import ArtifactCache, cache_key, file_digest  # noqa: E402
+from src.medmentions.index import (  # noqa: E402
+    INDEX_FORMAT_VERSION,
+    IndexWriter,
+    InvertedIndex,
+    lookup_index,
+    tokenize,
 )
+from src.medmentions.intermediary_io import iter_df_chunks, load_df  # noqa: E402
+from src.medmentions.mentions import journal_with_most_distinct_drugs  # noqa: E402
 
+# Paths relative to this script: ../data/intermediary/
+INTER_DIR = Path(__file__).resolve().parent.parent / "data" / "intermediary"
+INTER_FORMAT = os.environ.get("PIPELINE_INTER_FORMAT", "parquet")
+MENTIONS_INTER = INTER_DIR / f"mentions_edges.{INTER_FORMAT}"
+PUBMED_INTER = INTER_DIR / f"pubmed_normalized.{INTER_FORMAT}"
+AGGREGATES = INTER_DIR / "journal_drug.aggregates.npz"
+# The DAG's cache directory: the title index is kept there, keyed on the
+# intermediate it covers
+CACHE_DIR = INTER_DIR / "cache"
+PUBMED_INDEX_NAME = "pubmed_title.index"
+# Rows per index part: bounds the memory of building and querying the index
+CHUNK_SIZE = 100_000
 
-def read_mentions_csv(path: str | Path) -> pd.DataFrame:
-    df = pd.read_csv(path, dtype=str).rename(columns=str.lower)
 
-    # id, title, journal, date
+def read_mentions(path: str | Path) -> pd.DataFrame:
+    if Path(path).suffix == ".csv":
+        df = pd.read_csv(path, dtype=str).rename(columns=str.lower)
+    else:
+        df = load_df(path).rename(columns=str.lower)
     return df
 
 
-def journal_with_most_distinct_drugs(edges: pd.DataFrame) -> Dict[str, Any]:
-    if edges.empty:
-        return {"journal": None, "distinct_drugs": 0}
-    counts = edges.groupby("journal")["drug_atccode"].nunique().sort_values(ascending=False)
-    top_journal = counts.index[0]
-    return {"journal": top_journal, "distinct_drugs": int(counts.iloc[0])}
+def _build_pubmed_index(out_dir: Path) -> None:
+    with IndexWriter(out_dir / PUBMED_INDEX_NAME) as index:
+        for chunk in iter_df_chunks(PUBMED_INTER, CHUNK_SIZE, columns=["title"]):
+            index.append(InvertedIndex.build(chunk["title"]))
+
+
+def pubmed_title_index() -> Path:
+    """Title index of the PubMed intermediate, built on first use.
+
+    Cached on the content of the intermediate: later queries on the same
+    DAG output skip the rebuild.
+    """
+    key = cache_key("pubmed_title_index", file_digest(PUBMED_INTER), INDEX_FORMAT_VERSION)
+    entry = ArtifactCache(CACHE_DIR).get_or_build(key, _build_pubmed_index, label="pubmed index")
+    return entry / PUBMED_INDEX_NAME
+
+
+def pubmed_ids_mentioning(term: str) -> list[str]:
+    """Ids of the PubMed articles whose title contains ``term`` as whole words.
+
+    Uses the persisted title index instead of scanning titles.
+    """
+    rows = lookup_index(pubmed_title_index(), tokenize(term))
+    ids = load_df(PUBMED_INTER, columns=["id"])["id"]
+    return ids.iloc[rows].tolist()
 
 
 def main() -> None:
-    mentions_edges = read_mentions_csv(MENTIONS_INTER)
-    print(journal_with_most_distinct_drugs(mentions_edges))
+    if AGGREGATES.exists():
+        # Persisted by the DAG: no need to reread the edges
+        print(load_aggregates(AGGREGATES).journal_with_most_distinct_drugs())
+    else:
+        mentions_edges = read_mentions(MENTIONS_INTER)
+        print(journal_with_most_distinct_drugs(mentions_edges))
+    for term in sys.argv[1:]:
+        print(term, pubmed_ids_mentioning(term))
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+"""Benchmarks of the medmentions pipeline, on synthetic corpora (see ``synthetic``)."""
@@ -0,0 +1,136 @@
+"""Benchmark ``build_graph_df`` and ``write_graph_stream`` against the former implementation.
+
+Builds a synthetic edge frame (drug, document and journal strings drawn
+from pools, as in real mention graphs), checks both implementations agree
+on a sample and prints their timings. Usage::
+
+    python benchmarks/bench_build_graph.py --edges 1000000 10000000
+    python benchmarks/bench_build_graph.py --edges 1000000 --dates datetime64
+    python benchmarks/bench_build_graph.py --edges 10000000 --skip-build
+
+At 10M edges the graph dicts alone take several GB: ``--skip-build`` only
+times ``write_graph_stream``, whose memory does not grow with the edges.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+# Add repo root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import src.medmentions.writers as writers  # noqa: E402
+from src.medmentions.mentions import EDGE_COLUMNS, build_graph_df  # noqa: E402
+
+
+def legacy_graph_edges(edges: pd.DataFrame) -> List[Dict[str, Any]]:
+    """The former implementation: copy, per-row ``date`` objects, ``to_dict``."""
+    out_edges = edges.copy()
+    out_edges["date"] = pd.to_datetime(out_edges["date"]).dt.date.astype(str)
+    return out_edges.to_dict(orient="records")
+
+
+def legacy_graph_drugs(drug_pairs: pd.DataFrame) -> List[Dict[str, Any]]:
+    drugs = drug_pairs.sort_values("drug_atccode")
+    return [{"atccode": r.drug_atccode, "name": r.drug_name} for r in drugs.itertuples(index=False)]
+
+
+def legacy_build_graph_df(edges: pd.DataFrame) -> Dict[str, Any]:
+    return {
+        "drugs": legacy_graph_drugs(edges[["drug_atccode", "drug_name"]].drop_duplicates()),
+        "journals": sorted(edges["journal"].dropna().unique().tolist()),
+        "edges": legacy_graph_edges(edges),
+    }
+
+
+@contextmanager
+def legacy_writers() -> Iterator[None]:
+    """Run ``write_graph_stream`` on the former helpers."""
+    saved = writers.graph_edges, writers.graph_drugs, writers.distinct_drug_pairs
+    writers.graph_edges, writers.graph_drugs = legacy_graph_edges, legacy_graph_drugs
+    writers.distinct_drug_pairs = lambda e: e[["drug_atccode", "drug_name"]].drop_duplicates()
+    try:
+        yield
+    finally:
+        writers.graph_edges, writers.graph_drugs, writers.distinct_drug_pairs = saved
+
+
+def make_edges(n_edges: int, dates: str, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n_drugs, n_docs, n_journals = 5_000, max(n_edges // 4, 1), 2_000
+    drug = rng.integers(0, n_drugs, n_edges)
+    doc = rng.integers(0, n_docs, n_edges)
+    # Strings are drawn from pools (shared objects): memory grows with the
+    # number of edges, not with string length
+    days = pd.date_range("1990-01-01", periods=12_000, freq="D")[rng.integers(0, 12_000, n_docs)]
+    doc_dates: Any = days if dates == "datetime64" else np.asarray(days.strftime("%Y-%m-%d"))
+    atccodes = np.array([f"D{i:06d}" for i in range(n_drugs)], dtype=object)
+    names = np.array([f"drug name {i}" for i in range(n_drugs)], dtype=object)
+    ids = np.array([str(i) for i in range(n_docs)], dtype=object)
+    titles = np.array([f"A study of compound {i} in adults" for i in range(n_docs)], dtype=object)
+    journals = np.array([f"Journal of medicine {i}" for i in range(n_journals)], dtype=object)
+    return pd.DataFrame(
+        {
+            "drug_atccode": atccodes[drug],
+            "drug_name": names[drug],
+            "source_type": np.where(doc % 4 == 0, "clinical", "pubmed").astype(object),
+            "source_id": ids[doc],
+            "source_title": titles[doc],
+            "journal": journals[doc % n_journals],
+            "date": doc_dates[doc],
+        },
+        columns=EDGE_COLUMNS,
+    )
+
+
+def _time(fn: Callable[[], Any]) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--edges", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--dates", choices=["strings", "datetime64"], default="strings")
+    parser.add_argument("--skip-build", action="store_true", help="only time write_graph_stream")
+    args = parser.parse_args()
+
+    print(
+        f"{'edges':>10} {'build old s':>12} {'build new s':>12} {'speedup':>8}"
+        f" {'write old s':>12} {'write new s':>12} {'speedup':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "graph.json")
+        for n in args.edges:
+            edges = make_edges(n, args.dates)
+            sample = edges.iloc[:100_000]
+            assert build_graph_df(sample) == legacy_build_graph_df(sample)
+
+            # Results are dropped right away: only one graph is held at a time
+            build_old = build_new = float("nan")
+            if not args.skip_build:
+                build_old = _time(lambda: legacy_build_graph_df(edges))
+                build_new = _time(lambda: build_graph_df(edges))
+            with legacy_writers():
+                write_old = _time(lambda: writers.write_graph_stream(edges, out))
+            write_new = _time(lambda: writers.write_graph_stream(edges, out))
+            print(
+                f"{n:>10} {build_old:>12.2f} {build_new:>12.2f} {build_old / build_new:>7.1f}x"
+                f" {write_old:>12.2f} {write_new:>12.2f} {write_old / write_new:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark co-mention queries of ``CoMentionIndex`` against a pandas self-merge.
+
+Builds a synthetic edge set with skewed (Zipf-like) drug and journal
+popularity, checks both agree on the queried drugs and prints the index
+build time and the mean query time of each. Usage::
+
+    python benchmarks/bench_comentions.py --drugs 100000 --journals 10000 --edges 2000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Add repo root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.medmentions.comentions import CoMentionIndex  # noqa: E402
+
+
+def make_edges(n_drugs: int, n_journals: int, n_edges: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    def skewed(n: int) -> np.ndarray:
+        # Rank-frequency ~ 1 / rank: a few very popular values, a long tail
+        weights = 1.0 / np.arange(1, n + 1)
+        return rng.choice(n, size=n_edges, p=weights / weights.sum())
+
+    atccodes = np.array([f"D{i:06d}" for i in range(n_drugs)], dtype=object)
+    journals = np.array([f"Journal {i}" for i in range(n_journals)], dtype=object)
+    drug = rng.permutation(n_drugs)[skewed(n_drugs)]
+    return pd.DataFrame(
+        {
+            "drug_atccode": atccodes[drug],
+            "drug_name": atccodes[drug],
+            "source_type": np.where(rng.random(n_edges) < 0.2, "clinical", "pubmed"),
+            "journal": journals[skewed(n_journals)],
+        }
+    )
+
+
+def distinct_pairs(edges: pd.DataFrame) -> pd.DataFrame:
+    pairs = edges.loc[edges["source_type"] != "clinical", ["drug_atccode", "journal"]]
+    return pairs.dropna().drop_duplicates()
+
+
+def pandas_co_mentioned(pairs: pd.DataFrame, drug: str) -> List[Dict[str, Any]]:
+    """Self-merge of the distinct (drug, journal) pairs on journal, for one drug."""
+    mine = pairs[pairs["drug_atccode"] == drug]
+    merged = mine.merge(pairs, on="journal", suffixes=("", "_other"))
+    merged = merged[merged["drug_atccode_other"] != drug]
+    shared = merged.groupby("drug_atccode_other").size().sort_values(ascending=False, kind="stable")
+    return [{"drug": d, "shared_journals": int(n)} for d, n in shared.items()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drugs", type=int, default=100_000)
+    parser.add_argument("--journals", type=int, default=10_000)
+    parser.add_argument("--edges", type=int, default=2_000_000)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    edges = make_edges(args.drugs, args.journals, args.edges)
+    start = time.perf_counter()
+    index = CoMentionIndex.build(edges)
+    build = time.perf_counter() - start
+
+    # Most popular drug (worst case) and random ones
+    rng = np.random.default_rng(1)
+    queried = [edges["drug_atccode"].value_counts().index[0]] + rng.choice(
+        index.drugs, args.queries - 1
+    ).tolist()
+    pairs = distinct_pairs(edges)  # computed once, not timed
+    times: Dict[str, List[float]] = {"index": [], "index top 10": [], "pandas": []}
+    for drug in queried:
+        start = time.perf_counter()
+        got = index.co_mentioned(drug)
+        times["index"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        index.co_mentioned(drug, k=10)
+        times["index top 10"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        expected = pandas_co_mentioned(pairs, drug)
+        times["pandas"].append(time.perf_counter() - start)
+        assert [{k: r[k] for k in ("drug", "shared_journals")} for r in got] == expected
+
+    print(f"{args.drugs} drugs, {args.journals} journals, {args.edges} edges")
+    print(f"index build: {build:.2f} s")
+    for name, values in times.items():
+        print(f"{name:>13}: {np.mean(values) * 1000:8.2f} ms/query (max {max(values) * 1000:.2f})")
+
+
+if __name__ == "__main__":
+    main()
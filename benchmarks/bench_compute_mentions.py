@@ -0,0 +1,54 @@
+"""Benchmark ``compute_mentions`` against corpus size.
+
+Runs the matcher on synthetic corpora (see ``synthetic.py``) of growing
+size with a fixed drug dictionary and prints the time per document, which
+should stay flat (linear scaling). Usage::
+
+    python benchmarks/bench_compute_mentions.py --drugs 5000 --sizes 10000 20000 40000
+    python benchmarks/bench_compute_mentions.py --match-mode phrase
+    python benchmarks/bench_compute_mentions.py --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+# Add repo root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.synthetic import make_corpus  # noqa: E402
+from src.medmentions.mentions import MATCH_MODES, compute_mentions  # noqa: E402
+from src.medmentions.normalizers import (  # noqa: E402
+    normalize_drugs,
+    normalize_pubmed,
+    normalize_trials,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drugs", type=int, default=5000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 20_000, 40_000, 80_000])
+    parser.add_argument("--match-mode", choices=MATCH_MODES, default="substring")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'docs':>10} {'edges':>10} {'seconds':>10} {'us/doc':>10}")
+    for size in args.sizes:
+        drugs, pubmed, trials = make_corpus(size, args.drugs)
+        drugs = normalize_drugs(drugs)
+        pubmed, trials = normalize_pubmed(pubmed), normalize_trials(trials)
+        n_docs = len(pubmed) + len(trials)
+        start = time.perf_counter()
+        edges = compute_mentions(
+            drugs, pubmed, trials, match_mode=args.match_mode, n_workers=args.workers
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{n_docs:>10} {len(edges):>10} {elapsed:>10.3f} {1e6 * elapsed / n_docs:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark ``compute_mentions_duckdb`` side by side with the pandas ``compute_mentions``.
+
+Saves normalized synthetic corpora (see ``synthetic.py``) as intermediates,
+then times each backend from the files: the pandas path loads them and
+matches in process, DuckDB scans them in SQL. Checks both give the same
+edges and prints their timings per match mode. Usage::
+
+    python benchmarks/bench_duckdb_mentions.py --sizes 100000 1000000 --drugs 1000
+    python benchmarks/bench_duckdb_mentions.py --modes word phrase --threads 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Tuple
+
+import pandas as pd
+
+# Add repo root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.synthetic import make_corpus  # noqa: E402
+from src.medmentions.duckdb_mentions import compute_mentions_duckdb  # noqa: E402
+from src.medmentions.intermediary_io import INTER_FORMATS, load_df, save_df  # noqa: E402
+from src.medmentions.mentions import MATCH_MODES, compute_mentions  # noqa: E402
+from src.medmentions.normalizers import (  # noqa: E402
+    normalize_drugs,
+    normalize_pubmed,
+    normalize_trials,
+)
+
+
+def _timed(fn: Callable[[], pd.DataFrame]) -> Tuple[pd.DataFrame, float]:
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def _plain(edges: pd.DataFrame) -> pd.DataFrame:
+    """Edges with object columns: category sets differ between the backends."""
+    return edges.astype(object).where(edges.notna(), None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--drugs", type=int, default=1_000)
+    parser.add_argument("--modes", nargs="+", choices=MATCH_MODES, default=list(MATCH_MODES))
+    parser.add_argument("--format", choices=list(INTER_FORMATS), default="parquet")
+    parser.add_argument("--threads", type=int, default=None, help="DuckDB threads (default: all)")
+    args = parser.parse_args()
+
+    print(
+        f"{'docs':>10} {'mode':>10} {'edges':>10} {'pandas s':>10} {'duckdb s':>10} {'speedup':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            drugs, pubmed, trials = make_corpus(size, args.drugs)
+            paths = [os.path.join(tmp, f"{name}.{args.format}") for name in ("d", "p", "t")]
+            save_df(normalize_drugs(drugs), paths[0])
+            save_df(normalize_pubmed(pubmed), paths[1])
+            save_df(normalize_trials(trials), paths[2])
+            del drugs, pubmed, trials
+
+            for mode in args.modes:
+
+                def pandas_path(mode: str = mode) -> Any:
+                    return compute_mentions(*(load_df(p) for p in paths), match_mode=mode)
+
+                expected, pandas_s = _timed(pandas_path)
+                got, duckdb_s = _timed(
+                    lambda: compute_mentions_duckdb(*paths, match_mode=mode, threads=args.threads)
+                )
+                pd.testing.assert_frame_equal(_plain(got), _plain(expected))
+                print(
+                    f"{size:>10} {mode:>10} {len(got):>10} {pandas_s:>10.2f} {duckdb_s:>10.2f}"
+                    f" {pandas_s / duckdb_s:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
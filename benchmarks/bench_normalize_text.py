@@ -0,0 +1,80 @@
+"""Micro-benchmark ``normalize_text_series`` against the per-row loop.
+
+Builds a PubMed-like column (mostly ASCII titles with a few accented words, and a
+journal column with heavy repetition), checks both implementations agree
+and prints their timings. Usage::
+
+    python benchmarks/bench_normalize_text.py --rows 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+from typing import Any, Callable
+
+import pandas as pd
+
+# Add repo root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.medmentions.utils import normalize_text, normalize_text_series  # noqa: E402
+
+
+def loop_normalize_text_series(series: pd.Series[Any]) -> pd.Series[Any]:
+    """The former implementation: ``normalize_text`` once per row."""
+    values: list[Any] = []
+    for x in series:
+        if pd.isna(x):
+            values.append(x)
+        else:
+            values.append(normalize_text(str(x)))
+    return pd.Series(values, index=series.index, dtype="object")
+
+
+def make_columns(n_rows: int, seed: int = 0) -> dict[str, pd.Series[Any]]:
+    rng = random.Random(seed)
+    accented = "éèàçÉ"
+
+    def word() -> str:
+        w = "".join(rng.choice(string.ascii_letters) for _ in range(rng.randint(3, 10)))
+        if rng.random() < 0.02:  # a few accented words
+            i = rng.randrange(len(w))
+            w = w[:i] + rng.choice(accented) + w[i + 1 :]
+        return w
+
+    def text(lo: int, hi: int) -> str:
+        return "  ".join(word() for _ in range(rng.randint(lo, hi)))
+
+    journals = [text(2, 5) for _ in range(200)]
+    return {
+        "title": pd.Series([text(6, 14) for _ in range(n_rows)]),
+        "journal": pd.Series([rng.choice(journals) for _ in range(n_rows)]),
+    }
+
+
+def _time(fn: Callable[[pd.Series[Any]], pd.Series[Any]], s: pd.Series[Any]) -> float:
+    start = time.perf_counter()
+    fn(s)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'column':>10} {'loop s':>10} {'series s':>10} {'speedup':>10}")
+    for name, s in make_columns(args.rows).items():
+        pd.testing.assert_series_equal(normalize_text_series(s), loop_normalize_text_series(s))
+        loop = _time(loop_normalize_text_series, s)
+        fast = _time(normalize_text_series, s)
+        print(f"{name:>10} {loop:>10.3f} {fast:>10.3f} {loop / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
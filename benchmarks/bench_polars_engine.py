@@ -0,0 +1,100 @@
+"""Benchmark the polars engine side by side with the pandas one, from the raw files.
+
+Writes synthetic corpora (see ``synthetic.py``), then runs each engine
+end to end: read, normalize, compute mentions and build the graph. Checks
+both give the same graph and prints their timings per match mode. Usage::
+
+    python benchmarks/bench_polars_engine.py --sizes 100000 1000000 --drugs 1000
+    python benchmarks/bench_polars_engine.py --modes word phrase --corpus-dir /tmp/corpora
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+import pandas as pd
+import polars as pl
+
+# Add repo root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.synthetic import ensure_corpus  # noqa: E402
+from src.medmentions import normalizers, polars_engine, readers  # noqa: E402
+from src.medmentions.mentions import MATCH_MODES, build_graph_df, compute_mentions  # noqa: E402
+
+
+def _timed(fn: Callable[[], Any]) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def _pandas_graph(paths: Dict[str, Path], mode: str) -> Dict[str, Any]:
+    drugs = normalizers.normalize_drugs(readers.read_drugs_csv(paths["drugs.csv"]))
+    pubmed = pd.concat(
+        [
+            normalizers.normalize_pubmed(readers.read_pubmed_csv(paths["pubmed.csv"])),
+            normalizers.normalize_pubmed(readers.read_pubmed_json(paths["pubmed.json"])),
+        ],
+        ignore_index=True,
+    )
+    trials = normalizers.normalize_trials(
+        readers.read_clinical_trials_csv(paths["clinical_trials.csv"])
+    )
+    return build_graph_df(compute_mentions(drugs, pubmed, trials, match_mode=mode))
+
+
+def _polars_graph(paths: Dict[str, Path], mode: str) -> Dict[str, Any]:
+    pe = polars_engine
+    drugs = pe.normalize_drugs(pe.read_drugs_csv(paths["drugs.csv"]))
+    pubmed = pl.concat(
+        [
+            pe.normalize_pubmed(pe.read_pubmed_csv(paths["pubmed.csv"])),
+            pe.normalize_pubmed(pe.read_pubmed_json(paths["pubmed.json"])),
+        ]
+    )
+    trials = pe.normalize_trials(pe.read_clinical_trials_csv(paths["clinical_trials.csv"]))
+    return pe.build_graph_df(pe.compute_mentions(drugs, pubmed, trials, match_mode=mode))
+
+
+def _journals_none(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """Missing edge journals as None: the pandas graph carries them as NaN."""
+    for edge in graph["edges"]:
+        if edge["journal"] != edge["journal"]:
+            edge["journal"] = None
+    return graph
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--drugs", type=int, default=1_000)
+    parser.add_argument("--modes", nargs="+", choices=MATCH_MODES, default=list(MATCH_MODES))
+    parser.add_argument("--corpus-dir", default=None, help="Reuse corpora (default: temporary)")
+    args = parser.parse_args()
+
+    print(
+        f"{'docs':>10} {'mode':>10} {'edges':>10} {'pandas s':>10} {'polars s':>10} {'speedup':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(args.corpus_dir or tmp)
+        for size in args.sizes:
+            paths = ensure_corpus(root / f"corpus_{size}_{args.drugs}", size, args.drugs)
+            for mode in args.modes:
+                expected, pandas_s = _timed(lambda: _pandas_graph(paths, mode))
+                got, polars_s = _timed(lambda: _polars_graph(paths, mode))
+                assert got == _journals_none(expected), f"graphs differ ({size} docs, {mode})"
+                print(
+                    f"{size:>10} {mode:>10} {len(got['edges']):>10} {pandas_s:>10.2f}"
+                    f" {polars_s:>10.2f} {pandas_s / polars_s:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
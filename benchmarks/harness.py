@@ -0,0 +1,377 @@
+"""Time and memory of each pipeline stage, and of the whole pipeline, on a synthetic corpus.
+
+Stages run in order on a corpus from ``synthetic.py``, each on the output
+of the previous one:
+
+- ``read``: the four ``read_*`` readers
+- ``normalize``: the three normalizers
+- ``compute_mentions``: matching in ``--match-mode``
+- ``build_graph_df``, ``write_graph``: the graph of the edges, in memory
+  then to ``graph.json``
+- ``pipeline``: the whole pipeline as the DAG streams it: chunked reads,
+  normalization, PubMed deduplication, ``iter_mentions``, merged edges and
+  ``write_graph_stream``
+
+Each stage is timed ``--repeat`` times (best run kept, with the per-function
+breakdown of :mod:`medmentions.metrics`), then run once more with
+``tracemalloc`` for its memory peak. The report is JSON: save one as the
+baseline with ``--output``, and gate later runs on it with ``--baseline``,
+which exits with status 1 when a stage got slower or bigger than the
+tolerances. Timings only compare on the same machine. Usage::
+
+    python benchmarks/harness.py --docs 100000 --output benchmarks/baseline.json
+    python benchmarks/harness.py --docs 100000 --baseline benchmarks/baseline.json
+    python benchmarks/harness.py --docs 10000000 --corpus /data/corpus-10m --stages pipeline
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import chain
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add repo root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.synthetic import corpus_config, ensure_corpus, read_manifest  # noqa: E402
+from src.medmentions.dedup import Deduplicator  # noqa: E402
+from src.medmentions.mentions import (  # noqa: E402
+    MATCH_MODES,
+    build_graph_df,
+    compute_mentions,
+    iter_mentions,
+    merge_edge_parts,
+)
+from src.medmentions.metrics import collect, peak_rss  # noqa: E402
+from src.medmentions.normalizers import (  # noqa: E402
+    normalize_drugs,
+    normalize_pubmed,
+    normalize_trials,
+)
+from src.medmentions.readers import (  # noqa: E402
+    iter_clinical_trials_csv,
+    iter_pubmed_csv,
+    iter_pubmed_json,
+    read_clinical_trials_csv,
+    read_drugs_csv,
+    read_pubmed_csv,
+    read_pubmed_json,
+)
+from src.medmentions.writers import write_graph, write_graph_stream  # noqa: E402
+
+# Bump when the layout of the reports changes
+REPORT_FORMAT_VERSION = 1
+
+STAGES = ["read", "normalize", "compute_mentions", "build_graph_df", "write_graph", "pipeline"]
+
+# Stage outputs, by stage name, given to the next stages
+Context = Dict[str, Any]
+# A stage: its function of the context, and the number of rows it processed
+Stage = Tuple[Callable[[Context], Any], Callable[[Context, Any], int]]
+
+
+def _read(corpus: Path) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    drugs = read_drugs_csv(corpus / "drugs.csv")
+    pubmed = pd.concat(
+        [read_pubmed_csv(corpus / "pubmed.csv"), read_pubmed_json(corpus / "pubmed.json")],
+        ignore_index=True,
+    )
+    return drugs, pubmed, read_clinical_trials_csv(corpus / "clinical_trials.csv")
+
+
+def _pipeline(corpus: Path, out_dir: Path, match_mode: str, n_workers: int) -> pd.DataFrame:
+    """The DAG's tasks in one process, without the intermediates."""
+    drugs = normalize_drugs(read_drugs_csv(corpus / "drugs.csv"), inplace=True)
+    dedup = Deduplicator("title")
+    pubmed_chunks = (
+        dedup(normalize_pubmed(chunk, inplace=True))
+        for chunk in chain(
+            iter_pubmed_csv(corpus / "pubmed.csv"), iter_pubmed_json(corpus / "pubmed.json")
+        )
+    )
+    trials_chunks = (
+        normalize_trials(chunk, inplace=True)
+        for chunk in iter_clinical_trials_csv(corpus / "clinical_trials.csv")
+    )
+    edges = merge_edge_parts(
+        iter_mentions(
+            drugs, pubmed_chunks, trials_chunks, match_mode=match_mode, n_workers=n_workers
+        )
+    )
+    write_graph_stream(edges, out_dir / "graph.stream.json")
+    return edges
+
+
+def _stages(corpus: Path, out_dir: Path, match_mode: str, n_workers: int) -> Dict[str, Stage]:
+    def n_docs(frames: Sequence[pd.DataFrame]) -> int:
+        return len(frames[1]) + len(frames[2])
+
+    return {
+        "read": (lambda ctx: _read(corpus), lambda ctx, out: n_docs(out)),
+        "normalize": (
+            lambda ctx: (
+                normalize_drugs(ctx["read"][0]),
+                normalize_pubmed(ctx["read"][1]),
+                normalize_trials(ctx["read"][2]),
+            ),
+            lambda ctx, out: n_docs(out),
+        ),
+        "compute_mentions": (
+            lambda ctx: compute_mentions(
+                *ctx["normalize"], match_mode=match_mode, n_workers=n_workers
+            ),
+            lambda ctx, out: n_docs(ctx["normalize"]),
+        ),
+        "build_graph_df": (
+            lambda ctx: build_graph_df(ctx["compute_mentions"]),
+            lambda ctx, out: len(ctx["compute_mentions"]),
+        ),
+        "write_graph": (
+            lambda ctx: write_graph(ctx["build_graph_df"], out_dir / "graph.json"),
+            lambda ctx, out: len(ctx["compute_mentions"]),
+        ),
+        "pipeline": (
+            lambda ctx: _pipeline(corpus, out_dir, match_mode, n_workers),
+            lambda ctx, out: len(out),
+        ),
+    }
+
+
+def _measure(
+    func: Callable[[Context], Any], ctx: Context, repeat: int, trace_memory: bool
+) -> Tuple[Any, Dict[str, Any]]:
+    """Result of the last run of ``func(ctx)`` and the stats of its runs."""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        result = None  # the previous result is not kept alive meanwhile
+        gc.collect()
+        with collect() as recorder:
+            start = time.perf_counter()
+            result = func(ctx)
+            seconds = time.perf_counter() - start
+        runs.append((seconds, recorder.report()["stages"]))
+
+    mem_peak = None
+    if trace_memory:
+        result = None
+        gc.collect()
+        with collect(trace_memory=True):
+            at_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            result = func(ctx)
+            mem_peak = tracemalloc.get_traced_memory()[1] - at_start
+
+    seconds, functions = min(runs, key=lambda run: run[0])
+    return result, {
+        "seconds": round(seconds, 6),
+        "runs": [round(run[0], 6) for run in runs],
+        "mem_peak_mb": None if mem_peak is None else round(mem_peak / (1 << 20), 3),
+        "functions": {
+            name: {k: stats[k] for k in ("calls", "seconds", "rows_in", "rows_out")}
+            for name, stats in functions.items()
+        },
+    }
+
+
+def _environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_benchmarks(
+    corpus: str | Path,
+    stages: Sequence[str] = STAGES,
+    repeat: int = 3,
+    trace_memory: bool = True,
+    match_mode: str = "substring",
+    n_workers: int = 1,
+) -> Dict[str, Any]:
+    """Benchmark ``stages`` on the corpus written by ``synthetic.write_corpus`` in ``corpus``.
+
+    Stages the selected ones depend on are run once, untimed.
+    """
+    corpus = Path(corpus)
+    corpus_options = read_manifest(corpus)
+    if corpus_options is None:
+        raise FileNotFoundError(f"No complete synthetic corpus in {corpus}")
+    ctx: Context = {}
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        all_stages = _stages(corpus, Path(tmp), match_mode, n_workers)
+        # Up to the last selected stage, except the standalone pipeline
+        last = max(STAGES.index(name) for name in stages)
+        for name in STAGES[: last + 1]:
+            if name not in stages and name == "pipeline":
+                continue
+            func, rows = all_stages[name]
+            if name in stages:
+                ctx[name], stats = _measure(func, ctx, repeat, trace_memory)
+                results[name] = {"rows": rows(ctx, ctx[name]), **stats}
+            else:
+                ctx[name] = func(ctx)
+            if name == "pipeline":
+                ctx.clear()  # edges of the standalone run
+
+    peak = peak_rss()
+    return {
+        "version": REPORT_FORMAT_VERSION,
+        "config": run_config(corpus_options, match_mode, n_workers),
+        "environment": _environment(),
+        "rss_peak_mb": None if peak is None else round(peak / (1 << 20), 3),
+        "stages": results,
+    }
+
+
+def load_report(path: str | Path) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        report: Dict[str, Any] = json.load(f)
+    version = int(report.get("version", 0))
+    if version != REPORT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported benchmark report format version {version} "
+            f"(expected {REPORT_FORMAT_VERSION})"
+        )
+    return report
+
+
+def run_config(corpus_options: Dict[str, Any], match_mode: str, n_workers: int) -> Dict[str, Any]:
+    """Options a report was run with: only reports of equal options compare."""
+    return {"corpus": corpus_options, "match_mode": match_mode, "workers": n_workers}
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    max_slowdown: float = 0.25,
+    max_memory_growth: float = 0.25,
+    min_seconds: float = 0.05,
+    min_memory_mb: float = 1.0,
+) -> List[str]:
+    """Regressions of ``current`` over ``baseline``, one message per stage and measure.
+
+    A stage regresses when it is slower (or its memory peak higher) than
+    the baseline by more than the relative tolerance *and* by more than the
+    absolute one, which filters out the noise of very short stages. Stages
+    missing from either report are skipped.
+    """
+    if baseline["config"] != current["config"]:
+        raise ValueError(
+            f"Benchmark runs of different configurations are not comparable: "
+            f"{baseline['config']} != {current['config']}"
+        )
+    regressions = []
+    for name, stats in current["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            continue
+        checks = [
+            ("time", "seconds", max_slowdown, min_seconds, "s"),
+            ("memory", "mem_peak_mb", max_memory_growth, min_memory_mb, "MB"),
+        ]
+        for label, key, tolerance, floor, unit in checks:
+            old, new = base.get(key), stats.get(key)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append(
+                    f"{name}: {label} {new:.3f} {unit} vs {old:.3f} {unit} in the baseline "
+                    f"(+{100 * (new / old - 1) if old else float('inf'):.0f}%)"
+                )
+    return regressions
+
+
+def _print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    base_stages = baseline["stages"] if baseline else {}
+    print(
+        f"{'stage':>16} {'rows':>10} {'seconds':>10} {'baseline':>10}"
+        f" {'mem MB':>10} {'baseline':>10}"
+    )
+    for name, stats in report["stages"].items():
+        base = base_stages.get(name, {})
+
+        def fmt(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value:.3f}"
+
+        print(
+            f"{name:>16} {stats['rows']:>10} {fmt(stats['seconds']):>10}"
+            f" {fmt(base.get('seconds')):>10} {fmt(stats['mem_peak_mb']):>10}"
+            f" {fmt(base.get('mem_peak_mb')):>10}"
+        )
+    print(f"peak RSS: {report['rss_peak_mb']} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--drugs", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus", help="corpus directory, generated unless already there")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--match-mode", choices=MATCH_MODES, default="substring")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--output", help="save the report (e.g. as the new baseline)")
+    parser.add_argument("--baseline", help="report to compare with: exit 1 on regressions")
+    parser.add_argument("--max-slowdown", type=float, default=0.25)
+    parser.add_argument("--max-memory-growth", type=float, default=0.25)
+    args = parser.parse_args()
+
+    baseline = load_report(args.baseline) if args.baseline else None
+    config = run_config(
+        corpus_config(args.docs, args.drugs, args.seed), args.match_mode, args.workers
+    )
+    if baseline and baseline["config"] != config:
+        parser.error(
+            "--docs/--drugs/--seed/--match-mode/--workers differ from the baseline: "
+            f"{baseline['config']}"
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(args.corpus or tmp)
+        ensure_corpus(corpus, args.docs, args.drugs, args.seed)
+        report = run_benchmarks(
+            corpus,
+            args.stages,
+            repeat=args.repeat,
+            trace_memory=not args.no_memory,
+            match_mode=args.match_mode,
+            n_workers=args.workers,
+        )
+
+    _print_report(report, baseline)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if baseline:
+        if baseline["environment"] != report["environment"]:
+            print("warning: the baseline was recorded in another environment")
+        regressions = compare(baseline, report, args.max_slowdown, args.max_memory_growth)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
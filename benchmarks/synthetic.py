@@ -0,0 +1,404 @@
+"""Seeded synthetic inputs of the pipeline: drugs, PubMed CSV/JSON and clinical trials.
+
+The files have the layout of the real feeds (``drugs.csv``, ``pubmed.csv``,
+``pubmed.json`` with trailing commas and some blank ids,
+``clinical_trials.csv``) and their quirks: drug names of realistic length
+mentioned in about a third of the titles in any case, a few accented words,
+dates mixing all supported formats, journals repeated with a skewed
+(Zipf-like) popularity, a few missing journals and whitespace, and PubMed
+documents republished in both feeds. Usage::
+
+    python benchmarks/synthetic.py --docs 1000000 --out /tmp/corpus
+
+Documents are generated in blocks of ``BLOCK_ROWS``, each from its own
+seeded generator and written as soon as generated: memory does not grow
+with the corpus, so 10M documents are fine. The files only depend on the
+sizes and the seed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add repo root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.medmentions.utils import DATE_FORMATS  # noqa: E402
+
+# Bump when the generated files change for a given seed and sizes
+GENERATOR_VERSION = 1
+
+CORPUS_FILES = ["drugs.csv", "pubmed.csv", "pubmed.json", "clinical_trials.csv"]
+# Written next to the files: the options they were generated with
+MANIFEST_NAME = "corpus.json"
+
+BLOCK_ROWS = 100_000
+
+# Share of the documents in each feed
+PUBMED_CSV_SHARE = 0.7
+PUBMED_JSON_SHARE = 0.1
+# Share of the titles mentioning a drug, and of those mentioning a second one
+MENTION_SHARE = 0.3
+SECOND_MENTION_SHARE = 0.1
+# Share of the PubMed CSV documents republished in the JSON feed
+DUPLICATE_SHARE = 0.01
+# Share of the JSON documents with a blank id, of the documents without journal
+BLANK_ID_SHARE = 0.005
+MISSING_JOURNAL_SHARE = 0.002
+
+# Drug names: a stem and a pharmacological suffix, 6 to 20 characters
+_STEMS = [
+    "ab", "ac", "al", "am", "ar", "ator", "ba", "be", "bu", "ca", "ce", "cip",
+    "cla", "da", "de", "di", "do", "e", "flu", "ga", "hy", "i", "ke", "la", "le",
+    "lo", "me", "mi", "na", "ni", "o", "pa", "pe", "pra", "pro", "ra", "ri", "ro",
+    "sa", "se", "su", "ta", "te", "tri", "va", "ve", "xa", "za",
+]  # fmt: skip
+_MIDDLES = ["", "c", "d", "l", "m", "n", "r", "s", "t", "v", "x", "z", "ph", "th"]
+_SUFFIXES = [
+    "amine", "azole", "caine", "cillin", "cycline", "dipine", "dronate", "floxacin",
+    "ine", "mab", "mycin", "olol", "one", "oxacin", "pril", "prazole", "sartan",
+    "setron", "statin", "tidine", "vir", "zepam", "zosin",
+]  # fmt: skip
+
+# Title words: common words of medical titles, some accented (French and
+# German titles), completed by pseudo-words
+_WORDS = [
+    "a", "acute", "adults", "after", "analysis", "and", "anxiety", "assessment",
+    "associated", "blood", "cancer", "care", "case", "children", "chronic",
+    "clinical", "cohort", "combined", "comparison", "controlled", "disease",
+    "dose", "double-blind", "effect", "effects", "efficacy", "emergency",
+    "evaluation", "for", "from", "in", "induced", "infection", "injection",
+    "intravenous", "its", "long-term", "low", "management", "men", "of", "on",
+    "oral", "outcomes", "pain", "patients", "pharmacokinetics", "phase",
+    "placebo", "plasma", "potential", "randomized", "response", "review", "risk",
+    "role", "safety", "severe", "study", "surgery", "syndrome", "the", "therapy",
+    "to", "treatment", "trial", "versus", "with", "women", "year-old",
+    "étude", "thérapie", "réponse", "traitement", "sécurité", "données",
+    "über", "wirkung", "behandlung", "à", "de", "et", "chez", "l'enfant",
+]  # fmt: skip
+_N_PSEUDO_WORDS = 5_000
+_TITLE_WORDS = (6, 14)
+
+_JOURNAL_PATTERNS = [
+    "Journal of {}",
+    "The journal of {}",
+    "International journal of {}",
+    "{} research",
+    "Annals of {}",
+    "Revue médicale de {}",
+    "Journal für {}",
+]
+# Real journal names sometimes carry undecoded bytes (seen in the PubMed dump)
+_MOJIBAKE = "\\xc3\\x28"
+_MOJIBAKE_SHARE = 0.01
+
+_FIRST_DAY = np.datetime64("1990-01-01")
+_N_DAYS = 35 * 365
+
+
+def _zipf_weights(n: int) -> np.ndarray:
+    """Rank-frequency ~ 1 / rank: a few very frequent values, a long tail."""
+    weights = 1.0 / np.arange(1, n + 1)
+    return weights / weights.sum()
+
+
+def _pseudo_words(rng: np.random.Generator, n: int) -> List[str]:
+    """Pronounceable words of 1 to 4 consonant-vowel syllables (2 to 14 letters)."""
+    onsets = "b c d f g h k l m n p r s t v ch gr pl st tr".split()
+    vowels = "a e i o u ia ou".split()
+    codas = [""] * 4 + ["l", "n", "r", "s", "x"]
+    syllables = [o + v for o in onsets for v in vowels]
+    counts = rng.integers(1, 5, n)
+    picks = rng.integers(0, len(syllables), (n, 4))
+    ends = rng.integers(0, len(codas), n)
+    return [
+        "".join(syllables[s] for s in row[:k]) + codas[e] for row, k, e in zip(picks, counts, ends)
+    ]
+
+
+class _Vocabulary:
+    """Word pools shared by all the documents of a corpus."""
+
+    def __init__(self, rng: np.random.Generator, drug_names: List[str], n_journals: int) -> None:
+        words = _WORDS + _pseudo_words(rng, _N_PSEUDO_WORDS)
+        self.words = np.array(words, dtype=object)
+        self.first_words = np.array([w[:1].upper() + w[1:] for w in words], dtype=object)
+        # Common words, in random order, are the most frequent ones
+        ranks = np.concatenate([rng.permutation(len(_WORDS)), np.arange(len(_WORDS), len(words))])
+        self.word_weights = _zipf_weights(len(words))[ranks]
+        # Drugs as mentioned in titles: lower case, capitalized or as listed
+        self.mentions = np.array(
+            [variant for name in drug_names for variant in (name.lower(), name.title(), name)],
+            dtype=object,
+        )
+        self.mention_weights = np.repeat(_zipf_weights(len(drug_names)), 3) / 3
+
+        topics = [" ".join(p) for p in rng.choice(words, (n_journals, 2))]
+        patterns = rng.integers(0, len(_JOURNAL_PATTERNS), n_journals)
+        journals = [_JOURNAL_PATTERNS[p].format(t) for p, t in zip(patterns, topics)]
+        mojibake = rng.random(n_journals) < _MOJIBAKE_SHARE
+        self.journals = np.array(
+            [j + _MOJIBAKE if m else j for j, m in zip(journals, mojibake)], dtype=object
+        )
+        self.journal_weights = _zipf_weights(n_journals)
+
+        # Every day in every format: dates are picked from this table
+        days = pd.to_datetime(_FIRST_DAY + np.arange(_N_DAYS))
+        self.dates = np.stack([days.strftime(fmt).to_numpy(object) for fmt in DATE_FORMATS], 1)
+
+
+def make_drugs(n_drugs: int, seed: int = 0) -> pd.DataFrame:
+    """``n_drugs`` distinct drugs: 7-character ATC-like codes, upper case names."""
+    rng = np.random.default_rng([seed, 0])
+    names: Dict[str, None] = {}
+    while len(names) < n_drugs:
+        stems = rng.integers(1, 4, n_drugs)
+        for k in stems:
+            stem = "".join(rng.choice(_STEMS, k))
+            name = stem + str(rng.choice(_MIDDLES)) + str(rng.choice(_SUFFIXES))
+            if len(names) < n_drugs and 6 <= len(name) <= 20:
+                names[name.upper()] = None
+
+    letters = np.array(list("ABCDGHJLMNPRSV"), dtype=object)
+    codes: Dict[str, None] = {}
+    while len(codes) < n_drugs:
+        code = (
+            str(rng.choice(letters))
+            + f"{rng.integers(1, 100):02d}"
+            + "".join(rng.choice(letters, 2))
+            + f"{rng.integers(1, 100):02d}"
+        )
+        codes[code] = None
+    return pd.DataFrame({"atccode": list(codes), "drug": list(names)})
+
+
+def _titles(rng: np.random.Generator, vocab: _Vocabulary, n: int) -> np.ndarray:
+    lo, hi = _TITLE_WORDS
+    n_words = rng.integers(lo, hi + 1, n)
+    picks = rng.choice(len(vocab.words), (n, hi), p=vocab.word_weights)
+    words = vocab.words[picks]
+    words[:, 0] = vocab.first_words[picks[:, 0]]
+    # Mentions replace a random word (the second one, another word)
+    for share in (MENTION_SHARE, MENTION_SHARE * SECOND_MENTION_SHARE):
+        rows = np.flatnonzero(rng.random(n) < share)
+        pos = rng.integers(0, n_words[rows])
+        picks = rng.choice(len(vocab.mentions), len(rows), p=vocab.mention_weights)
+        words[rows, pos] = vocab.mentions[picks]
+
+    titles = words[:, 0]
+    for j in range(1, hi):
+        titles = np.where(j < n_words, titles + " " + words[:, j], titles)
+    # A few titles with stray whitespace around them
+    padded = rng.random(n) < 0.01
+    titles[padded] = " " + titles[padded] + "  "
+    return titles
+
+
+def _documents(
+    rng: np.random.Generator, vocab: _Vocabulary, ids: np.ndarray, title_col: str
+) -> pd.DataFrame:
+    n = len(ids)
+    journals = vocab.journals[rng.choice(len(vocab.journals), n, p=vocab.journal_weights)]
+    journals[rng.random(n) < MISSING_JOURNAL_SHARE] = ""
+    days = rng.integers(0, _N_DAYS, n)
+    formats = rng.integers(0, len(DATE_FORMATS), n)
+    return pd.DataFrame(
+        {
+            "id": ids,
+            title_col: _titles(rng, vocab, n),
+            "journal": journals,
+            "date": vocab.dates[days, formats],
+        }
+    )
+
+
+def _iter_documents(
+    vocab: _Vocabulary,
+    n_docs: int,
+    seed: int,
+    stream: int,
+    ids: Any,
+    title_col: str = "title",
+) -> Iterator[pd.DataFrame]:
+    """Raw documents in frames of ``BLOCK_ROWS``, ``ids(start, stop)`` giving their ids."""
+    for block, start in enumerate(range(0, n_docs, BLOCK_ROWS)):
+        stop = min(start + BLOCK_ROWS, n_docs)
+        rng = np.random.default_rng([seed, stream, block])
+        yield _documents(rng, vocab, ids(start, stop), title_col)
+
+
+def _vocabulary(drugs: pd.DataFrame, n_docs: int, seed: int) -> _Vocabulary:
+    rng = np.random.default_rng([seed, 1])
+    return _Vocabulary(rng, drugs["drug"].tolist(), max(20, n_docs // 200))
+
+
+def make_corpus(
+    n_docs: int, n_drugs: int = 1_000, seed: int = 0
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Raw drugs, PubMed and clinical trials frames, as read from the files.
+
+    In memory, for micro-benchmarks: PubMed takes 80% of the documents,
+    without the JSON feed quirks. Dates and ids are strings, like the
+    readers return them.
+    """
+    drugs = make_drugs(n_drugs, seed)
+    vocab = _vocabulary(drugs, n_docs, seed)
+    n_pubmed = int(n_docs * (PUBMED_CSV_SHARE + PUBMED_JSON_SHARE))
+    pubmed = pd.concat(
+        _iter_documents(vocab, n_pubmed, seed, 2, lambda a, b: np.arange(a, b) + 1),
+        ignore_index=True,
+    )
+    trials = pd.concat(
+        _iter_documents(vocab, n_docs - n_pubmed, seed, 6, _trial_ids, "scientific_title"),
+        ignore_index=True,
+    )
+    for df in (pubmed, trials):
+        df["id"] = df["id"].astype(str)
+        df["journal"] = df["journal"].replace("", np.nan)
+    return drugs, pubmed, trials
+
+
+def _trial_ids(start: int, stop: int) -> np.ndarray:
+    return np.char.add("NCT", np.char.zfill((np.arange(start, stop) + 1).astype(str), 8))
+
+
+def _feed_sizes(n_docs: int) -> Dict[str, int]:
+    n_csv = int(n_docs * PUBMED_CSV_SHARE)
+    n_json = int(n_docs * PUBMED_JSON_SHARE)
+    return {
+        "pubmed.csv": n_csv,
+        "pubmed.json": n_json,
+        "clinical_trials.csv": n_docs - n_csv - n_json,
+    }
+
+
+def _json_lines(docs: pd.DataFrame, rng: np.random.Generator) -> Iterator[str]:
+    blank = rng.random(len(docs)) < BLANK_ID_SHARE
+    for record, is_blank in zip(docs.to_dict(orient="records"), blank):
+        if is_blank:
+            record["id"] = ""
+        # Every record is followed by a comma, the last one too
+        yield "  " + json.dumps(record, ensure_ascii=False) + ",\n"
+
+
+def write_corpus(
+    out_dir: str | Path, n_docs: int, n_drugs: int = 1_000, seed: int = 0
+) -> Dict[str, Path]:
+    """Write the four input files of ``n_docs`` documents to ``out_dir``.
+
+    PubMed CSV, JSON and clinical trials take 70%, 10% and 20% of the
+    documents. Journals are drawn from a pool of one per 200 documents
+    (at least 20). A manifest of the options (``corpus.json``) is written
+    last: its presence means the files are complete.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / MANIFEST_NAME).unlink(missing_ok=True)
+    drugs = make_drugs(n_drugs, seed)
+    drugs.to_csv(out_dir / "drugs.csv", index=False)
+    vocab = _vocabulary(drugs, n_docs, seed)
+    sizes = _feed_sizes(n_docs)
+
+    # PubMed CSV, setting aside the documents republished in the JSON feed
+    republished: List[pd.DataFrame] = []
+    with open(out_dir / "pubmed.csv", "w", encoding="utf-8", newline="") as f:
+        docs_blocks = _iter_documents(
+            vocab, sizes["pubmed.csv"], seed, 2, lambda a, b: np.arange(a, b) + 1
+        )
+        for block, docs in enumerate(docs_blocks):
+            docs.to_csv(f, index=False, header=block == 0)
+            rng = np.random.default_rng([seed, 3, block])
+            republished.append(docs[rng.random(len(docs)) < DUPLICATE_SHARE])
+    if not sizes["pubmed.csv"]:
+        pd.DataFrame(columns=["id", "title", "journal", "date"]).to_csv(
+            out_dir / "pubmed.csv", index=False
+        )
+
+    # PubMed JSON: ids follow the CSV ones; republished documents are spread
+    # over the blocks, replacing new ones
+    n_json = sizes["pubmed.json"]
+    duplicates = pd.concat(republished) if republished else None
+    first_id = sizes["pubmed.csv"] + 1
+    with open(out_dir / "pubmed.json", "w", encoding="utf-8") as f:
+        f.write("[\n")
+        docs_blocks = _iter_documents(
+            vocab, n_json, seed, 4, lambda a, b: np.arange(a, b) + first_id
+        )
+        for block, docs in enumerate(docs_blocks):
+            rng = np.random.default_rng([seed, 5, block])
+            if duplicates is not None and len(duplicates):
+                share = min(len(docs), -(-len(duplicates) * len(docs) // max(n_json, 1)))
+                rows = rng.choice(len(docs), share, replace=False)
+                picks = duplicates.iloc[rng.integers(0, len(duplicates), share)]
+                docs.iloc[rows] = picks.to_numpy()
+            f.writelines(_json_lines(docs, rng))
+        f.write("]\n")
+
+    with open(out_dir / "clinical_trials.csv", "w", encoding="utf-8", newline="") as f:
+        docs_blocks = _iter_documents(
+            vocab,
+            sizes["clinical_trials.csv"],
+            seed,
+            6,
+            _trial_ids,
+            title_col="scientific_title",
+        )
+        for block, docs in enumerate(docs_blocks):
+            docs.to_csv(f, index=False, header=block == 0)
+    if not sizes["clinical_trials.csv"]:
+        pd.DataFrame(columns=["id", "scientific_title", "journal", "date"]).to_csv(
+            out_dir / "clinical_trials.csv", index=False
+        )
+
+    manifest = corpus_config(n_docs, n_drugs, seed)
+    with open(out_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return {name: out_dir / name for name in CORPUS_FILES}
+
+
+def corpus_config(n_docs: int, n_drugs: int, seed: int) -> Dict[str, Any]:
+    """Options identifying a generated corpus (the content of its manifest)."""
+    return {"version": GENERATOR_VERSION, "docs": n_docs, "drugs": n_drugs, "seed": seed}
+
+
+def read_manifest(out_dir: str | Path) -> Optional[Dict[str, Any]]:
+    """Options of the corpus in ``out_dir``, or ``None`` if it is missing or incomplete."""
+    path = Path(out_dir) / MANIFEST_NAME
+    if not path.is_file():
+        return None
+    with open(path, encoding="utf-8") as f:
+        manifest: Dict[str, Any] = json.load(f)
+    return manifest
+
+
+def ensure_corpus(
+    out_dir: str | Path, n_docs: int, n_drugs: int = 1_000, seed: int = 0
+) -> Dict[str, Path]:
+    """Like ``write_corpus``, unless ``out_dir`` already holds that corpus."""
+    if read_manifest(out_dir) != corpus_config(n_docs, n_drugs, seed):
+        return write_corpus(out_dir, n_docs, n_drugs, seed)
+    return {name: Path(out_dir) / name for name in CORPUS_FILES}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--drugs", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    for name, path in ensure_corpus(args.out, args.docs, args.drugs, args.seed).items():
+        print(f"{name:>20} {path.stat().st_size / (1 << 20):>10.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import functools
+import json
+import logging
 import os
+import re
 import sys
-
-import pandas as pd
+import tempfile
+from itertools import chain
 
 # Add repo root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -11,31 +15,276 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from datetime import datetime, timedelta
 from pathlib import Path
 
+import numpy as np
 from airflow.decorators import dag, task
+from airflow.operators.python import get_current_context
 from airflow.sensors.filesystem import FileSensor
 
-from src.medmentions.intermediary_io import load_df_csv, save_df_csv
-from src.medmentions.mentions import build_graph_df, compute_mentions
-from src.medmentions.normalizers import normalize_drugs, normalize_pubmed, normalize_trials
+from src.medmentions.aggregates import JournalDrugAggregates, save_aggregates
+from src.medmentions.cache import ArtifactCache, cache_key, file_digest, link_file
+from src.medmentions.coded_graph import CodedGraph, save_coded_graph
+from src.medmentions.dedup import Deduplicator, dedup_keys
+from src.medmentions.drug_matcher import (
+    MATCHER_FORMAT_VERSION,
+    DrugMatcher,
+    load_matcher,
+    save_matcher,
+)
+from src.medmentions.duckdb_mentions import compute_mentions_duckdb
+from src.medmentions.incremental import doc_fingerprints, load_state, save_state, update_mentions
+from src.medmentions.intermediary_io import (
+    concat_df_files,
+    iter_df_chunks,
+    load_df,
+    save_df,
+    save_df_chunks,
+)
+from src.medmentions.mentions import iter_mentions, merge_edge_parts
+from src.medmentions.metrics import collect
+from src.medmentions.normalizers import (
+    NORMALIZER_VERSION,
+    normalize_drugs,
+    normalize_pubmed,
+    normalize_trials,
+)
 from src.medmentions.readers import (
-    read_clinical_trials_csv,
+    iter_clinical_trials_csv,
+    iter_pubmed_csv,
+    iter_pubmed_json,
     read_drugs_csv,
-    read_pubmed_csv,
-    read_pubmed_json,
 )
-from src.medmentions.writers import write_graph
+from src.medmentions.writers import write_graph_stream
 
 DATA_DIR = Path(os.environ.get("PIPELINE_DATA_DIR", "/usr/local/airflow/include"))
 INTER_DIR = Path(os.environ.get("PIPELINE_INTER_DIR", "/usr/local/airflow/data/intermediary"))
 OUT_DIR = Path(os.environ.get("PIPELINE_PROCESSED_DIR", "/usr/local/airflow/data/processed"))
+# One of medmentions.mentions.MATCH_MODES: substring | word | phrase
+MATCH_MODE = os.environ.get("PIPELINE_MATCH_MODE", "substring")
+# One of medmentions.intermediary_io.INTER_FORMATS: parquet | feather | csv
+INTER_FORMAT = os.environ.get("PIPELINE_INTER_FORMAT", "parquet")
+# Rows per chunk when streaming the corpora: bounds the tasks' peak memory
+CHUNK_SIZE = int(os.environ.get("PIPELINE_CHUNK_SIZE", "100000"))
+# Worker processes matching titles in parallel (1: serial)
+N_WORKERS = int(os.environ.get("PIPELINE_WORKERS", "1"))
+# Engine matching the drugs in the titles: pandas (chunk by chunk, in process) |
+# duckdb (one SQL query per partition over the intermediates, PIPELINE_WORKERS
+# threads; requires the duckdb package). Both give the same edges
+MENTIONS_BACKEND = os.environ.get("PIPELINE_MENTIONS_BACKEND", "pandas")
+# Only match new/changed documents and new drugs against the previous run's edges
+# (pandas backend)
+INCREMENTAL = os.environ.get("PIPELINE_INCREMENTAL", "1") == "1"
+# graph.json without indentation / gzip-compressed (graph.json.gz)
+GRAPH_COMPACT = os.environ.get("PIPELINE_GRAPH_COMPACT", "0") == "1"
+GRAPH_GZIP = os.environ.get("PIPELINE_GRAPH_GZIP", "0") == "1"
+# records: graph.json (default) | coded-json: graph.coded.json | coded-arrow: graph.coded/
+# (integer-coded nodes, see medmentions.coded_graph)
+GRAPH_FORMAT = os.environ.get("PIPELINE_GRAPH_FORMAT", "records")
+# Row ranges of the corpora matched by separate mapped tasks
+N_PARTITIONS = int(os.environ.get("PIPELINE_PARTITIONS", "4"))
+# Reuse the normalized intermediates of unchanged input files (by content hash)
+NORMALIZE_CACHE = os.environ.get("PIPELINE_NORMALIZE_CACHE", "1") == "1"
+# Cache retention: entries kept, least recently used evicted first, and
+# maximum days since last use (0: no limit)
+CACHE_MAX_ENTRIES = int(os.environ.get("PIPELINE_CACHE_MAX_ENTRIES", "20"))
+CACHE_MAX_AGE_DAYS = float(os.environ.get("PIPELINE_CACHE_MAX_AGE_DAYS", "30"))
+# Per-stage wall time, rows and peak RSS of each task: logged, pushed to XCom
+# and saved as metrics/<run_id>.json next to the outputs
+METRICS = os.environ.get("PIPELINE_METRICS", "1") == "1"
+# Also per-stage memory peaks (tracemalloc): slows the tasks down
+METRICS_TRACEMALLOC = os.environ.get("PIPELINE_METRICS_TRACEMALLOC", "0") == "1"
 
 
-OUT_JSON = OUT_DIR / "graph.json"
-DRUGS_INTER = INTER_DIR / "drugs_normalized.csv"
-PUBMED_INTER = INTER_DIR / "pubmed_normalized.csv"
-TRIALS_INTER = INTER_DIR / "trials_normalized.csv"
-MENTIONS_INTER = INTER_DIR / "mentions_edges.csv"
+OUT_JSON = OUT_DIR / ("graph.json.gz" if GRAPH_GZIP else "graph.json")
+OUT_CODED = {"coded-json": OUT_DIR / "graph.coded.json", "coded-arrow": OUT_DIR / "graph.coded"}
+DRUGS_INTER = INTER_DIR / f"drugs_normalized.{INTER_FORMAT}"
+# Normalized drugs compiled for matching, memory-mapped by the mention tasks
+DRUGS_MATCHER = INTER_DIR / "drugs.matcher"
+PUBMED_INTER = INTER_DIR / f"pubmed_normalized.{INTER_FORMAT}"
+TRIALS_INTER = INTER_DIR / f"trials_normalized.{INTER_FORMAT}"
+MENTIONS_INTER = INTER_DIR / f"mentions_edges.{INTER_FORMAT}"
+MENTIONS_PARTS_DIR = INTER_DIR / "mentions_parts"
+# Partition of each row of the intermediates, by content hash
+PUBMED_PARTITIONS = MENTIONS_PARTS_DIR / "pubmed.partitions.npy"
+TRIALS_PARTITIONS = MENTIONS_PARTS_DIR / "trials.partitions.npy"
 TOP_JOURNAL_JSON = INTER_DIR / "top_journal.json"
+AGGREGATES = INTER_DIR / "journal_drug.aggregates.npz"
+CACHE_DIR = INTER_DIR / "cache"
+METRICS_DIR = OUT_DIR / "metrics"
+# Dedup keys of the normalized rows, next to them in the PubMed cache entries
+PUBMED_KEYS_NAME = "pubmed_dedup_keys.npy"
+
+log = logging.getLogger(__name__)
+
+
+def _normalize_to_intermediate(chunks, normalize, inter_path):
+    """Normalize raw chunks into an intermediate file, one chunk in memory at a time."""
+    save_df_chunks((normalize(chunk) for chunk in chunks), inter_path)
+
+
+def _save_drugs(drugs, out_dir):
+    """Save the normalized drugs and their compiled matcher."""
+    save_df(drugs, out_dir / DRUGS_INTER.name)
+    save_matcher(DrugMatcher.build(drugs), out_dir / DRUGS_MATCHER.name)
+
+
+def _normalize_drugs_file(source, out_dir):
+    _save_drugs(normalize_drugs(read_drugs_csv(source), inplace=True), out_dir)
+
+
+def _normalize_pubmed_file(source, out_dir):
+    iter_chunks = iter_pubmed_json if source.suffix == ".json" else iter_pubmed_csv
+    keys = [np.empty(0, dtype=np.uint64)]
+
+    def normalize(chunk):
+        out = normalize_pubmed(chunk, inplace=True)
+        keys.append(dedup_keys(out, "title"))
+        return out
+
+    _normalize_to_intermediate(
+        iter_chunks(source, CHUNK_SIZE), normalize, out_dir / PUBMED_INTER.name
+    )
+    np.save(out_dir / PUBMED_KEYS_NAME, np.concatenate(keys))
+
+
+def _normalize_trials_file(source, out_dir):
+    _normalize_to_intermediate(
+        iter_clinical_trials_csv(source, CHUNK_SIZE),
+        functools.partial(normalize_trials, inplace=True),
+        out_dir / TRIALS_INTER.name,
+    )
+
+
+def _log_duplicates(name, dedup):
+    log.info("%s: dropped %d duplicate documents of %d", name, dedup.n_dropped, dedup.n_rows)
+
+
+def _stack_pubmed(part_dirs, out_dir):
+    """Stack the normalized PubMed intermediates in order.
+
+    Documents of the two feeds are deduplicated on the keys saved with them.
+    """
+    dedup = Deduplicator("title")
+    keep = dedup.keep_keys(np.concatenate([np.load(d / PUBMED_KEYS_NAME) for d in part_dirs]))
+    _log_duplicates("pubmed", dedup)
+    concat_df_files(
+        [d / PUBMED_INTER.name for d in part_dirs],
+        out_dir / PUBMED_INTER.name,
+        CHUNK_SIZE,
+        keep=keep if dedup.n_dropped else None,
+    )
+
+
+def _cached_normalize(cache, name, normalize_file, *artifact_versions):
+    """Key and cache entry of the input file ``name`` normalized by ``normalize_file``.
+
+    ``artifact_versions`` are the format versions of what the entry holds
+    besides the intermediate (the compiled drugs): only entries holding
+    that artifact are rebuilt when it changes.
+    """
+    source = DATA_DIR / name
+    key = cache_key(name, file_digest(source), NORMALIZER_VERSION, *artifact_versions, INTER_FORMAT)
+    return key, cache.get_or_build(key, lambda out: normalize_file(source, out), label=name)
+
+
+def _normalize_inputs_cached(cache):
+    """Normalize the inputs through ``cache``, then link the entries at the intermediates.
+
+    Each input file has its own entry, keyed on its content: only changed
+    files are normalized again. The two PubMed entries are then stacked
+    into an entry of their own.
+    """
+    _, drugs = _cached_normalize(cache, "drugs.csv", _normalize_drugs_file, MATCHER_FORMAT_VERSION)
+    pubmed_parts = [
+        _cached_normalize(cache, name, _normalize_pubmed_file)
+        for name in ("pubmed.csv", "pubmed.json")
+    ]
+    _, trials = _cached_normalize(cache, "clinical_trials.csv", _normalize_trials_file)
+    pubmed = cache.get_or_build(
+        cache_key("pubmed", *(key for key, _ in pubmed_parts)),
+        lambda out: _stack_pubmed([entry for _, entry in pubmed_parts], out),
+        label="pubmed",
+    )
+
+    for path in (DRUGS_INTER, DRUGS_MATCHER):
+        link_file(drugs / path.name, path)
+    link_file(pubmed / PUBMED_INTER.name, PUBMED_INTER)
+    link_file(trials / TRIALS_INTER.name, TRIALS_INTER)
+
+
+def _replace_json(obj, path):
+    """Write ``obj`` to a temporary file of this writer only, then rename it to ``path``."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, prefix=f"{path.name}.", suffix=".tmp", delete=False
+    ) as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(f.name, path)
+
+
+def _save_task_metrics(ti, report):
+    """Save the metrics of a task, then those of its run: all its task files merged."""
+    run = re.sub(r"[^\w.-]", "_", ti.run_id)
+    task_name = ti.task_id if ti.map_index < 0 else f"{ti.task_id}.{ti.map_index}"
+    # Written aside then renamed: mapped tasks may be merging the files
+    # meanwhile. The last task of the run merges after all the others.
+    _replace_json(report, METRICS_DIR / run / f"{task_name}.json")
+    tasks = {
+        path.name[: -len(".json")]: json.loads(path.read_text(encoding="utf-8"))
+        for path in sorted((METRICS_DIR / run).glob("*.json"))
+    }
+    _replace_json({"run_id": ti.run_id, "tasks": tasks}, METRICS_DIR / f"{run}.json")
+
+
+def _with_metrics(func):
+    """Record the ``medmentions`` stages run by a task (see ``PIPELINE_METRICS``)."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not METRICS:
+            return func(*args, **kwargs)
+        with collect(trace_memory=METRICS_TRACEMALLOC) as recorder:
+            result = func(*args, **kwargs)
+        report = recorder.report()
+        for name, stats in report["stages"].items():
+            log.info("stage %s: %s", name, stats)
+        ti = get_current_context()["ti"]
+        ti.xcom_push(key="metrics", value=report)
+        _save_task_metrics(ti, report)
+        return result
+
+    return wrapper
+
+
+def _assign_partitions(path, title_col, out_path):
+    """Save the partition of each row of an intermediate, a hash of its content.
+
+    Unlike row ranges, a row keeps its partition when rows are added or
+    removed before it, so incremental runs only rematch what changed.
+    """
+    parts = [
+        (doc_fingerprints(chunk, title_col) % N_PARTITIONS).astype(np.uint16)
+        for chunk in iter_df_chunks(path, CHUNK_SIZE)
+    ]
+    np.save(out_path, np.concatenate(parts) if parts else np.empty(0, dtype=np.uint16))
+
+
+def _iter_partition(path, assignment_path, part):
+    """Chunks of an intermediate, restricted to the rows of partition ``part``."""
+    assignment = np.load(assignment_path, mmap_mode="r")
+    for chunk in iter_df_chunks(path, CHUNK_SIZE):
+        yield chunk[assignment[chunk.index] == part]
+
+
+def _load_previous_mentions(edges_path, state_path):
+    """Edges and state of the previous run, or ``(None, None)`` to start from scratch."""
+    if not (edges_path.exists() and state_path.exists()):
+        return None, None
+    try:
+        state = load_state(state_path)
+    except ValueError:  # written by another pipeline version
+        return None, None
+    return load_df(edges_path), state
+
 
 default_args = {
     "owner": "servier",
@@ -91,55 +340,144 @@ def drug_mentions_dag():
 
     # --- TaskFlow tasks ---
     @task(task_id="read_and_normalize_to_csv")
+    @_with_metrics
     def read_and_normalize_to_csv():
-        # Read
-        drugs = read_drugs_csv(DATA_DIR / "drugs.csv")
-        pubmed = pd.concat(
-            [
-                read_pubmed_csv(DATA_DIR / "pubmed.csv"),
-                read_pubmed_json(DATA_DIR / "pubmed.json"),
-            ],
-            ignore_index=True,
+        if NORMALIZE_CACHE:
+            cache = ArtifactCache(CACHE_DIR, CACHE_MAX_ENTRIES, CACHE_MAX_AGE_DAYS * 86400 or None)
+            _normalize_inputs_cached(cache)
+            cache.evict()
+            return
+
+        # Intermediates may be links into the cache: replace, never overwrite
+        for path in (DRUGS_INTER, DRUGS_MATCHER, PUBMED_INTER, TRIALS_INTER):
+            path.unlink(missing_ok=True)
+
+        # Drugs are small: read and normalize in one go. Raw frames are
+        # normalized in place: each raw column is freed once normalized
+        _save_drugs(
+            normalize_drugs(read_drugs_csv(DATA_DIR / "drugs.csv"), inplace=True), INTER_DIR
         )
-        trials = read_clinical_trials_csv(DATA_DIR / "clinical_trials.csv")
 
-        # Normalize
-        drugs_n = normalize_drugs(drugs)
-        pubmed_n = normalize_pubmed(pubmed)
-        trials_n = normalize_trials(trials)
+        # Corpora are streamed chunk by chunk: read -> normalize -> append
+        pubmed_chunks = chain(
+            iter_pubmed_csv(DATA_DIR / "pubmed.csv", CHUNK_SIZE),
+            iter_pubmed_json(DATA_DIR / "pubmed.json", CHUNK_SIZE),
+        )
+        trials_chunks = iter_clinical_trials_csv(DATA_DIR / "clinical_trials.csv", CHUNK_SIZE)
+
+        # The two PubMed feeds overlap: duplicate documents are dropped
+        # before matching
+        dedup = Deduplicator("title")
+        _normalize_to_intermediate(
+            pubmed_chunks, lambda chunk: dedup(normalize_pubmed(chunk, inplace=True)), PUBMED_INTER
+        )
+        _log_duplicates("pubmed", dedup)
+        _normalize_to_intermediate(
+            trials_chunks, functools.partial(normalize_trials, inplace=True), TRIALS_INTER
+        )
 
-        # Persist intermediates (ensure dirs exist)
-        DRUGS_INTER.parent.mkdir(parents=True, exist_ok=True)
-        PUBMED_INTER.parent.mkdir(parents=True, exist_ok=True)
-        TRIALS_INTER.parent.mkdir(parents=True, exist_ok=True)
+    @task(task_id="plan_partitions")
+    @_with_metrics
+    def plan_partitions():
+        # Parts of a previous run with more partitions are not merged again
+        for stale in MENTIONS_PARTS_DIR.glob("part-*"):
+            if int(stale.name.split(".")[0].split("-")[1]) >= N_PARTITIONS:
+                stale.unlink()
 
-        save_df_csv(drugs_n, DRUGS_INTER)
-        save_df_csv(pubmed_n, PUBMED_INTER)
-        save_df_csv(trials_n, TRIALS_INTER)
+        # One partition per mapped task: the rows of each corpus whose hash
+        # falls in it
+        MENTIONS_PARTS_DIR.mkdir(parents=True, exist_ok=True)
+        _assign_partitions(PUBMED_INTER, "title", PUBMED_PARTITIONS)
+        _assign_partitions(TRIALS_INTER, "scientific_title", TRIALS_PARTITIONS)
+        return [{"part": i} for i in range(N_PARTITIONS)]
 
-    @task(task_id="compute_mentions_and_write_outputs")
-    def compute_mentions_and_write_outputs():
-        # Load intermediates
-        drugs_n = load_df_csv(DRUGS_INTER)
-        pubmed_n = load_df_csv(PUBMED_INTER)
-        trials_n = load_df_csv(TRIALS_INTER)
+    @task(task_id="compute_partition_mentions")
+    @_with_metrics
+    def compute_partition_mentions(partition):
+        part = partition["part"]
+        edges_path = MENTIONS_PARTS_DIR / f"part-{part:04d}.{INTER_FORMAT}"
+        state_path = MENTIONS_PARTS_DIR / f"part-{part:04d}.state.npz"
 
-        # Mentions
-        mentions = compute_mentions(drugs_n, pubmed_n, trials_n)
-        save_df_csv(mentions, MENTIONS_INTER)
+        if MENTIONS_BACKEND == "duckdb":
+            edges = compute_mentions_duckdb(
+                DRUGS_INTER,
+                PUBMED_INTER,
+                TRIALS_INTER,
+                match_mode=MATCH_MODE,
+                pubmed_rows=np.flatnonzero(np.load(PUBMED_PARTITIONS) == part),
+                trials_rows=np.flatnonzero(np.load(TRIALS_PARTITIONS) == part),
+                chunk_size=CHUNK_SIZE,
+                threads=N_WORKERS,
+            )
+            state_path.unlink(missing_ok=True)
+            save_df(edges, edges_path)
+            return str(edges_path)
+
+        # Mapped, not rebuilt: every partition task shares the compiled drugs
+        drug_matcher = load_matcher(DRUGS_MATCHER)
+        drugs_n = drug_matcher.drugs
+        pubmed_chunks = _iter_partition(PUBMED_INTER, PUBMED_PARTITIONS, part)
+        trials_chunks = _iter_partition(TRIALS_INTER, TRIALS_PARTITIONS, part)
+        if INCREMENTAL:
+            previous_edges, previous_state = _load_previous_mentions(edges_path, state_path)
+            edges, state = update_mentions(
+                drugs_n,
+                pubmed_chunks,
+                trials_chunks,
+                previous_edges,
+                previous_state,
+                match_mode=MATCH_MODE,
+                n_workers=N_WORKERS,
+                drug_matcher=drug_matcher,
+            )
+            # Drop the state first: it must never describe other edges
+            state_path.unlink(missing_ok=True)
+            save_df(edges, edges_path)
+            save_state(state, state_path)
+        else:
+            # Streamed chunk by chunk
+            edges = iter_mentions(
+                drugs_n,
+                pubmed_chunks,
+                trials_chunks,
+                match_mode=MATCH_MODE,
+                n_workers=N_WORKERS,
+                drug_matcher=drug_matcher,
+            )
+            state_path.unlink(missing_ok=True)
+            save_df_chunks(edges, edges_path)
+        return str(edges_path)
+
+    @task(task_id="merge_mentions_and_write_outputs")
+    @_with_metrics
+    def merge_mentions_and_write_outputs(part_paths):
+        # Parts come in map index order: edges are grouped by partition
+        mentions = merge_edge_parts(load_df(path) for path in part_paths)
+        save_df(mentions, MENTIONS_INTER)
 
         # Graph + top journal
         OUT_DIR.mkdir(parents=True, exist_ok=True)
         INTER_DIR.mkdir(parents=True, exist_ok=True)
 
-        graph = build_graph_df(mentions)
-        write_graph(graph, OUT_JSON)
+        if GRAPH_FORMAT in OUT_CODED:
+            save_coded_graph(CodedGraph.from_edges(mentions), OUT_CODED[GRAPH_FORMAT])
+        elif GRAPH_FORMAT == "records":
+            # Streamed: the graph is never built in memory
+            write_graph_stream(mentions, OUT_JSON, compact=GRAPH_COMPACT)
+        else:
+            raise ValueError(f"Unknown PIPELINE_GRAPH_FORMAT {GRAPH_FORMAT!r}")
+
+        # Journal/drug aggregates: ad-hoc questions answer without the edges
+        save_aggregates(JournalDrugAggregates.build(mentions), AGGREGATES)
 
     rn = read_and_normalize_to_csv()
-    cw = compute_mentions_and_write_outputs()
+    partitions = plan_partitions()
+    part_paths = compute_partition_mentions.expand(partition=partitions)
+    mw = merge_mentions_and_write_outputs(part_paths)
 
-    # Dependencies: all sensors -> rn -> cw
-    [wait_drugs, wait_pubmed_csv, wait_pubmed_json, wait_trials] >> rn >> cw
+    # Dependencies: all sensors -> rn -> plan -> mapped partitions -> merge
+    [wait_drugs, wait_pubmed_csv, wait_pubmed_json, wait_trials] >> rn >> partitions
+    part_paths >> mw
 
 
 dag = drug_mentions_dag()
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .metrics import instrument
+from .utils import decode_strings, encode_strings, factorize_sorted
+
+# Bump when the on-disk layout of ``save_aggregates`` changes
+AGGREGATES_FORMAT_VERSION = 2
+
+
+class JournalDrugAggregates:
+    """Journal x drug aggregates of an edge set, for ad-hoc questions.
+
+    Drugs (by atccode) and journals are numbered in sorted order; ``drugs``
+    and ``journals`` hold their names (object arrays). Edges without a
+    journal are left out.
+
+    - ``bitsets[j]`` is the distinct-drug set of journal ``j``: bit ``d`` of
+      the row (``np.packbits`` order) is set when drug ``d`` appears in it,
+      and ``journal_drug_counts[j]`` is the number of set bits
+    - drug -> journal adjacency, in CSR layout:
+      ``drug_journals[drug_offsets[d]:drug_offsets[d + 1]]`` are the sorted
+      journals of drug ``d`` and ``drug_mentions`` the number of edges
+      behind each of these (drug, journal) pairs
+
+    Build it with :meth:`build` and persist it with :func:`save_aggregates`:
+    queries then run without the edges.
+    """
+
+    def __init__(
+        self,
+        drugs: np.ndarray,
+        journals: np.ndarray,
+        bitsets: np.ndarray,
+        journal_drug_counts: np.ndarray,
+        drug_offsets: np.ndarray,
+        drug_journals: np.ndarray,
+        drug_mentions: np.ndarray,
+    ) -> None:
+        self.drugs = drugs
+        self.journals = journals
+        self.bitsets = bitsets
+        self.journal_drug_counts = journal_drug_counts
+        self.drug_offsets = drug_offsets
+        self.drug_journals = drug_journals
+        self.drug_mentions = drug_mentions
+        self._drug_ids: Dict[str, int] = {d: i for i, d in enumerate(drugs.tolist())}
+        self._journal_ids: Dict[str, int] = {j: i for i, j in enumerate(journals.tolist())}
+
+    @classmethod
+    @instrument
+    def build(cls, edges: pd.DataFrame) -> JournalDrugAggregates:
+        drug_codes, drugs = factorize_sorted(edges["drug_atccode"])
+        journal_codes, journals = factorize_sorted(edges["journal"])
+        n_drugs, n_journals = len(drugs), len(journals)
+        keep = (drug_codes >= 0) & (journal_codes >= 0)
+
+        # Distinct (journal, drug) pairs sorted by journal then drug, with edge counts
+        pairs, mentions = np.unique(
+            journal_codes[keep].astype(np.int64) * max(n_drugs, 1) + drug_codes[keep],
+            return_counts=True,
+        )
+        pair_journals, pair_drugs = np.divmod(pairs, max(n_drugs, 1))
+
+        bitsets = np.zeros((n_journals, (n_drugs + 7) // 8), dtype=np.uint8)
+        np.bitwise_or.at(
+            bitsets, (pair_journals, pair_drugs >> 3), (0x80 >> (pair_drugs & 7)).astype(np.uint8)
+        )
+
+        by_drug = np.lexsort((pair_journals, pair_drugs))
+        return cls(
+            drugs=drugs,
+            journals=journals,
+            bitsets=bitsets,
+            journal_drug_counts=np.bincount(pair_journals, minlength=n_journals).astype(np.int64),
+            drug_offsets=np.searchsorted(pair_drugs[by_drug], np.arange(n_drugs + 1)),
+            drug_journals=pair_journals[by_drug],
+            drug_mentions=mentions[by_drug].astype(np.int64),
+        )
+
+    def _drug_set(self, journal: int) -> np.ndarray:
+        return np.unpackbits(self.bitsets[journal], count=len(self.drugs)).astype(bool)
+
+    def top_journals(self, k: int = 10) -> List[Dict[str, Any]]:
+        """The ``k`` journals mentioning the most distinct drugs (ties by name)."""
+        order = np.argsort(-self.journal_drug_counts, kind="stable")[:k]
+        return [
+            {"journal": self.journals[j], "distinct_drugs": int(self.journal_drug_counts[j])}
+            for j in order
+        ]
+
+    def journal_with_most_distinct_drugs(self) -> Dict[str, Any]:
+        """``mentions.journal_with_most_distinct_drugs`` on the edges, ties broken by name."""
+        top = self.top_journals(1)
+        return top[0] if top else {"journal": None, "distinct_drugs": 0}
+
+    def drugs_in_journal(self, journal: str) -> List[str]:
+        """Atccodes of the distinct drugs mentioned in ``journal`` (sorted)."""
+        j = self._journal_ids.get(journal)
+        if j is None:
+            return []
+        return self.drugs[self._drug_set(j)].tolist()
+
+    def top_journals_for_drug(self, drug: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Journals of ``drug`` by decreasing number of mentions (ties by name)."""
+        d = self._drug_ids.get(drug)
+        if d is None:
+            return []
+        lo, hi = self.drug_offsets[d], self.drug_offsets[d + 1]
+        journals, mentions = self.drug_journals[lo:hi], self.drug_mentions[lo:hi]
+        order = np.argsort(-mentions, kind="stable")[:k]
+        return [
+            {"journal": self.journals[j], "mentions": int(m)}
+            for j, m in zip(journals[order], mentions[order])
+        ]
+
+    def drugs_sharing_journals(self, drug: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Other drugs of the journals of ``drug``, by number of shared journals.
+
+        Ties are ordered by atccode.
+        """
+        d = self._drug_ids.get(drug)
+        if d is None:
+            return []
+        journals = self.drug_journals[self.drug_offsets[d] : self.drug_offsets[d + 1]]
+        shared = np.unpackbits(self.bitsets[journals], axis=1, count=len(self.drugs)).sum(
+            axis=0, dtype=np.int64
+        )
+        shared[d] = 0
+        others = np.flatnonzero(shared)
+        order = others[np.argsort(-shared[others], kind="stable")][:k]
+        return [{"drug": self.drugs[o], "shared_journals": int(shared[o])} for o in order]
+
+
+def save_aggregates(aggregates: JournalDrugAggregates, path: str | Path) -> str:
+    """Write ``aggregates`` as an ``.npz``; names are stored as UTF-8 bytes and offsets."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    drugs_bytes, drugs_offsets = encode_strings(aggregates.drugs)
+    journals_bytes, journals_offsets = encode_strings(aggregates.journals)
+    with open(path, "wb") as f:
+        np.savez(
+            f,
+            version=np.int64(AGGREGATES_FORMAT_VERSION),
+            drugs_bytes=drugs_bytes,
+            drugs_offsets=drugs_offsets,
+            journals_bytes=journals_bytes,
+            journals_offsets=journals_offsets,
+            bitsets=aggregates.bitsets,
+            journal_drug_counts=aggregates.journal_drug_counts,
+            drug_offsets=aggregates.drug_offsets,
+            drug_journals=aggregates.drug_journals,
+            drug_mentions=aggregates.drug_mentions,
+        )
+    return str(path)
+
+
+def load_aggregates(path: str | Path) -> JournalDrugAggregates:
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data["version"])
+        if version != AGGREGATES_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported aggregates format version {version} "
+                f"(expected {AGGREGATES_FORMAT_VERSION})"
+            )
+        return JournalDrugAggregates(
+            drugs=decode_strings(data["drugs_bytes"], data["drugs_offsets"]),
+            journals=decode_strings(data["journals_bytes"], data["journals_offsets"]),
+            bitsets=data["bitsets"],
+            journal_drug_counts=data["journal_drug_counts"],
+            drug_offsets=data["drug_offsets"],
+            drug_journals=data["drug_journals"],
+            drug_mentions=data["drug_mentions"],
+        )
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Leftovers of interrupted builds are removed by ``evict`` once this old (seconds)
+_STALE_BUILD_AGE = 3600
+
+
+def file_digest(path: str | Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of the content of ``path`` (hex), read in blocks of ``block_size`` bytes."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(*parts: object) -> str:
+    """Key of a cache entry: the SHA-256 of ``parts`` (file digests, versions, options)."""
+    return hashlib.sha256("\0".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+
+def link_file(src: str | Path, dst: str | Path) -> None:
+    """Expose the file ``src`` at ``dst``: a hard link, or a copy across filesystems.
+
+    ``dst`` is replaced, never written through: a file linked from a cache
+    entry must be unlinked, not overwritten, to be updated.
+    """
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class ArtifactCache:
+    """Content-addressed store of derived files, one directory per key under ``root``.
+
+    Keys (see :func:`cache_key`) cover everything the files depend on, so an
+    entry never needs invalidating: changed inputs give another key. Entries
+    are built in a temporary directory renamed to the key once complete, so
+    a failed build leaves nothing behind. A lookup refreshes the entry's
+    modification time, its last use for :meth:`evict`, which keeps at most
+    ``max_entries`` entries, none unused for more than ``max_age`` seconds
+    (``None``: no limit).
+    """
+
+    def __init__(
+        self, root: str | Path, max_entries: Optional[int] = None, max_age: Optional[float] = None
+    ) -> None:
+        self.root = Path(root)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        # Keys looked up or built through this instance: never evicted by it
+        self.used: Set[str] = set()
+
+    def get(self, key: str) -> Optional[Path]:
+        """Directory of the entry ``key``, or ``None`` if there is none."""
+        entry = self.root / key
+        if not entry.is_dir():
+            return None
+        os.utime(entry)
+        self.used.add(key)
+        return entry
+
+    def build(self, key: str, build: Callable[[Path], None]) -> Path:
+        """Create the entry ``key`` by calling ``build`` with the directory to fill."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".tmp-{key}-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        try:
+            build(tmp)
+            os.rename(tmp, self.root / key)
+        except OSError:
+            if not (self.root / key).is_dir():
+                raise
+            # Built concurrently by another process: theirs is as good
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.used.add(key)
+        return self.root / key
+
+    def get_or_build(self, key: str, build: Callable[[Path], None], label: str = "") -> Path:
+        """Entry ``key``, built by ``build`` if missing; hits and misses are logged."""
+        entry = self.get(key)
+        if entry is not None:
+            logger.info("%s: cache hit (%s)", label or key, key[:12])
+            return entry
+        logger.info("%s: cache miss (%s), building", label or key, key[:12])
+        return self.build(key, build)
+
+    def evict(self) -> List[str]:
+        """Drop entries beyond the retention limits, least recently used first.
+
+        Entries used through this instance are kept even beyond the limits.
+        Returns the evicted keys.
+        """
+        if not self.root.is_dir():
+            return []
+        now = time.time()
+        entries = []
+        for path in self.root.iterdir():
+            age = now - path.stat().st_mtime
+            if path.name.startswith(".tmp-"):
+                if age > _STALE_BUILD_AGE:
+                    shutil.rmtree(path, ignore_errors=True)
+            elif path.is_dir():
+                entries.append((path.name not in self.used, age, path))
+
+        evicted = []
+        # Used entries first, then by last use, most recent first
+        for rank, (unused, age, path) in enumerate(sorted(entries, key=lambda e: e[:2])):
+            too_many = self.max_entries is not None and rank >= self.max_entries
+            too_old = self.max_age is not None and age > self.max_age
+            if unused and (too_many or too_old):
+                shutil.rmtree(path, ignore_errors=True)
+                evicted.append(path.name)
+                logger.info("cache: evicted %s", path.name[:12])
+        return evicted
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .mentions import EDGE_COLUMNS
+from .metrics import instrument
+from .utils import factorize_sorted
+
+# Bump when the layout written by ``save_coded_graph`` changes
+CODED_GRAPH_FORMAT_VERSION = 1
+
+DRUG_COLUMNS = ["atccode", "name"]
+DOCUMENT_COLUMNS = ["source_type", "source_id", "title", "journal", "date"]
+
+# Tables of the Arrow layout, one IPC file each in the output directory
+_ARROW_TABLES = ["drugs", "journals", "documents", "edges"]
+
+
+def _row_codes(edges: pd.DataFrame, columns: List[str], sort: bool) -> np.ndarray:
+    """Number the distinct rows of ``edges[columns]``, missing values included.
+
+    Like ``groupby(columns, dropna=False).ngroup()``: rows are numbered in
+    sorted order (by value, missing last) or in first-seen order, and
+    categorical columns are only handled through their codes.
+    """
+    key = np.zeros(len(edges), dtype=np.int64)
+    for col in columns:
+        codes, uniques = factorize_sorted(edges[col]) if sort else pd.factorize(edges[col])
+        codes = np.where(codes < 0, len(uniques), codes)  # missing last
+        # Renumbered after each column, so that keys stay below len(edges)
+        key = key * (len(uniques) + 1) + codes
+        key = np.unique(key, return_inverse=True)[1] if sort else pd.factorize(key)[0]
+    return key.astype(np.int32)
+
+
+class CodedGraph:
+    """Mention graph with integer-coded nodes.
+
+    Unlike ``build_graph_df``, which repeats the drug, journal and document
+    strings on every edge, each node is stored once in a table and referred
+    to by its row number:
+
+    - ``drugs``: ``atccode``, ``name``, sorted by atccode
+    - ``journals``: distinct journal names, sorted (the ``journals`` list of
+      ``build_graph_df``)
+    - ``documents``: ``source_type``, ``source_id``, ``title``, ``date`` and
+      ``journal``, the row of the document's journal (-1 if it has none),
+      in first-seen order
+    - ``edge_drugs``, ``edge_docs``: parallel int32 arrays, the drug and
+      document rows of each edge, in edge order
+
+    Dates are normalized as in ``build_graph_df``. Build it with
+    :meth:`from_edges` and persist it with :func:`save_coded_graph`.
+    """
+
+    def __init__(
+        self,
+        drugs: pd.DataFrame,
+        journals: np.ndarray,
+        documents: pd.DataFrame,
+        edge_drugs: np.ndarray,
+        edge_docs: np.ndarray,
+    ) -> None:
+        self.drugs = drugs
+        self.journals = journals
+        self.documents = documents
+        self.edge_drugs = edge_drugs
+        self.edge_docs = edge_docs
+
+    @classmethod
+    @instrument
+    def from_edges(cls, edges: pd.DataFrame) -> CodedGraph:
+        edge_drugs = _row_codes(edges, ["drug_atccode", "drug_name"], sort=True)
+        edge_docs = _row_codes(
+            edges, ["source_type", "source_id", "source_title", "journal", "date"], sort=False
+        )
+
+        # Node tables from the first edge of each node, in node id order
+        drug_rows = edges.iloc[np.unique(edge_drugs, return_index=True)[1]]
+        drugs = pd.DataFrame(
+            {
+                "atccode": drug_rows["drug_atccode"].to_numpy(),
+                "name": drug_rows["drug_name"].to_numpy(),
+            }
+        )
+        doc_rows = edges.iloc[np.unique(edge_docs, return_index=True)[1]]
+        journal_codes, journals = factorize_sorted(doc_rows["journal"])
+        documents = pd.DataFrame(
+            {
+                "source_type": doc_rows["source_type"].to_numpy(),
+                "source_id": doc_rows["source_id"].to_numpy(),
+                "title": doc_rows["source_title"].to_numpy(),
+                "journal": journal_codes.astype(np.int32),
+                "date": pd.to_datetime(doc_rows["date"]).dt.date.astype(str).to_numpy(),
+            },
+            columns=DOCUMENT_COLUMNS,
+        )
+        return cls(drugs, np.asarray(journals, dtype=object), documents, edge_drugs, edge_docs)
+
+    def to_edges(self) -> pd.DataFrame:
+        """The edge frame back, with dates normalized as in ``build_graph_df``."""
+        drugs = self.drugs.iloc[self.edge_drugs]
+        docs = self.documents.iloc[self.edge_docs]
+        journal = docs["journal"].to_numpy()
+        names = np.append(self.journals, None)  # code -1 picks the trailing None
+        return pd.DataFrame(
+            {
+                "drug_atccode": drugs["atccode"].to_numpy(),
+                "drug_name": drugs["name"].to_numpy(),
+                "source_type": docs["source_type"].to_numpy(),
+                "source_id": docs["source_id"].to_numpy(),
+                "source_title": docs["title"].to_numpy(),
+                "journal": names[journal],
+                "date": docs["date"].to_numpy(),
+            },
+            columns=EDGE_COLUMNS,
+        )
+
+
+def _json_columns(df: pd.DataFrame) -> Dict[str, List[Any]]:
+    """Column-oriented JSON of ``df``, with missing values as ``null``."""
+    return {col: [None if pd.isna(v) else v for v in df[col].tolist()] for col in df.columns}
+
+
+def _save_json(graph: CodedGraph, path: Path) -> None:
+    doc = {
+        "version": CODED_GRAPH_FORMAT_VERSION,
+        "drugs": _json_columns(graph.drugs),
+        "journals": graph.journals.tolist(),
+        "documents": _json_columns(graph.documents),
+        "edges": {"drug": graph.edge_drugs.tolist(), "document": graph.edge_docs.tolist()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False)
+
+
+def _load_json(path: Path) -> CodedGraph:
+    with open(path, encoding="utf-8") as f:
+        doc = json.load(f)
+    _check_version(int(doc["version"]))
+    documents = pd.DataFrame(doc["documents"], columns=DOCUMENT_COLUMNS)
+    documents["journal"] = documents["journal"].astype(np.int32)
+    return CodedGraph(
+        drugs=pd.DataFrame(doc["drugs"], columns=DRUG_COLUMNS),
+        journals=np.asarray(doc["journals"], dtype=object),
+        documents=documents,
+        edge_drugs=np.asarray(doc["edges"]["drug"], dtype=np.int32),
+        edge_docs=np.asarray(doc["edges"]["document"], dtype=np.int32),
+    )
+
+
+def _save_arrow(graph: CodedGraph, path: Path) -> None:
+    import pyarrow as pa
+
+    path.mkdir(parents=True, exist_ok=True)
+    metadata = {"version": str(CODED_GRAPH_FORMAT_VERSION)}
+    tables = {
+        "drugs": pa.Table.from_pandas(graph.drugs, preserve_index=False),
+        "journals": pa.table({"name": pa.array(graph.journals.tolist(), type=pa.string())}),
+        "documents": pa.Table.from_pandas(graph.documents, preserve_index=False),
+        "edges": pa.table(
+            {
+                "drug": pa.array(graph.edge_drugs, type=pa.int32()),
+                "document": pa.array(graph.edge_docs, type=pa.int32()),
+            }
+        ),
+    }
+    for name in _ARROW_TABLES:
+        table = tables[name].replace_schema_metadata(metadata)
+        with pa.OSFile(str(path / f"{name}.arrow"), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+
+def _load_arrow(path: Path, memory_map: bool) -> CodedGraph:
+    import pyarrow as pa
+
+    tables = {}
+    for name in _ARROW_TABLES:
+        file = str(path / f"{name}.arrow")
+        source = pa.memory_map(file) if memory_map else pa.OSFile(file)
+        table = pa.ipc.open_file(source).read_all()
+        _check_version(int((table.schema.metadata or {}).get(b"version", b"0")))
+        tables[name] = table
+
+    def int_column(name: str) -> np.ndarray:
+        # A single chunk of non-null int32: a view of the mapped file
+        return tables["edges"].column(name).combine_chunks().to_numpy(zero_copy_only=True)
+
+    return CodedGraph(
+        drugs=tables["drugs"].to_pandas(),
+        journals=np.asarray(tables["journals"].column("name").to_pylist(), dtype=object),
+        documents=tables["documents"].to_pandas(),
+        edge_drugs=int_column("drug"),
+        edge_docs=int_column("document"),
+    )
+
+
+def _check_version(version: int) -> None:
+    if version != CODED_GRAPH_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported coded graph format version {version} "
+            f"(expected {CODED_GRAPH_FORMAT_VERSION})"
+        )
+
+
+@instrument
+def save_coded_graph(graph: CodedGraph, path: str | Path) -> str:
+    """Save ``graph`` as one JSON file if ``path`` ends with ``.json``, else as Arrow.
+
+    The Arrow layout is a directory holding one uncompressed IPC file per
+    table (``drugs``, ``journals``, ``documents`` and ``edges``, with int32
+    ``drug`` and ``document`` columns), readable by any Arrow implementation.
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _save_json(graph, path)
+    else:
+        _save_arrow(graph, path)
+    return str(path)
+
+
+@instrument
+def load_coded_graph(path: str | Path, memory_map: bool = True) -> CodedGraph:
+    """Load a graph saved by ``save_coded_graph``.
+
+    From the Arrow layout with ``memory_map``, the edge arrays are read-only
+    views of the memory-mapped files: loading them copies nothing, and pages
+    are only read when accessed.
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        return _load_json(path)
+    return _load_arrow(path, memory_map)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .metrics import instrument
+from .utils import factorize_sorted
+
+
+def _gather(offsets: np.ndarray, values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Concatenation of the CSR rows ``rows``: ``values[offsets[r]:offsets[r + 1]]``."""
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return values[np.arange(int(lengths.sum())) + shifts]
+
+
+class CoMentionIndex:
+    """Sparse drug x journal incidence of an edge set, for co-mention queries.
+
+    Drugs (by atccode) and journals are numbered in sorted order. The
+    incidence matrix ``A`` (``A[d, j] = 1`` when drug ``d`` is mentioned in
+    journal ``j``) is stored in both CSR layouts:
+
+    - by drug: ``drug_journals[drug_offsets[d]:drug_offsets[d + 1]]`` are
+      the sorted journals of drug ``d``
+    - by journal: ``journal_drugs[journal_offsets[j]:journal_offsets[j + 1]]``
+      are the sorted drugs of journal ``j``
+
+    Drugs co-mentioned with ``d`` are the non-zero entries of row ``d`` of
+    ``A @ A.T``, the number of journals they share: computing that row only
+    touches the drugs of ``d``'s journals, never all drug pairs.
+    """
+
+    def __init__(
+        self,
+        drugs: np.ndarray,
+        names: np.ndarray,
+        journals: np.ndarray,
+        drug_offsets: np.ndarray,
+        drug_journals: np.ndarray,
+        journal_offsets: np.ndarray,
+        journal_drugs: np.ndarray,
+    ) -> None:
+        self.drugs = drugs
+        self.names = names
+        self.journals = journals
+        self.drug_offsets = drug_offsets
+        self.drug_journals = drug_journals
+        self.journal_offsets = journal_offsets
+        self.journal_drugs = journal_drugs
+        self._drug_ids: Dict[str, int] = {d: i for i, d in enumerate(drugs.tolist())}
+        for i, name in enumerate(names.tolist()):
+            if isinstance(name, str):
+                self._drug_ids.setdefault(name.lower(), i)
+
+    @classmethod
+    @instrument
+    def build(
+        cls, edges: pd.DataFrame, exclude_source_types: Sequence[str] = ("clinical",)
+    ) -> CoMentionIndex:
+        """Index the edges, leaving out those from ``exclude_source_types``.
+
+        Only the ``drug_atccode``, ``drug_name``, ``journal`` and
+        ``source_type`` columns are used. Edges without a journal are left out.
+        """
+        kept = edges[~edges["source_type"].isin(list(exclude_source_types))]
+        drug_codes, drugs = factorize_sorted(kept["drug_atccode"])
+        journal_codes, journals = factorize_sorted(kept["journal"])
+        n_drugs, n_journals = len(drugs), len(journals)
+        has_drug = drug_codes >= 0
+        first = np.unique(drug_codes[has_drug], return_index=True)[1]
+        names = kept["drug_name"].to_numpy()[has_drug][first]
+        keep = has_drug & (journal_codes >= 0)
+
+        # Distinct (drug, journal) pairs, sorted by drug then by journal
+        pairs = np.unique(
+            drug_codes[keep].astype(np.int64) * max(n_journals, 1) + journal_codes[keep]
+        )
+        pair_drugs, pair_journals = np.divmod(pairs, max(n_journals, 1))
+        by_journal = np.lexsort((pair_drugs, pair_journals))
+        return cls(
+            drugs=drugs,
+            names=names.astype(object),
+            journals=journals,
+            drug_offsets=np.searchsorted(pair_drugs, np.arange(n_drugs + 1)),
+            drug_journals=pair_journals,
+            journal_offsets=np.searchsorted(pair_journals[by_journal], np.arange(n_journals + 1)),
+            journal_drugs=pair_drugs[by_journal],
+        )
+
+    def _drug_id(self, drug: str) -> Optional[int]:
+        """Row of ``drug``, given by atccode or (case-insensitive) name."""
+        d = self._drug_ids.get(drug)
+        return self._drug_ids.get(drug.lower()) if d is None else d
+
+    def journals_of(self, drug: str) -> List[str]:
+        """Journals mentioning ``drug`` (sorted)."""
+        d = self._drug_id(drug)
+        if d is None:
+            return []
+        journals = self.drug_journals[self.drug_offsets[d] : self.drug_offsets[d + 1]]
+        return self.journals[journals].tolist()
+
+    def co_mentioned(self, drug: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Other drugs mentioned in the journals of ``drug``, by number of shared journals.
+
+        Ties are ordered by atccode. An unknown drug has no co-mentions.
+        """
+        d = self._drug_id(drug)
+        if d is None:
+            return []
+        journals = self.drug_journals[self.drug_offsets[d] : self.drug_offsets[d + 1]]
+        candidates = _gather(self.journal_offsets, self.journal_drugs, journals)
+        shared = np.bincount(candidates, minlength=len(self.drugs))
+        shared[d] = 0
+        others = np.flatnonzero(shared)
+        order = others[np.argsort(-shared[others], kind="stable")][:k]
+        return [
+            {"drug": drug, "name": name, "shared_journals": n}
+            for drug, name, n in zip(
+                self.drugs[order].tolist(), self.names[order].tolist(), shared[order].tolist()
+            )
+        ]
+
+    def shared_journals(self, drug: str, other: str) -> List[str]:
+        """Journals mentioning both drugs (sorted)."""
+        a, b = self._drug_id(drug), self._drug_id(other)
+        if a is None or b is None:
+            return []
+        rows = [self.drug_journals[self.drug_offsets[i] : self.drug_offsets[i + 1]] for i in (a, b)]
+        return self.journals[np.intersect1d(*rows, assume_unique=True)].tolist()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .metrics import instrument
+from .utils import isin_sorted
+
+
+def dedup_keys(docs: pd.DataFrame, title_col: str) -> np.ndarray:
+    """One 64-bit key per document: a hash of its ``id``, or of its title and date.
+
+    Documents without an id (missing or blank) fall back to the title and
+    date: compute the keys on normalized frames, so that formatting
+    differences between feeds do not matter.
+    """
+    ids = docs["id"].astype(object).where(docs["id"].notna(), "").astype(str).str.strip()
+    id_keys = pd.util.hash_pandas_object(ids, index=False).to_numpy(dtype=np.uint64)
+    content = docs[[title_col, "date"]].astype(object)
+    content_keys = pd.util.hash_pandas_object(content, index=False).to_numpy(dtype=np.uint64)
+    return np.where(ids.to_numpy() != "", id_keys, content_keys)
+
+
+class Deduplicator:
+    """Drops the documents seen before, within a chunk or in earlier chunks.
+
+    Documents are compared on :func:`dedup_keys`; the first occurrence is
+    kept. Keys seen so far are held in a sorted array (8 bytes per distinct
+    document). ``n_rows`` and ``n_dropped`` count the rows given and the
+    rows dropped so far.
+    """
+
+    def __init__(self, title_col: str) -> None:
+        self.title_col = title_col
+        self.n_rows = 0
+        self.n_dropped = 0
+        self._seen = np.empty(0, dtype=np.uint64)
+
+    def keep(self, docs: pd.DataFrame) -> np.ndarray:
+        """Mask of the rows of ``docs`` not seen before; marks them as seen."""
+        return self.keep_keys(dedup_keys(docs, self.title_col))
+
+    @instrument
+    def keep_keys(self, keys: np.ndarray) -> np.ndarray:
+        """Like :meth:`keep`, for the ``dedup_keys`` of the rows."""
+        keep = ~pd.Series(keys).duplicated().to_numpy() & ~isin_sorted(keys, self._seen)
+        new = np.sort(keys[keep])
+        self._seen = np.insert(self._seen, np.searchsorted(self._seen, new), new)
+        self.n_rows += len(keys)
+        self.n_dropped += int(len(keys) - keep.sum())
+        return keep
+
+    def __call__(self, docs: pd.DataFrame) -> pd.DataFrame:
+        """``docs`` without the rows seen before."""
+        keep = self.keep(docs)
+        return docs if keep.all() else docs[keep]
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .matcher import AhoCorasick, AhoCorasickTable
+from .metrics import instrument
+from .utils import decode_strings, encode_strings
+
+# Bump when the on-disk layout of ``save_matcher`` changes
+MATCHER_FORMAT_VERSION = 2
+
+# Arrays of a matcher file, in file order
+_ARRAYS = [
+    "atccode_codes",
+    "atccode_category_bytes",
+    "atccode_category_offsets",
+    "drug_codes",
+    "drug_category_bytes",
+    "drug_category_offsets",
+    "pattern_offsets",
+    "pattern_rows",
+    "alphabet",
+    "transitions",
+    "output_offsets",
+    "output_ids",
+]
+
+
+def _categorical(values: pd.Series, name: str) -> Dict[str, np.ndarray]:
+    """Codes (int32, -1 for missing) and categories (UTF-8 bytes and offsets) of ``values``."""
+    cat = values.array if isinstance(values.dtype, pd.CategoricalDtype) else pd.Categorical(values)
+    category_bytes, category_offsets = encode_strings(cat.categories)
+    return {
+        f"{name}_codes": np.asarray(cat.codes, dtype=np.int32),
+        f"{name}_category_bytes": category_bytes,
+        f"{name}_category_offsets": category_offsets,
+    }
+
+
+class DrugMatcher:
+    """Normalized drugs compiled for matching, as flat arrays that can be memory-mapped.
+
+    Holds the drug rows (``atccode`` and ``drug`` as category codes and
+    categories, packed by ``utils.encode_strings``), the distinct lowercased
+    names with the rows carrying each
+    (``pattern_rows[pattern_offsets[p]:pattern_offsets[p + 1]]``) and their
+    automaton as an :class:`~medmentions.matcher.AhoCorasickTable`.
+
+    Build it with :meth:`build`, persist it with :func:`save_matcher` and
+    map it back with :func:`load_matcher`: processes mapping the same file
+    share its pages. A matcher loaded from a file pickles as its path, so
+    pool workers map it rather than receive a copy.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], path: Optional[str] = None) -> None:
+        self.arrays = arrays
+        self.path = path
+        self.automaton = AhoCorasickTable(
+            arrays["alphabet"],
+            arrays["transitions"],
+            arrays["output_offsets"],
+            arrays["output_ids"],
+        )
+
+    @property
+    def n_drugs(self) -> int:
+        return len(self.arrays["drug_codes"])
+
+    @classmethod
+    def build(cls, drugs: pd.DataFrame) -> DrugMatcher:
+        """Compile normalized drugs (``atccode`` and ``drug`` columns)."""
+        rows_by_name: Dict[str, List[int]] = {}
+        for pos, name in enumerate(drugs["drug"]):
+            if isinstance(name, str):
+                rows_by_name.setdefault(name.lower(), []).append(pos)
+        rows = list(rows_by_name.values())
+        automaton = AhoCorasickTable.from_automaton(AhoCorasick(rows_by_name.keys()))
+        return cls(
+            {
+                **_categorical(drugs["atccode"], "atccode"),
+                **_categorical(drugs["drug"], "drug"),
+                "pattern_offsets": np.cumsum([0] + [len(r) for r in rows], dtype=np.int64),
+                "pattern_rows": np.array([pos for r in rows for pos in r], dtype=np.int64),
+                "alphabet": automaton.alphabet,
+                "transitions": automaton.transitions,
+                "output_offsets": automaton.output_offsets,
+                "output_ids": automaton.output_ids,
+            }
+        )
+
+    @property
+    def drugs(self) -> pd.DataFrame:
+        """The drug rows, as ``normalize_drugs`` left them (``category`` columns)."""
+        a = self.arrays
+        return pd.DataFrame(
+            {
+                col: pd.Categorical.from_codes(
+                    np.asarray(a[f"{col}_codes"]),
+                    decode_strings(a[f"{col}_category_bytes"], a[f"{col}_category_offsets"]),
+                )
+                for col in ("atccode", "drug")
+            }
+        )
+
+    def rows_by_pattern(self) -> List[List[int]]:
+        """Positions of the drug rows carrying each pattern, by pattern id."""
+        offsets = self.arrays["pattern_offsets"].tolist()
+        rows = self.arrays["pattern_rows"].tolist()
+        return [rows[lo:hi] for lo, hi in zip(offsets[:-1], offsets[1:])]
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        if self.path is not None:
+            return load_matcher, (self.path,)
+        return DrugMatcher, (self.arrays,)
+
+
+@instrument
+def save_matcher(matcher: DrugMatcher, path: str | Path) -> str:
+    """Write ``matcher`` as consecutive ``.npy`` arrays: the format version, then ``_ARRAYS``."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        np.save(f, np.int64(MATCHER_FORMAT_VERSION), allow_pickle=False)
+        for name in _ARRAYS:
+            np.save(f, np.ascontiguousarray(matcher.arrays[name]), allow_pickle=False)
+    return str(path)
+
+
+def _read_header(f: Any) -> Tuple[Tuple[int, ...], np.dtype]:
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    if fortran_order or dtype.hasobject:
+        raise ValueError(f"{f.name}: not a matcher file")
+    return shape, dtype
+
+
+@instrument
+def load_matcher(path: str | Path, mmap: bool = True) -> DrugMatcher:
+    """Read a matcher written by ``save_matcher``, its arrays memory-mapped if ``mmap``."""
+    arrays: Dict[str, np.ndarray] = {}
+    with open(path, "rb") as f:
+        version = int(np.lib.format.read_array(f, allow_pickle=False))
+        if version != MATCHER_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported matcher format version {version} (expected {MATCHER_FORMAT_VERSION})"
+            )
+        for name in _ARRAYS:
+            shape, dtype = _read_header(f)
+            offset = f.tell()
+            size = int(np.prod(shape)) * dtype.itemsize
+            if mmap and size:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+            else:
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            f.seek(offset + size)
+    return DrugMatcher(arrays, path=str(path))
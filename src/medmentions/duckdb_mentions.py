@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .intermediary_io import format_of, load_df
+from .mentions import (
+    CATEGORICAL_EDGE_COLUMNS,
+    EDGE_COLUMNS,
+    MATCH_MODES,
+    SOURCE_TYPES,
+    concat_edges,
+)
+from .metrics import instrument
+
+# Tokens of ``index.tokenize``: runs of letters, digits and underscores
+_TOKEN_PATTERN = r"[\p{L}\p{N}_]+"
+
+# (drug_pos, doc_pos) pairs of drug names occurring in titles, by match mode.
+# Names and titles are lowercased; missing ones never match. Distinct names
+# are matched once, then joined back to the drug rows carrying them.
+_PAIRS_SQL = {
+    # A name made of token characters only can only occur inside a single
+    # title token: it is looked for in the distinct tokens, far fewer than
+    # the titles. Other names (several words, punctuation) scan the titles.
+    "substring": f"""
+        WITH names AS (SELECT DISTINCT lower(drug) AS name FROM drugs WHERE drug IS NOT NULL),
+        doc_tokens AS (
+            SELECT DISTINCT pos AS doc_pos, token
+            FROM (SELECT pos, unnest(regexp_extract_all(title, '{_TOKEN_PATTERN}')) AS token
+                  FROM titles)
+        ),
+        vocab AS (SELECT DISTINCT token FROM doc_tokens),
+        hits AS (
+            SELECT n.name, t.doc_pos
+            FROM names n
+            JOIN vocab v ON contains(v.token, n.name)
+            JOIN doc_tokens t ON t.token = v.token
+            WHERE regexp_full_match(n.name, '{_TOKEN_PATTERN}')
+            UNION
+            SELECT n.name, t.pos AS doc_pos
+            FROM names n JOIN titles t ON contains(t.title, n.name)
+            WHERE NOT regexp_full_match(n.name, '{_TOKEN_PATTERN}')
+        )
+        SELECT d.pos AS drug_pos, h.doc_pos
+        FROM hits h JOIN drugs d ON lower(d.drug) = h.name
+    """,
+    # Every distinct token of the name is a token of the title
+    "word": f"""
+        WITH drug_tokens AS (
+            SELECT DISTINCT pos AS drug_pos, token
+            FROM (SELECT pos, unnest(regexp_extract_all(lower(drug), '{_TOKEN_PATTERN}')) AS token
+                  FROM drugs)
+        ),
+        doc_tokens AS (
+            SELECT DISTINCT pos AS doc_pos, token
+            FROM (SELECT pos, unnest(regexp_extract_all(title, '{_TOKEN_PATTERN}')) AS token
+                  FROM titles)
+        ),
+        sizes AS (SELECT drug_pos, count(*) AS n FROM drug_tokens GROUP BY drug_pos)
+        SELECT d.drug_pos, t.doc_pos
+        FROM drug_tokens d JOIN doc_tokens t USING (token) JOIN sizes s USING (drug_pos)
+        GROUP BY d.drug_pos, t.doc_pos
+        HAVING count(*) = any_value(s.n)
+    """,
+    # The name's tokens appear at consecutive title positions: all of them
+    # match at the same offset (title position - name position)
+    "phrase": f"""
+        WITH drug_tokens AS (
+            SELECT pos AS drug_pos, unnest(tokens) AS token,
+                   generate_subscripts(tokens, 1) AS i, len(tokens) AS n
+            FROM (SELECT pos, regexp_extract_all(lower(drug), '{_TOKEN_PATTERN}') AS tokens
+                  FROM drugs)
+        ),
+        doc_tokens AS (
+            SELECT pos AS doc_pos, unnest(tokens) AS token, generate_subscripts(tokens, 1) AS i
+            FROM (SELECT pos, regexp_extract_all(title, '{_TOKEN_PATTERN}') AS tokens
+                  FROM titles)
+        )
+        SELECT DISTINCT drug_pos, doc_pos FROM (
+            SELECT d.drug_pos, t.doc_pos
+            FROM drug_tokens d JOIN doc_tokens t USING (token)
+            GROUP BY d.drug_pos, t.doc_pos, t.i - d.i
+            HAVING count(*) = any_value(d.n)
+        )
+    """,
+}
+
+# Edges of the pairs, ordered like ``iter_mentions`` over chunks of
+# ``chunk_size`` rows: by chunk, then drug, then document
+_EDGES_SQL = """
+    WITH pairs AS ({pairs})
+    SELECT d.atccode AS drug_atccode, d.drug AS drug_name, t.id AS source_id,
+           t.{title_col} AS source_title, t.journal, t.date
+    FROM pairs p JOIN drugs d ON d.pos = p.drug_pos JOIN docs t ON t.pos = p.doc_pos
+    ORDER BY {chunk}p.drug_pos, p.doc_pos
+"""
+
+
+def _connect(threads: Optional[int]) -> Any:
+    import duckdb
+
+    # Embedded and offline: no extension is ever downloaded
+    config = {"autoinstall_known_extensions": False, "autoload_known_extensions": False}
+    if threads is not None:
+        config["threads"] = threads
+    return duckdb.connect(":memory:", config=config)
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _create_view(con: Any, name: str, path: str | Path, columns: List[str]) -> None:
+    """View ``name`` of ``columns`` of an intermediate, plus ``pos``, the row position.
+
+    Parquet is scanned from disk by DuckDB; Feather files are handed over
+    as Arrow tables, CSV ones as frames loaded like ``load_df`` does.
+    """
+    cols = ", ".join(f'"{c}"' for c in columns)
+    fmt = format_of(path)
+    if fmt == "parquet":
+        source = f"read_parquet({_sql_string(str(path))}, file_row_number = true)"
+        con.execute(f"CREATE VIEW {name} AS SELECT file_row_number AS pos, {cols} FROM {source}")
+        return
+    if fmt == "feather":
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        table = feather.read_table(path, columns=columns)
+        data: Any = table.append_column("pos", pa.array(np.arange(table.num_rows)))
+    else:
+        df = load_df(path, columns=columns)
+        data = df.assign(pos=np.arange(len(df)))
+    con.register(f"{name}_data", data)
+    con.execute(f"CREATE VIEW {name} AS SELECT pos, {cols} FROM {name}_data")
+
+
+def _source_edges(
+    con: Any,
+    path: str | Path,
+    title_col: str,
+    source_type: str,
+    match_mode: str,
+    rows: Optional[np.ndarray],
+    chunk_size: Optional[int],
+) -> pd.DataFrame:
+    con.execute("DROP VIEW IF EXISTS titles")
+    con.execute("DROP VIEW IF EXISTS docs")
+    _create_view(con, "docs", path, ["id", title_col, "journal", "date"])
+    where = f"{title_col} IS NOT NULL"
+    if rows is not None:
+        con.register("selected", pd.DataFrame({"pos": rows.astype(np.int64)}))
+        where += " AND pos IN (SELECT pos FROM selected)"
+    con.execute(
+        f"CREATE VIEW titles AS SELECT pos, lower({title_col}) AS title FROM docs WHERE {where}"
+    )
+    sql = _EDGES_SQL.format(
+        pairs=_PAIRS_SQL[match_mode],
+        title_col=title_col,
+        chunk=f"p.doc_pos // {int(chunk_size)}, " if chunk_size else "",
+    )
+    # ``arrow()`` gives a table before DuckDB 1.4, a record batch reader since
+    result = con.execute(sql).arrow()
+    edges = (result.read_all() if hasattr(result, "read_all") else result).to_pandas()
+    edges.insert(
+        2,
+        "source_type",
+        pd.Categorical.from_codes(
+            np.full(len(edges), SOURCE_TYPES.index(source_type), dtype=np.int8), SOURCE_TYPES
+        ),
+    )
+    for col in CATEGORICAL_EDGE_COLUMNS:
+        edges[col] = edges[col].astype("category")
+    return edges[EDGE_COLUMNS]
+
+
+@instrument
+def compute_mentions_duckdb(
+    drugs_path: str | Path,
+    pubmed_path: str | Path,
+    trials_path: str | Path,
+    match_mode: str = "substring",
+    pubmed_rows: Optional[np.ndarray] = None,
+    trials_rows: Optional[np.ndarray] = None,
+    chunk_size: Optional[int] = None,
+    threads: Optional[int] = None,
+) -> pd.DataFrame:
+    """``compute_mentions`` on intermediates saved by ``save_df``, run by DuckDB.
+
+    Requires the ``duckdb`` package. The match is a single set-based query
+    per corpus, in an in-memory database with no network access: a
+    containment join of the distinct names against the distinct title
+    tokens in ``"substring"`` mode, a hash join on title tokens in
+    ``"word"`` and ``"phrase"`` modes. Parquet intermediates are scanned
+    from disk.
+
+    ``pubmed_rows`` and ``trials_rows`` restrict the corpora to the rows at
+    an array of positions. The edges have the schema of ``compute_mentions``
+    and are ordered like ``iter_mentions`` over chunks of ``chunk_size``
+    rows of the corpora, filtered to those rows (one chunk per corpus if
+    ``None``): the output of the pandas path, category sets aside.
+    ``threads`` caps DuckDB's worker threads (default: all cores).
+    """
+    if match_mode not in MATCH_MODES:
+        raise ValueError(f"match_mode must be one of {MATCH_MODES}, got {match_mode!r}")
+    con = _connect(threads)
+    try:
+        _create_view(con, "drugs", drugs_path, ["atccode", "drug"])
+        edges = [
+            _source_edges(con, path, title_col, source_type, match_mode, rows, chunk_size)
+            for path, title_col, source_type, rows in (
+                (pubmed_path, "title", "pubmed", pubmed_rows),
+                (trials_path, "scientific_title", "clinical", trials_rows),
+            )
+        ]
+    finally:
+        con.close()
+    return concat_edges(edges)
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+from collections import deque
+from pathlib import Path
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .drug_matcher import DrugMatcher
+from .mentions import EDGE_COLUMNS, concat_edges, edges_frame, iter_pairs
+from .metrics import instrument
+from .utils import isin_sorted
+
+# Bump when the on-disk layout of ``save_state`` changes, or when matching
+# changes so that previously computed edges must not be reused
+STATE_FORMAT_VERSION = 2
+
+_EMPTY = np.empty(0, dtype=np.uint64)
+
+
+def _row_hashes(frame: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+def drug_fingerprints(drugs: pd.DataFrame) -> np.ndarray:
+    """One 64-bit hash per drug row, over (atccode, drug)."""
+    return _row_hashes(drugs[["atccode", "drug"]])
+
+
+def doc_fingerprints(docs: pd.DataFrame, title_col: str) -> np.ndarray:
+    """One 64-bit hash per document row, over its id and content."""
+    return _row_hashes(docs[["id", title_col, "journal", "date"]])
+
+
+class MentionsState:
+    """Keys of the inputs behind a persisted edge set.
+
+    A row's key is its fingerprint, mixed with its occurrence number when
+    exact duplicate rows came before it (see ``row_keys``): keys are unique.
+    ``drugs``, ``pubmed`` and ``trials`` are the keys of the rows the edges
+    were computed from; ``edge_drugs`` and ``edge_docs`` give, for each edge
+    (in order), the keys of its drug and of its document. Persist it next to
+    the edges with :func:`save_state`.
+    """
+
+    def __init__(
+        self,
+        match_mode: str,
+        drugs: np.ndarray,
+        pubmed: np.ndarray,
+        trials: np.ndarray,
+        edge_drugs: np.ndarray,
+        edge_docs: np.ndarray,
+    ) -> None:
+        self.match_mode = match_mode
+        self.drugs = drugs
+        self.pubmed = pubmed
+        self.trials = trials
+        self.edge_drugs = edge_drugs
+        self.edge_docs = edge_docs
+
+    @classmethod
+    def empty(cls, match_mode: str) -> MentionsState:
+        return cls(match_mode, _EMPTY, _EMPTY, _EMPTY, _EMPTY, _EMPTY)
+
+
+def _first_positions(values: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Position of the first occurrence of each of ``values`` in ``keys``."""
+    uniq, first = np.unique(keys, return_index=True)
+    return first[np.searchsorted(uniq, values)]
+
+
+def _occurrences(values: np.ndarray) -> np.ndarray:
+    """For each of ``values``, the number of equal values before it."""
+    order = np.argsort(values, kind="stable")
+    ordered = values[order]
+    starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+    sizes = np.diff(np.append(starts, len(values)))
+    occurrences = np.empty(len(values), dtype=np.int64)
+    occurrences[order] = np.arange(len(values)) - np.repeat(starts, sizes)
+    return occurrences
+
+
+def _mix(fps: np.ndarray, occurrences: np.ndarray) -> np.ndarray:
+    """Keys of rows with fingerprints ``fps`` and ``occurrences``: ``fps`` for first ones."""
+    keys = fps.copy()
+    dup = np.flatnonzero(occurrences)
+    if len(dup):
+        keys[dup] = _row_hashes(pd.DataFrame({"fp": fps[dup], "n": occurrences[dup]}))
+    return keys
+
+
+def row_keys(fps: np.ndarray) -> np.ndarray:
+    """Unique keys of rows with fingerprints ``fps``, in order.
+
+    The key of a row is its fingerprint mixed with the number of earlier
+    rows with the same fingerprint (exact duplicates), so each copy of a
+    duplicated row has a key of its own. The first copy keeps the bare
+    fingerprint.
+    """
+    return _mix(fps, _occurrences(fps))
+
+
+class _KnownKeys:
+    """Tells the rows of a source streamed chunk by chunk whose key is in a previous state.
+
+    Occurrences are counted across chunks only for fingerprints known to the
+    previous state: other rows are new whatever their occurrence number.
+    """
+
+    def __init__(self, previous_keys: np.ndarray) -> None:
+        self.keys = np.sort(previous_keys)
+        self.seen = np.zeros(len(self.keys), dtype=np.int64)
+
+    def isin(self, fps: np.ndarray) -> np.ndarray:
+        known = np.flatnonzero(isin_sorted(fps, self.keys))
+        pos = np.searchsorted(self.keys, fps[known])
+        occurrences = self.seen[pos] + _occurrences(fps[known])
+        np.add.at(self.seen, pos, 1)
+        result = np.zeros(len(fps), dtype=bool)
+        result[known] = isin_sorted(_mix(fps[known], occurrences), self.keys)
+        return result
+
+
+class _Matcher:
+    """Matches frames of either source, one at a time, through a single ``iter_pairs``.
+
+    ``iter_pairs`` pulls its chunks from the frames handed to :meth:`match`,
+    so the drugs are compiled (or the worker pool started) once for all the
+    frames. The PubMed frames must all come before the trials ones.
+    """
+
+    def __init__(
+        self,
+        drugs: pd.DataFrame,
+        match_mode: str,
+        n_workers: int,
+        drug_matcher: Optional[DrugMatcher] = None,
+    ) -> None:
+        self._pending: Deque[pd.DataFrame] = deque()
+        self._rank = 0
+        self._pairs = iter_pairs(
+            drugs, self._frames(0), self._frames(1), None, None, match_mode, n_workers, drug_matcher
+        )
+
+    def _frames(self, rank: int) -> Iterator[pd.DataFrame]:
+        # Ends once a frame of the next source comes in
+        while self._rank == rank:
+            yield self._pending.popleft()
+
+    def match(self, rank: int, docs: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """(drug position, doc position) pairs of ``docs``, of source ``rank`` (0: PubMed)."""
+        self._rank = rank
+        self._pending.append(docs)
+        *_, drug_pos, doc_pos = next(self._pairs)
+        return drug_pos, doc_pos
+
+    def close(self) -> None:
+        self._pairs.close()
+
+
+@instrument
+def update_mentions(
+    drugs: pd.DataFrame,
+    pubmed_chunks: Iterable[pd.DataFrame],
+    trials_chunks: Iterable[pd.DataFrame],
+    previous_edges: Optional[pd.DataFrame] = None,
+    previous_state: Optional[MentionsState] = None,
+    match_mode: str = "substring",
+    n_workers: int = 1,
+    drug_matcher: Optional[DrugMatcher] = None,
+) -> Tuple[pd.DataFrame, MentionsState]:
+    """Incremental ``compute_mentions``: only match what changed since last time.
+
+    Rows are keyed by a fingerprint of their id and content (see
+    ``row_keys``). Matching runs for documents whose key is new (added or
+    changed rows) against all drugs, and for newly added drugs against the
+    unchanged documents, chunk by chunk. Previous edges are kept when both
+    their drug and their document are still present, so deleted or changed
+    rows drop their edges.
+
+    Without a usable previous state (none, other ``match_mode``, or not
+    aligned with ``previous_edges``) everything is matched from scratch.
+    Edges come out as ``compute_mentions`` gives them.
+
+    ``n_workers`` parallelizes the matching and ``drug_matcher`` replaces
+    compiling all the drugs, as in ``compute_mentions``.
+    Returns the new edge set and the state to persist with it.
+    """
+    if (
+        previous_state is None
+        or previous_edges is None
+        or previous_state.match_mode != match_mode
+        or len(previous_edges) != len(previous_state.edge_docs)
+    ):
+        previous_edges = pd.DataFrame(columns=EDGE_COLUMNS)
+        previous_state = MentionsState.empty(match_mode)
+
+    drug_keys = row_keys(drug_fingerprints(drugs))
+    new_drugs = np.flatnonzero(~isin_sorted(drug_keys, np.sort(previous_state.drugs)))
+    frames: List[pd.DataFrame] = []
+    # Per edge: source rank, drug position, doc position
+    positions: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+    source_keys: List[np.ndarray] = []
+
+    # New and changed documents against all drugs, unchanged ones only
+    # against new drugs: one matcher each, for all the chunks
+    matchers: List[Tuple[_Matcher, Optional[np.ndarray]]] = [
+        (_Matcher(drugs, match_mode, n_workers, drug_matcher), None)
+    ]
+    if len(new_drugs):
+        matchers.append((_Matcher(drugs.iloc[new_drugs], match_mode, n_workers), new_drugs))
+
+    try:
+        for rank, (chunks, title_col, source_type, previous_keys) in enumerate(
+            (
+                (pubmed_chunks, "title", "pubmed", previous_state.pubmed),
+                (trials_chunks, "scientific_title", "clinical", previous_state.trials),
+            )
+        ):
+            known = _KnownKeys(previous_keys)
+            fps_parts: List[np.ndarray] = []
+            start = 0
+            for docs in chunks:
+                fps = doc_fingerprints(docs, title_col)
+                fps_parts.append(fps)
+                is_old = known.isin(fps)
+
+                for (matcher, drug_rows), rows in zip(
+                    matchers, (np.flatnonzero(~is_old), np.flatnonzero(is_old))
+                ):
+                    if not len(rows):
+                        continue
+                    subset = docs.iloc[rows]
+                    drug_pos, doc_pos = matcher.match(rank, subset)
+                    if drug_rows is not None:
+                        drug_pos = drug_rows[drug_pos]
+                    frames.append(
+                        edges_frame(drugs, subset, title_col, source_type, drug_pos, doc_pos)
+                    )
+                    positions.append(
+                        (np.full(len(drug_pos), rank), drug_pos, rows[doc_pos] + start)
+                    )
+                start += len(docs)
+            doc_keys = row_keys(np.concatenate(fps_parts) if fps_parts else _EMPTY)
+            source_keys.append(doc_keys)
+
+            # Previous edges whose drug and document are both still there
+            in_source = (previous_edges["source_type"] == source_type).to_numpy()
+            kept = np.flatnonzero(
+                in_source
+                & isin_sorted(previous_state.edge_drugs, np.sort(drug_keys))
+                & isin_sorted(previous_state.edge_docs, np.sort(doc_keys))
+            )
+            frames.append(previous_edges.iloc[kept])
+            positions.append(
+                (
+                    np.full(len(kept), rank),
+                    _first_positions(previous_state.edge_drugs[kept], drug_keys),
+                    _first_positions(previous_state.edge_docs[kept], doc_keys),
+                )
+            )
+    finally:
+        for matcher, _ in matchers:
+            matcher.close()
+
+    ranks, drug_pos, doc_pos = (
+        np.concatenate([p[i] for p in positions]).astype(np.int64) for i in range(3)
+    )
+    order = np.lexsort((doc_pos, drug_pos, ranks))
+    edges = concat_edges([f for f in frames if len(f)] or [pd.DataFrame(columns=EDGE_COLUMNS)])
+    edges = edges.iloc[order].reset_index(drop=True)
+    ranks, drug_pos, doc_pos = ranks[order], drug_pos[order], doc_pos[order]
+
+    edge_docs = np.empty(len(order), dtype=np.uint64)
+    for rank, keys in enumerate(source_keys):
+        in_source = ranks == rank
+        edge_docs[in_source] = keys[doc_pos[in_source]]
+    state = MentionsState(
+        match_mode,
+        drug_keys,
+        source_keys[0],
+        source_keys[1],
+        drug_keys[drug_pos],
+        edge_docs,
+    )
+    return edges, state
+
+
+def save_state(state: MentionsState, path: str | Path) -> str:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        np.savez(
+            f,
+            version=np.int64(STATE_FORMAT_VERSION),
+            match_mode=np.str_(state.match_mode),
+            drugs=state.drugs,
+            pubmed=state.pubmed,
+            trials=state.trials,
+            edge_drugs=state.edge_drugs,
+            edge_docs=state.edge_docs,
+        )
+    return str(path)
+
+
+def load_state(path: str | Path) -> MentionsState:
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data["version"])
+        if version != STATE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported state format version {version} (expected {STATE_FORMAT_VERSION})"
+            )
+        return MentionsState(
+            match_mode=str(data["match_mode"]),
+            drugs=data["drugs"],
+            pubmed=data["pubmed"],
+            trials=data["trials"],
+            edge_drugs=data["edge_drugs"],
+            edge_docs=data["edge_docs"],
+        )
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import re
+from functools import reduce
+from itertools import chain
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .metrics import instrument
+from .utils import decode_strings, encode_strings
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Bump when the on-disk layout of ``save_index`` changes
+INDEX_FORMAT_VERSION = 3
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens (runs of ``\\w`` characters)."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class InvertedIndex:
+    """Token-level inverted index over a column of document titles.
+
+    Documents are identified by their row position in the indexed Series.
+    ``vocab`` holds the sorted tokens (object array) and the index is stored
+    as two CSR layouts of integer arrays:
+
+    - inverted: ``postings[token_offsets[t]:token_offsets[t + 1]]`` are the
+      sorted row ids of the documents containing token ``t``
+    - forward: ``doc_tokens[doc_offsets[d]:doc_offsets[d + 1]]`` is the token
+      sequence of document ``d``, used to verify multi-word phrases
+
+    Build it with :meth:`build` and persist it with :func:`save_index`, or
+    chunk by chunk with :class:`IndexWriter`.
+    """
+
+    def __init__(
+        self,
+        vocab: np.ndarray,
+        token_offsets: np.ndarray,
+        postings: np.ndarray,
+        doc_offsets: np.ndarray,
+        doc_tokens: np.ndarray,
+    ) -> None:
+        self.vocab = vocab
+        self.token_offsets = token_offsets
+        self.postings = postings
+        self.doc_offsets = doc_offsets
+        self.doc_tokens = doc_tokens
+        self._token_ids: Dict[str, int] = {tok: i for i, tok in enumerate(vocab.tolist())}
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_offsets) - 1
+
+    @classmethod
+    @instrument
+    def build(cls, texts: pd.Series[Any]) -> InvertedIndex:
+        """Index a Series of titles; missing values index as empty documents."""
+        token_lists = [tokenize(t) if isinstance(t, str) else [] for t in texts]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        flat = np.fromiter(chain.from_iterable(token_lists), dtype=object, count=int(lengths.sum()))
+        codes, vocab = pd.factorize(flat, sort=True)
+        return cls._from_forward(
+            np.asarray(vocab, dtype=object),
+            np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            codes.astype(np.int64),
+        )
+
+    @classmethod
+    @instrument
+    def concat(cls, parts: Sequence[InvertedIndex]) -> InvertedIndex:
+        """Index of the documents of ``parts`` stacked in order.
+
+        Lets an index be built chunk by chunk: row ids of the second part
+        are shifted by the number of documents in the first, and so on.
+        """
+        if not parts:
+            return cls.build(pd.Series([], dtype="object"))
+        all_tokens = np.concatenate([p.vocab for p in parts])
+        codes, vocab = pd.factorize(all_tokens, sort=True)
+        bounds = np.cumsum([0] + [len(p.vocab) for p in parts])
+        token_maps = [codes[lo:hi] for lo, hi in zip(bounds, bounds[1:])]
+        doc_tokens = [m[p.doc_tokens] for p, m in zip(parts, token_maps)]
+        token_starts = np.cumsum([0] + [len(p.doc_tokens) for p in parts])
+        doc_offsets = [p.doc_offsets[:-1] + start for p, start in zip(parts, token_starts)]
+
+        # Postings are merged rather than derived again from the forward
+        # layout: the row ids of a part are all above those of the previous
+        # parts, so a token's postings are those of each part, in order
+        counts = [np.diff(p.token_offsets) for p in parts]
+        totals = np.zeros(len(vocab), dtype=np.int64)
+        for m, n in zip(token_maps, counts):
+            totals[m] += n
+        token_offsets = np.concatenate([[0], np.cumsum(totals)])
+        filled = token_offsets[:-1].copy()  # next free slot of each token
+        postings = np.empty(token_offsets[-1], dtype=np.int64)
+        doc_starts = np.cumsum([0] + [p.n_docs for p in parts])
+        for p, m, n, shift in zip(parts, token_maps, counts, doc_starts):
+            slots = np.repeat(filled[m] - p.token_offsets[:-1], n) + np.arange(len(p.postings))
+            postings[slots] = p.postings + shift
+            filled[m] += n
+
+        return cls(
+            vocab=np.asarray(vocab, dtype=object),
+            token_offsets=token_offsets,
+            postings=postings,
+            doc_offsets=np.concatenate(doc_offsets + [token_starts[-1:]]).astype(np.int64),
+            doc_tokens=np.concatenate(doc_tokens).astype(np.int64),
+        )
+
+    def select(self, keep: np.ndarray) -> InvertedIndex:
+        """Index of the documents where the boolean mask ``keep`` is true.
+
+        The same as building the index of the kept titles (row ids are
+        renumbered in order, unused tokens dropped), without tokenizing them.
+        """
+        if keep.all():
+            return self
+        new_ids = np.cumsum(keep) - 1
+        kept_postings = keep[self.postings]
+        token_offsets = np.concatenate([[0], np.cumsum(kept_postings)])[self.token_offsets]
+        doc_tokens = self.doc_tokens[np.repeat(keep, np.diff(self.doc_offsets))]
+
+        used = np.diff(token_offsets) > 0
+        return InvertedIndex(
+            vocab=self.vocab[used],
+            token_offsets=np.append(token_offsets[:-1][used], token_offsets[-1]),
+            postings=new_ids[self.postings[kept_postings]],
+            doc_offsets=np.concatenate([[0], np.cumsum(np.diff(self.doc_offsets)[keep])]),
+            doc_tokens=(np.cumsum(used) - 1)[doc_tokens],
+        )
+
+    @classmethod
+    def _from_forward(
+        cls, vocab: np.ndarray, doc_offsets: np.ndarray, doc_tokens: np.ndarray
+    ) -> InvertedIndex:
+        """Derive the inverted CSR layout from the forward one."""
+        n_docs = max(len(doc_offsets) - 1, 1)
+
+        # Unique (token, doc) pairs sorted by token then doc
+        doc_of_token = np.repeat(np.arange(len(doc_offsets) - 1), np.diff(doc_offsets))
+        pairs = np.unique(doc_tokens * n_docs + doc_of_token)
+        pair_tokens = pairs // n_docs
+
+        return cls(
+            vocab=vocab,
+            token_offsets=np.searchsorted(pair_tokens, np.arange(len(vocab) + 1)),
+            postings=pairs % n_docs,
+            doc_offsets=doc_offsets,
+            doc_tokens=doc_tokens,
+        )
+
+    def token_postings(self, token: str) -> np.ndarray:
+        """Row ids of the documents containing ``token`` (empty if unknown)."""
+        tid = self._token_ids.get(token)
+        if tid is None:
+            return np.empty(0, dtype=np.int64)
+        return self.postings[self.token_offsets[tid] : self.token_offsets[tid + 1]]
+
+    def lookup(self, tokens: Sequence[str], contiguous: bool = True) -> np.ndarray:
+        """Row ids of the documents containing ``tokens`` as a contiguous phrase.
+
+        Postings of the phrase tokens are intersected (rarest first) and, for
+        multi-word phrases, each candidate is verified against the forward
+        index. With ``contiguous=False`` the verification is skipped and the
+        tokens may appear anywhere, in any order. An empty phrase matches
+        nothing.
+        """
+        ids = [self._token_ids.get(t) for t in tokens]
+        if not ids or any(i is None for i in ids):
+            return np.empty(0, dtype=np.int64)
+
+        lists = sorted((self.token_postings(t) for t in set(tokens)), key=len)
+        candidates = reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), lists)
+        if not contiguous or len(ids) == 1 or len(candidates) == 0:
+            return candidates
+
+        keep = [doc for doc in candidates.tolist() if self._has_phrase(doc, ids)]
+        return np.asarray(keep, dtype=np.int64)
+
+    def _has_phrase(self, doc: int, ids: List[Any]) -> bool:
+        seq = self.doc_tokens[self.doc_offsets[doc] : self.doc_offsets[doc + 1]].tolist()
+        n = len(ids)
+        return any(seq[i : i + n] == ids for i in range(len(seq) - n + 1) if seq[i] == ids[0])
+
+
+# Arrays of an index part, in file order
+_PART_ARRAYS = [
+    "vocab_bytes",
+    "vocab_offsets",
+    "token_offsets",
+    "postings",
+    "doc_offsets",
+    "doc_tokens",
+]
+
+
+class IndexWriter:
+    """Write the indexes of consecutive document chunks to one file, as they come.
+
+    The file holds the format version, then each appended part as
+    consecutive ``.npy`` arrays (tokens as UTF-8 bytes and offsets). Row ids
+    of a part count from its first document: parts are read back one at a
+    time by :func:`iter_index_parts` and :func:`lookup_index`, or merged by
+    :func:`load_index`. Use as a context manager.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file: Optional[BinaryIO] = open(self.path, "wb")
+        np.save(self._file, np.int64(INDEX_FORMAT_VERSION), allow_pickle=False)
+
+    def append(self, index: InvertedIndex) -> None:
+        vocab_bytes, vocab_offsets = encode_strings(index.vocab)
+        for array in (
+            vocab_bytes,
+            vocab_offsets,
+            index.token_offsets,
+            index.postings,
+            index.doc_offsets,
+            index.doc_tokens,
+        ):
+            np.save(self._file, np.ascontiguousarray(array), allow_pickle=False)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> IndexWriter:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def save_index(index: InvertedIndex, path: str | Path) -> str:
+    """Write ``index`` as a single part (see :class:`IndexWriter`)."""
+    with IndexWriter(path) as writer:
+        writer.append(index)
+    return str(path)
+
+
+def iter_index_parts(path: str | Path) -> Iterator[InvertedIndex]:
+    """The parts of an index file, one at a time."""
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        f.seek(0)
+        version = int(np.load(f, allow_pickle=False))
+        if version != INDEX_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported index format version {version} (expected {INDEX_FORMAT_VERSION})"
+            )
+        while f.tell() < size:
+            data = {name: np.load(f, allow_pickle=False) for name in _PART_ARRAYS}
+            yield InvertedIndex(
+                vocab=decode_strings(data["vocab_bytes"], data["vocab_offsets"]),
+                token_offsets=data["token_offsets"],
+                postings=data["postings"],
+                doc_offsets=data["doc_offsets"],
+                doc_tokens=data["doc_tokens"],
+            )
+
+
+def load_index(path: str | Path) -> InvertedIndex:
+    """The whole index of a file: its parts merged with :meth:`InvertedIndex.concat`."""
+    parts = list(iter_index_parts(path))
+    return parts[0] if len(parts) == 1 else InvertedIndex.concat(parts)
+
+
+def lookup_index(path: str | Path, tokens: Sequence[str], contiguous: bool = True) -> np.ndarray:
+    """``InvertedIndex.lookup`` on an index file, holding one part in memory at a time."""
+    found = []
+    start = 0
+    for part in iter_index_parts(path):
+        found.append(part.lookup(tokens, contiguous=contiguous) + start)
+        start += part.n_docs
+    return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
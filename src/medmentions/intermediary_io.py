@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 import json
+import shutil
+from contextlib import ExitStack
+from itertools import chain
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from .metrics import instrument
+
 
 def save_json(obj: Any, path: str | Path) -> str:
     path = Path(path)
@@ -22,5 +28,238 @@ def save_df_csv(df: pd.DataFrame, path: str | Path) -> str:
     return str(path)
 
 
-def load_df_csv(path: str | Path) -> pd.DataFrame:
-    return pd.read_csv(path)
+def load_df_csv(path: str | Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    return pd.read_csv(path, usecols=columns)
+
+
+def save_df_parquet(df: pd.DataFrame, path: str | Path) -> str:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(path, index=False)
+    return str(path)
+
+
+def load_df_parquet(path: str | Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    return pd.read_parquet(path, columns=columns)
+
+
+def save_df_feather(df: pd.DataFrame, path: str | Path) -> str:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.reset_index(drop=True).to_feather(path)
+    return str(path)
+
+
+def load_df_feather(path: str | Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    import pyarrow.feather as feather
+
+    return _to_pandas(feather.read_table(path, columns=columns))
+
+
+def _to_pandas(table: Any) -> pd.DataFrame:
+    """``table.to_pandas()``, restoring categoricals stored as plain values.
+
+    Chunked Feather files hold categoricals as plain values (see
+    ``save_df_chunks``); the pandas metadata still lists them as categorical,
+    so they are dictionary-encoded back.
+    """
+    import pyarrow as pa
+
+    meta = table.schema.pandas_metadata or {}
+    categorical = {
+        c["field_name"] for c in meta.get("columns", []) if c["pandas_type"] == "categorical"
+    }
+    for i, field in enumerate(table.schema):
+        if field.name in categorical and not pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+    return table.to_pandas()
+
+
+# Intermediate formats by file suffix. The columnar ones (Arrow-backed,
+# requires pyarrow) keep dtypes: ``datetime.date`` values come back as dates
+# and ``category`` columns as categoricals, with no re-parsing. CSV reads
+# categoricals back as plain values.
+INTER_FORMATS: Dict[str, Tuple[Callable[..., str], Callable[..., pd.DataFrame]]] = {
+    "csv": (save_df_csv, load_df_csv),
+    "parquet": (save_df_parquet, load_df_parquet),
+    "feather": (save_df_feather, load_df_feather),
+}
+
+
+def format_of(path: str | Path) -> str:
+    """Intermediate format of ``path``, from its suffix (a key of ``INTER_FORMATS``)."""
+    fmt = Path(path).suffix.lstrip(".").lower()
+    if fmt not in INTER_FORMATS:
+        raise ValueError(f"Unsupported intermediate format {fmt!r}: expected {list(INTER_FORMATS)}")
+    return fmt
+
+
+@instrument
+def save_df(df: pd.DataFrame, path: str | Path) -> str:
+    """Save ``df`` in the format given by the suffix of ``path`` (see ``INTER_FORMATS``)."""
+    return INTER_FORMATS[format_of(path)][0](df, path)
+
+
+@instrument
+def load_df(path: str | Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load a frame saved by ``save_df``, optionally only some ``columns``."""
+    return INTER_FORMATS[format_of(path)][1](path, columns=columns)
+
+
+def _arrow_schema(df: pd.DataFrame, decode_dictionaries: bool = False) -> Any:
+    """Arrow schema of ``df`` with all-null columns typed as strings.
+
+    Used for chunked writes, where the first chunk fixes the schema of the
+    whole file: a column that happens to be empty in that chunk must still
+    accept the values of later ones, and a categorical must accept more
+    categories (int32 dictionary indices). Arrow IPC files allow a single
+    dictionary per column, so ``decode_dictionaries`` stores categoricals as
+    their plain values.
+    """
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+        elif pa.types.is_dictionary(field.type):
+            value_type = field.type.value_type
+            # No categories yet (pandas types them as float64 when all-null)
+            if pa.types.is_null(value_type) or len(df[field.name].cat.categories) == 0:
+                value_type = pa.string()
+            if not decode_dictionaries:
+                value_type = pa.dictionary(pa.int32(), value_type)
+            schema = schema.set(i, field.with_type(value_type))
+    return schema
+
+
+@instrument
+def save_df_chunks(chunks: Iterable[pd.DataFrame], path: str | Path) -> str:
+    """Save a stream of frames with the same columns as one file, chunk by chunk.
+
+    Only one chunk is held in memory at a time. The format is given by the
+    suffix of ``path`` as for ``save_df``; the result loads with ``load_df``
+    or, chunk by chunk, with ``iter_df_chunks``. Feather files written this
+    way hold categoricals as plain values.
+    """
+    path = Path(path)
+    fmt = format_of(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    it = iter(chunks)
+    first = next(it, None)
+    if first is None:
+        raise ValueError(f"No chunks to save to {path}")
+
+    if fmt == "csv":
+        first.to_csv(path, index=False)
+        for chunk in it:
+            chunk.to_csv(path, index=False, header=False, mode="a")
+        return str(path)
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(first, decode_dictionaries=fmt == "feather")
+    with ExitStack() as stack:
+        if fmt == "parquet":
+            writer = stack.enter_context(pq.ParquetWriter(path, schema))
+        else:
+            sink = stack.enter_context(pa.OSFile(str(path), "wb"))
+            writer = stack.enter_context(pa.ipc.new_file(sink, schema))
+        for chunk in chain([first], it):
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            writer.write_table(table)
+    return str(path)
+
+
+@instrument
+def iter_df_chunks(
+    path: str | Path, chunksize: int, columns: Optional[List[str]] = None
+) -> Iterator[pd.DataFrame]:
+    """Yield a saved frame in chunks of at most ``chunksize`` rows.
+
+    Row indexes continue across chunks, as if the file had been loaded whole.
+    CSV columns are read as strings.
+    """
+    fmt = format_of(path)
+    if fmt == "csv":
+        # Strings, like ``readers._iter_csv``: inferred dtypes would vary by chunk
+        with pd.read_csv(path, dtype=str, usecols=columns, chunksize=chunksize) as reader:
+            yield from reader
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt == "parquet":
+        pf = pq.ParquetFile(path)
+        batches = pf.iter_batches(batch_size=chunksize, columns=columns)
+        schema = pf.schema_arrow
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(str(path)))
+        schema = reader.schema
+        batches = (
+            reader.get_batch(i).slice(offset, chunksize)
+            for i in range(reader.num_record_batches)
+            for offset in range(0, reader.get_batch(i).num_rows, chunksize)
+        )
+        if columns is not None:
+            batches = (b.select(columns) for b in batches)
+    if columns is not None:
+        schema = pa.schema([schema.field(c) for c in columns], metadata=schema.metadata)
+
+    start = 0
+    for batch in batches:
+        df = _to_pandas(pa.Table.from_batches([batch], schema=schema))
+        df.index = pd.RangeIndex(start, start + len(df))
+        start += len(df)
+        yield df
+
+
+@instrument
+def concat_df_files(
+    paths: List[str | Path], path: str | Path, chunksize: int, keep: Optional[np.ndarray] = None
+) -> str:
+    """Save the frames saved at ``paths`` (same columns, same format) stacked, as ``path``.
+
+    Files are streamed through chunks of at most ``chunksize`` rows. With
+    ``keep``, a boolean mask over the stacked rows, only those rows are
+    saved. CSV values are never re-parsed: the files are concatenated as
+    text, or read back as strings to drop rows.
+    """
+    path = Path(path)
+    if format_of(path) == "csv" and keep is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as out:
+            for i, src in enumerate(paths):
+                with open(src, "rb") as f:
+                    if i:
+                        f.readline()  # header
+                    shutil.copyfileobj(f, out)
+        return str(path)
+
+    if format_of(path) == "csv":
+        chunks = chain.from_iterable(_iter_csv_text(src, chunksize) for src in paths)
+    else:
+        chunks = chain.from_iterable(iter_df_chunks(src, chunksize) for src in paths)
+    if keep is not None:
+        chunks = _kept_rows(chunks, keep)
+    first = next(chunks, None)
+    if first is None:  # no rows: keep the columns and dtypes of the first file
+        first = load_df(paths[0]).iloc[:0]
+    return save_df_chunks(chain([first], chunks), path)
+
+
+def _iter_csv_text(path: str | Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    with pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize) as reader:
+        yield from reader
+
+
+def _kept_rows(chunks: Iterable[pd.DataFrame], keep: np.ndarray) -> Iterator[pd.DataFrame]:
+    """The rows of consecutive ``chunks`` where ``keep`` is true (empty chunks skipped)."""
+    start = 0
+    for chunk in chunks:
+        mask = keep[start : start + len(chunk)]
+        start += len(chunk)
+        if mask.any():
+            yield chunk[mask]
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable
+
+import numpy as np
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton matching many literal patterns in a single scan.
+
+    All patterns are compiled into one trie with failure links, so scanning a
+    text costs ``O(len(text))`` regardless of the number of patterns. Patterns
+    are matched literally (no regex semantics) and case-sensitively; callers
+    lowercase both sides for case-insensitive matching.
+
+    Args:
+        patterns: Literal patterns. The position of each pattern in the
+            iterable is the id reported by :meth:`search`.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        goto: list[dict[str, int]] = [{}]
+        out: list[tuple[int, ...]] = [()]
+        n_patterns = 0
+
+        # Trie of all patterns
+        for pid, pattern in enumerate(patterns):
+            n_patterns += 1
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] = out[state] + (pid,)
+
+        # Failure links (BFS), merging outputs of the failure target
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        self.n_patterns = n_patterns
+
+    def search(self, text: str) -> set[int]:
+        """Return the ids of all patterns occurring in ``text``."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(out[0])  # empty patterns match any text
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class AhoCorasickTable:
+    """An :class:`AhoCorasick` automaton as flat arrays: a dense transition table.
+
+    Failure links are folded into the table at build time, so a scan costs
+    one lookup per character. Characters are mapped to classes: ``alphabet``
+    holds the characters of the patterns (sorted, class ``i + 1``), all
+    others share class 0. Transitions to a state reporting patterns are
+    stored complemented (``~state``), so scans test a sign instead of
+    looking outputs up. Pattern ids reported by state ``s`` are
+    ``output_ids[output_offsets[s]:output_offsets[s + 1]]``.
+
+    The arrays are only read, through memoryviews: they may be memory-mapped
+    and shared between processes.
+    """
+
+    def __init__(
+        self,
+        alphabet: np.ndarray,
+        transitions: np.ndarray,
+        output_offsets: np.ndarray,
+        output_ids: np.ndarray,
+    ) -> None:
+        self.alphabet = alphabet
+        self.transitions = transitions
+        self.output_offsets = output_offsets
+        self.output_ids = output_ids
+        self._classes = {ch: i + 1 for i, ch in enumerate(alphabet.tolist())}
+        self._width = len(alphabet) + 1
+        self._table = _int_view(transitions, "i")
+        self._outputs = _int_view(output_ids, "i")
+        self._offsets = _int_view(output_offsets, "q")
+
+    @classmethod
+    def from_automaton(cls, automaton: AhoCorasick) -> AhoCorasickTable:
+        goto, fail, out = automaton._goto, automaton._fail, automaton._out
+        alphabet = sorted({ch for edges in goto for ch in edges})
+        classes = {ch: i + 1 for i, ch in enumerate(alphabet)}
+        table = np.zeros((len(goto), len(alphabet) + 1), dtype=np.intc)
+
+        # Breadth first: the row of a state's failure target is complete
+        # before the state's own row copies it
+        queue = deque(goto[0].values())
+        for ch, nxt in goto[0].items():
+            table[0, classes[ch]] = nxt
+        while queue:
+            state = queue.popleft()
+            table[state] = table[fail[state]]
+            for ch, nxt in goto[state].items():
+                table[state, classes[ch]] = nxt
+                queue.append(nxt)
+
+        reports = np.array([len(ids) > 0 for ids in out], dtype=bool)
+        table[reports[table]] = ~table[reports[table]]
+        lengths = np.array([len(ids) for ids in out], dtype=np.int64)
+        return cls(
+            alphabet=np.array(alphabet, dtype="<U1"),
+            transitions=table.reshape(-1),
+            output_offsets=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            output_ids=np.fromiter(
+                (pid for ids in out for pid in ids), dtype=np.intc, count=int(lengths.sum())
+            ),
+        )
+
+    def _ids(self, state: int) -> range:
+        return range(self._offsets[state], self._offsets[state + 1])
+
+    def search(self, text: str) -> set[int]:
+        """Return the ids of all patterns occurring in ``text``."""
+        table, classes, width = self._table, self._classes, self._width
+        states = [0]  # empty patterns match any text
+        state = 0
+        for ch in text:
+            state = table[state * width + classes.get(ch, 0)]
+            if state < 0:
+                state = ~state
+                states.append(state)
+        outputs = self._outputs
+        return {outputs[i] for s in set(states) for i in self._ids(s)}
+
+
+def _int_view(values: np.ndarray, fmt: str) -> memoryview:
+    """Flat memoryview of the integers ``values``: item access without numpy scalars."""
+    return memoryview(np.ascontiguousarray(values).reshape(-1).view(np.uint8)).cast(fmt)
@@ -1,97 +1,474 @@
-from typing import Any, Dict
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from .drug_matcher import DrugMatcher
+from .index import InvertedIndex, tokenize
+from .matcher import AhoCorasick, AhoCorasickTable
+from .metrics import instrument
+from .utils import factorize_sorted
 
+# "substring": literal substring; "word": every token of the name as a whole
+# word; "phrase": the name's tokens as a contiguous whole-word phrase
+MATCH_MODES = ("substring", "word", "phrase")
+
+EDGE_COLUMNS = [
+    "drug_atccode",
+    "drug_name",
+    "source_type",
+    "source_id",
+    "source_title",
+    "journal",
+    "date",
+]
+# Edge columns repeating a few distinct values, carried as ``category``
+CATEGORICAL_EDGE_COLUMNS = ["drug_atccode", "drug_name", "source_type", "journal"]
+SOURCE_TYPES = ["pubmed", "clinical"]
+
+
+def _compile_drugs(drugs: pd.DataFrame) -> Tuple[AhoCorasick, List[List[int]]]:
+    """Compile the lowercased drug names into one automaton.
+
+    Returns the automaton and, for each pattern id, the positions of the drug
+    rows carrying that name (duplicated names share a single pattern).
+    """
+    rows_by_name: Dict[str, List[int]] = {}
+    for pos, name in enumerate(drugs["drug"]):
+        if isinstance(name, str):
+            rows_by_name.setdefault(name.lower(), []).append(pos)
+    return AhoCorasick(rows_by_name.keys()), list(rows_by_name.values())
+
+
+def _scan_titles(
+    automaton: AhoCorasick, rows_by_pattern: List[List[int]], titles: pd.Series
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Scan each title once; return matching (drug position, doc position) pairs.
+
+    Pairs are ordered by drug then document, like the former per-drug loop.
+    """
+    drug_pos: List[int] = []
+    doc_pos: List[int] = []
+    for pos, title in enumerate(titles):
+        if not isinstance(title, str):  # missing titles never match
+            continue
+        for pid in automaton.search(title.lower()):
+            rows = rows_by_pattern[pid]
+            drug_pos.extend(rows)
+            doc_pos.extend([pos] * len(rows))
+
+    drug_arr = np.asarray(drug_pos, dtype=np.int64)
+    doc_arr = np.asarray(doc_pos, dtype=np.int64)
+    order = np.lexsort((doc_arr, drug_arr))
+    return drug_arr[order], doc_arr[order]
+
+
+def _lookup_titles(
+    index: InvertedIndex, drugs: pd.DataFrame, contiguous: bool = True
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Look each drug up in a title index; return (drug position, doc position) pairs."""
+    drug_pos: List[np.ndarray] = [np.empty(0, dtype=np.int64)]
+    doc_pos: List[np.ndarray] = [np.empty(0, dtype=np.int64)]
+    docs_by_name: Dict[str, np.ndarray] = {}
+    for pos, name in enumerate(drugs["drug"]):
+        if isinstance(name, str):
+            key = name.lower()
+            if key not in docs_by_name:
+                docs_by_name[key] = index.lookup(tokenize(key), contiguous=contiguous)
+            docs = docs_by_name[key]
+            drug_pos.append(np.full(len(docs), pos, dtype=np.int64))
+            doc_pos.append(docs)
+    return np.concatenate(drug_pos), np.concatenate(doc_pos)
+
+
+def _prepare_matcher(
+    drugs: pd.DataFrame, match_mode: str, drug_matcher: Optional[DrugMatcher] = None
+) -> Tuple[Any, ...]:
+    """What matching titles without a prebuilt index needs, built once.
+
+    A compiled automaton in ``"substring"`` mode (the one of ``drug_matcher``
+    if given), otherwise the drug names (and whether phrases must be
+    contiguous) to look up in per-chunk indexes.
+    """
+    if match_mode == "substring":
+        if drug_matcher is not None:
+            return drug_matcher.automaton, drug_matcher.rows_by_pattern()
+        return _compile_drugs(drugs)
+    return drugs[["drug"]], match_mode == "phrase"
+
+
+def _match_titles(matcher: Tuple[Any, ...], titles: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """(drug position, doc position) pairs, ordered by drug then document."""
+    if isinstance(matcher[0], (AhoCorasick, AhoCorasickTable)):
+        return _scan_titles(matcher[0], matcher[1], titles)
+    drugs, contiguous = matcher
+    return _lookup_titles(InvertedIndex.build(titles), drugs, contiguous)
+
+
+# Matcher of a pool worker process, set once per process by ``_init_worker``
+_worker_matcher: Optional[Tuple[Any, ...]] = None
+
+
+def _init_worker(
+    drugs: pd.DataFrame, match_mode: str, drug_matcher: Optional[DrugMatcher] = None
+) -> None:
+    global _worker_matcher
+    _worker_matcher = _prepare_matcher(drugs, match_mode, drug_matcher)
+
+
+def _match_shard(titles: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    assert _worker_matcher is not None, "worker not initialized"
+    return _match_titles(_worker_matcher, titles)
+
+
+def _match_sharded(
+    pool: ProcessPoolExecutor, n_shards: int, titles: pd.Series
+) -> Tuple[np.ndarray, np.ndarray]:
+    """``_match_titles`` over row ranges of ``titles`` in parallel, same output."""
+    bounds = np.linspace(0, len(titles), n_shards + 1).astype(np.int64)
+    ranges = [(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+    results = pool.map(_match_shard, [titles.iloc[lo:hi] for lo, hi in ranges])
+    drug_pos: List[np.ndarray] = [np.empty(0, dtype=np.int64)]
+    doc_pos: List[np.ndarray] = [np.empty(0, dtype=np.int64)]
+    for (lo, _), (drugs, docs) in zip(ranges, results):
+        drug_pos.append(drugs)
+        doc_pos.append(docs + lo)
+    drug_arr, doc_arr = np.concatenate(drug_pos), np.concatenate(doc_pos)
+    order = np.lexsort((doc_arr, drug_arr))
+    return drug_arr[order], doc_arr[order]
+
+
+def _index_size_error(index: InvertedIndex, n_docs: int) -> ValueError:
+    return ValueError(f"Index covers {index.n_docs} documents but the frame has {n_docs} rows")
+
+
+def edges_frame(
+    drugs: pd.DataFrame,
+    docs: pd.DataFrame,
+    title_col: str,
+    source_type: str,
+    drug_pos: np.ndarray,
+    doc_pos: np.ndarray,
+) -> pd.DataFrame:
+    """Gather matched (drug, document) pairs into the edge schema.
+
+    ``CATEGORICAL_EDGE_COLUMNS`` come out as categoricals: taken as they are
+    from normalized inputs, converted otherwise.
+    """
+    d = drugs.iloc[drug_pos].reset_index(drop=True)
+    hits = docs.iloc[doc_pos].reset_index(drop=True)
+    source_codes = np.full(len(drug_pos), SOURCE_TYPES.index(source_type), dtype=np.int8)
+    return pd.DataFrame(
+        {
+            "drug_atccode": _as_category(d["atccode"]),
+            "drug_name": _as_category(d["drug"]),
+            "source_type": pd.Categorical.from_codes(source_codes, SOURCE_TYPES),
+            "source_id": hits["id"],
+            "source_title": hits[title_col],
+            "journal": _as_category(hits["journal"]),
+            "date": hits["date"],
+        },
+        columns=EDGE_COLUMNS,
+    )
+
+
+def _as_category(values: pd.Series) -> pd.Series:
+    return values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+
+
+def concat_edges(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """``pd.concat`` of edge frames, keeping ``CATEGORICAL_EDGE_COLUMNS`` categorical.
+
+    pandas falls back to ``object`` when the categories of the frames
+    differ: the columns are first recoded onto the union of their categories.
+    """
+    frames = [f.copy(deep=False) for f in frames]
+    for col in CATEGORICAL_EDGE_COLUMNS:
+        dtypes = [f[col].dtype for f in frames]
+        if not any(isinstance(t, pd.CategoricalDtype) for t in dtypes) or all(
+            t == dtypes[0] for t in dtypes
+        ):
+            continue
+        values = [
+            f[col].cat.categories if isinstance(t, pd.CategoricalDtype) else f[col].dropna()
+            for f, t in zip(frames, dtypes)
+        ]
+        categories = pd.unique(np.concatenate([v.to_numpy(dtype=object) for v in values]))
+        dtype = pd.CategoricalDtype(categories)
+        for f in frames:
+            f[col] = f[col].astype(dtype)
+    return pd.concat(frames, ignore_index=True)
+
+
+@instrument
 def compute_mentions(
-    drugs: pd.DataFrame, pubmed: pd.DataFrame, trials: pd.DataFrame
+    drugs: pd.DataFrame,
+    pubmed: pd.DataFrame,
+    trials: pd.DataFrame,
+    pubmed_index: Optional[InvertedIndex] = None,
+    trials_index: Optional[InvertedIndex] = None,
+    match_mode: str = "substring",
+    n_workers: int = 1,
+    drug_matcher: Optional[DrugMatcher] = None,
 ) -> pd.DataFrame:
     """
     Returns a DataFrame with columns:
     [drug_atccode, drug_name, source_type, source_id, source_title, journal, date]
+
+    Matching is case-insensitive and never interprets drug names as regexes.
+    ``match_mode`` selects how a name must occur in a title:
+
+    - ``"substring"`` (default): anywhere, even inside a longer word. All
+      names are compiled into a single Aho-Corasick automaton, so each title
+      is scanned once whatever the size of the drug dictionary.
+    - ``"word"``: every token of the name appears as a whole word.
+    - ``"phrase"``: the tokens of the name appear as a contiguous run of
+      whole words.
+
+    The ``"word"`` and ``"phrase"`` modes tokenize all titles once into an
+    :class:`~medmentions.index.InvertedIndex` and intersect the postings of
+    each name's tokens. Prebuilt indexes over ``pubmed["title"]`` and
+    ``trials["scientific_title"]`` can be passed to skip that step.
+
+    With ``n_workers > 1`` the titles are split into row ranges matched in
+    parallel by a pool of worker processes, each compiling the drugs once.
+    The output is identical to the serial one. Lookups in prebuilt indexes
+    are not parallelized.
+
+    ``drug_matcher``, a :class:`~medmentions.drug_matcher.DrugMatcher` of
+    ``drugs`` (e.g. mapped by ``load_matcher``), replaces compiling the
+    drugs in ``"substring"`` mode, in this process and in pool workers
+    (which map its file when it has one).
     """
-    edges = []
-
-    # PubMed: match on title
-    for _, d in drugs.iterrows():
-        hits = pubmed[pubmed["title"].str.contains(d["drug"], case=False, na=False)]
-        if not hits.empty:
-            tmp = hits.assign(
-                drug_atccode=d["atccode"],
-                drug_name=d["drug"],
-                source_type="pubmed",
-                source_id=hits["id"],
-                source_title=hits["title"],
-            )[
-                [
-                    "drug_atccode",
-                    "drug_name",
-                    "source_type",
-                    "source_id",
-                    "source_title",
-                    "journal",
-                    "date",
-                ]
-            ]
-            edges.append(tmp)
-
-    # Clinical trials: match on scientific_title
-    for _, d in drugs.iterrows():
-        hits = trials[trials["scientific_title"].str.contains(d["drug"], case=False, na=False)]
-        if not hits.empty:
-            tmp = hits.assign(
-                drug_atccode=d["atccode"],
-                drug_name=d["drug"],
-                source_type="clinical",
-                source_id=hits["id"],
-                source_title=hits["scientific_title"],
-            )[
-                [
-                    "drug_atccode",
-                    "drug_name",
-                    "source_type",
-                    "source_id",
-                    "source_title",
-                    "journal",
-                    "date",
-                ]
-            ]
-            edges.append(tmp)
-
-    if len(edges) == 0:
-        return pd.DataFrame(
-            columns=[
-                "drug_atccode",
-                "drug_name",
-                "source_type",
-                "source_id",
-                "source_title",
-                "journal",
-                "date",
-            ]
+    edges = list(
+        iter_mentions(
+            drugs,
+            [pubmed],
+            [trials],
+            pubmed_index,
+            trials_index,
+            match_mode,
+            n_workers,
+            drug_matcher,
         )
+    )
+    return concat_edges(edges)
 
-    return pd.concat(edges, ignore_index=True)
 
+@instrument
+def iter_mentions(
+    drugs: pd.DataFrame,
+    pubmed_chunks: Iterable[pd.DataFrame],
+    trials_chunks: Iterable[pd.DataFrame],
+    pubmed_index: Optional[InvertedIndex] = None,
+    trials_index: Optional[InvertedIndex] = None,
+    match_mode: str = "substring",
+    n_workers: int = 1,
+    drug_matcher: Optional[DrugMatcher] = None,
+) -> Iterator[pd.DataFrame]:
+    """Streaming ``compute_mentions``: yield the edges of each document chunk.
+
+    The drugs are compiled once and each chunk is matched as it arrives, so
+    memory is bounded by the chunk size (plus the edges the caller keeps).
+    In ``"word"``/``"phrase"`` mode without a prebuilt index, an index is
+    built per chunk; a prebuilt index must cover all chunks of its source
+    in order, and is queried once up front.
+
+    The concatenated edges equal those of ``compute_mentions`` on the
+    concatenated chunks, ordered chunk by chunk. At least one frame is
+    yielded (an empty one with the edge columns if nothing matches).
+    """
+    emitted = False
+    for title_col, source_type, docs, drug_pos, doc_pos in iter_pairs(
+        drugs,
+        pubmed_chunks,
+        trials_chunks,
+        pubmed_index,
+        trials_index,
+        match_mode,
+        n_workers,
+        drug_matcher,
+    ):
+        if len(drug_pos):
+            emitted = True
+            yield edges_frame(drugs, docs, title_col, source_type, drug_pos, doc_pos)
+
+    if not emitted:
+        yield pd.DataFrame(columns=EDGE_COLUMNS)
+
+
+def iter_pairs(
+    drugs: pd.DataFrame,
+    pubmed_chunks: Iterable[pd.DataFrame],
+    trials_chunks: Iterable[pd.DataFrame],
+    pubmed_index: Optional[InvertedIndex],
+    trials_index: Optional[InvertedIndex],
+    match_mode: str,
+    n_workers: int = 1,
+    drug_matcher: Optional[DrugMatcher] = None,
+) -> Iterator[Tuple[str, str, pd.DataFrame, np.ndarray, np.ndarray]]:
+    """Match chunk by chunk; yield ``(title_col, source_type, docs, drug_pos, doc_pos)``.
+
+    Every chunk is yielded, as soon as matched (with empty positions when
+    nothing matches). Positions are row positions in ``drugs`` and in the
+    chunk ``docs``.
+    """
+    if match_mode not in MATCH_MODES:
+        raise ValueError(f"match_mode must be one of {MATCH_MODES}, got {match_mode!r}")
+    if match_mode == "substring" and (pubmed_index is not None or trials_index is not None):
+        raise ValueError("Title indexes require match_mode 'word' or 'phrase'")
+    if n_workers < 1:
+        raise ValueError(f"n_workers must be at least 1, got {n_workers}")
+    if drug_matcher is not None and drug_matcher.n_drugs != len(drugs):
+        raise ValueError(
+            f"Drug matcher covers {drug_matcher.n_drugs} drugs but the frame has {len(drugs)} rows"
+        )
+    contiguous = match_mode == "phrase"
+    # Created on first use: the drugs are compiled once, in this process or in
+    # each pool worker
+    matcher: Optional[Tuple[Any, ...]] = None
+    pool: Optional[ProcessPoolExecutor] = None
+
+    try:
+        # PubMed: match on title; clinical trials: match on scientific_title
+        for chunks, title_col, source_type, index in (
+            (pubmed_chunks, "title", "pubmed", pubmed_index),
+            (trials_chunks, "scientific_title", "clinical", trials_index),
+        ):
+            if index is not None:
+                # All hits up front, sorted by document to slice them per chunk
+                all_drugs, all_docs = _lookup_titles(index, drugs, contiguous)
+                by_doc = np.argsort(all_docs, kind="stable")
+                all_drugs, all_docs = all_drugs[by_doc], all_docs[by_doc]
+
+            start = 0
+            for docs in chunks:
+                stop = start + len(docs)
+                if index is None and n_workers > 1:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(
+                            n_workers,
+                            initializer=_init_worker,
+                            initargs=(drugs[["drug"]], match_mode, drug_matcher),
+                        )
+                    drug_pos, doc_pos = _match_sharded(pool, n_workers, docs[title_col])
+                elif index is None:
+                    if matcher is None:
+                        matcher = _prepare_matcher(drugs, match_mode, drug_matcher)
+                    drug_pos, doc_pos = _match_titles(matcher, docs[title_col])
+                else:
+                    if stop > index.n_docs:
+                        raise _index_size_error(index, stop)
+                    lo, hi = np.searchsorted(all_docs, [start, stop])
+                    order = np.lexsort((all_docs[lo:hi], all_drugs[lo:hi]))
+                    drug_pos, doc_pos = all_drugs[lo:hi][order], all_docs[lo:hi][order] - start
+                yield title_col, source_type, docs, drug_pos, doc_pos
+                start = stop
+
+            if index is not None and start != index.n_docs:
+                raise _index_size_error(index, start)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+@instrument
+def merge_edge_parts(parts: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Merge the edges of consecutive row ranges of the corpora into one edge set.
+
+    Parts must be given in row order, each holding the PubMed then the
+    clinical edges of its range (as ``iter_mentions`` or ``compute_mentions``
+    produce them). PubMed edges come first, in part order, as if the
+    whole corpora had been matched chunk by chunk.
+    """
+    frames = [p for p in parts if len(p)] or [pd.DataFrame(columns=EDGE_COLUMNS)]
+    edges = concat_edges(frames)
+    order = np.argsort((edges["source_type"] != "pubmed").to_numpy(), kind="stable")
+    return edges.iloc[order].reset_index(drop=True)
+
+
+# Dates as ``normalize_dates`` leaves them once written as text
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def distinct_drug_pairs(edges: pd.DataFrame) -> pd.DataFrame:
+    """Distinct (drug_atccode, drug_name) pairs in first-seen order.
+
+    Same as ``drop_duplicates`` on the two columns, computed on their
+    factorized codes (the codes themselves for categoricals).
+    """
+    atc_codes, _ = pd.factorize(edges["drug_atccode"], use_na_sentinel=False)
+    name_codes, name_uniques = pd.factorize(edges["drug_name"], use_na_sentinel=False)
+    keys = atc_codes.astype(np.int64) * max(len(name_uniques), 1) + name_codes
+    first = np.sort(np.unique(keys, return_index=True)[1])
+    return edges.iloc[first][["drug_atccode", "drug_name"]]
+
+
+def graph_drugs(drug_pairs: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Drug nodes from the distinct (drug_atccode, drug_name) pairs, sorted by atccode."""
+    # By value, not in category order
+    drugs = drug_pairs.astype(object).sort_values("drug_atccode")
+    return [
+        {"atccode": atccode, "name": name}
+        for atccode, name in zip(drugs["drug_atccode"].tolist(), drugs["drug_name"].tolist())
+    ]
 
-def build_graph_df(edges: pd.DataFrame) -> Dict[str, Any]:
-    drugs = edges[["drug_atccode", "drug_name"]].drop_duplicates().sort_values("drug_atccode")
-    journals = sorted(edges["journal"].dropna().unique().tolist())
-    out_edges = edges.copy()
-    out_edges["date"] = pd.to_datetime(out_edges["date"]).dt.date.astype(str)
 
+def _graph_dates(dates: pd.Series) -> List[str]:
+    """``pd.to_datetime(dates).dt.date.astype(str)``, formatting each distinct date once.
+
+    The column is factorized (categorical codes): its distinct values are
+    kept as they are when already ``YYYY-MM-DD`` strings, else parsed and
+    formatted with ``strftime``, then mapped back through the codes.
+    Missing dates come out as ``"NaT"``.
+    """
+    codes, uniques = pd.factorize(dates)
+    if uniques.dtype == object and all(
+        isinstance(v, str) and _ISO_DATE_RE.fullmatch(v) for v in uniques
+    ):
+        values = list(uniques)
+    else:
+        parsed = pd.to_datetime(pd.Series(uniques))
+        values = parsed.dt.strftime("%Y-%m-%d").fillna("NaT").tolist()
+    formatted = np.array(values + ["NaT"], dtype=object)  # code -1 picks "NaT"
+    return formatted[codes].tolist()
+
+
+def graph_edges(edges: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Edge records, as ``to_dict(orient="records")`` with normalized dates.
+
+    Built column by column: ``edges`` is neither copied nor modified.
+    """
+    columns = {
+        col: _graph_dates(edges[col]) if col == "date" else edges[col].tolist()
+        for col in edges.columns
+    }
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+@instrument
+def build_graph_df(edges: pd.DataFrame) -> Dict[str, Any]:
     return {
-        "drugs": [
-            {"atccode": r.drug_atccode, "name": r.drug_name} for r in drugs.itertuples(index=False)
-        ],
-        "journals": journals,
-        "edges": out_edges.to_dict(orient="records"),
+        "drugs": graph_drugs(distinct_drug_pairs(edges)),
+        "journals": sorted(edges["journal"].dropna().unique().tolist()),
+        "edges": graph_edges(edges),
     }
 
 
+@instrument
 def journal_with_most_distinct_drugs(edges: pd.DataFrame) -> Dict[str, Any]:
-    if edges.empty:
+    """Journal mentioning the most distinct drugs: ties go to the first journal by name."""
+    # groupby("journal")["drug_atccode"].nunique(), on integer codes
+    journal_codes, journals = factorize_sorted(edges["journal"])
+    drug_codes, drugs = pd.factorize(edges["drug_atccode"])
+    known = (journal_codes >= 0) & (drug_codes >= 0)
+    n_drugs = max(len(drugs), 1)
+    pairs = np.unique(journal_codes[known].astype(np.int64) * n_drugs + drug_codes[known])
+    counts = np.bincount(pairs // n_drugs, minlength=len(journals))
+    if not len(counts):
         return {"journal": None, "distinct_drugs": 0}
-    counts = edges.groupby("journal")["drug_atccode"].nunique().sort_values(ascending=False)
-    top_journal = counts.index[0]
-    return {"journal": top_journal, "distinct_drugs": int(counts.iloc[0])}
+    top = int(np.argmax(counts))  # the first maximum: journals are sorted
+    return {"journal": journals[top], "distinct_drugs": int(counts[top])}
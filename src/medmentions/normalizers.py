@@ -1,51 +1,108 @@
 from __future__ import annotations
 
+from typing import Optional, Sequence
+
 import pandas as pd
 
+from .metrics import instrument
 from .utils import normalize_dates, normalize_text_series
 
+# Bump when the normalized frames change (readers or normalizers): cached
+# normalized intermediates are keyed on it
+NORMALIZER_VERSION = 2
+
+
+def _output_frame(
+    df: pd.DataFrame, columns: Optional[Sequence[str]], inplace: bool, normalized: Sequence[str]
+) -> pd.DataFrame:
+    """The frame a normalizer writes its ``normalized`` columns into.
+
+    Holds ``columns`` (default: all of them, in order). Without ``inplace``
+    it is a new frame sharing the columns about to be replaced with ``df``
+    and holding copies of the others. With it, ``df`` itself.
+    """
+    order = list(df.columns) if columns is None else list(columns)
+    missing = [c for c in order if c not in df.columns]
+    if missing:
+        raise KeyError(f"Columns not found: {missing}")
+    if not inplace:
+        return pd.DataFrame(
+            {c: df[c] if c in normalized else df[c].copy() for c in order}, copy=False
+        )
+    # Columns of one block are views of a single 2D array, which keeps all
+    # their raw values alive until every one is replaced: give each column
+    # its own array, so that a raw column is freed as soon as it is normalized
+    moved = [df[c].copy() for c in order]
+    df.drop(columns=df.columns, inplace=True)
+    for c, values in zip(order, moved):
+        df[c] = values
+    return df
+
 
-def normalize_drugs(df: pd.DataFrame) -> pd.DataFrame:
+@instrument
+def normalize_drugs(
+    df: pd.DataFrame, columns: Optional[Sequence[str]] = None, inplace: bool = False
+) -> pd.DataFrame:
     """Normalize the drugs dataframe.
 
     - Normalize text in the ``drug`` column
     - Trim whitespace in ``atccode`` (kept as string)
+
+    Both are repeated on every edge of the drug: they come out as
+    ``category`` columns.
+
+    ``columns`` keeps only those columns, in that order: the others are
+    neither copied nor normalized. With ``inplace=True`` the caller hands
+    ``df`` over: it is normalized in place and returned, and each raw
+    column is freed as soon as its normalized version replaces it, instead
+    of living on in ``df`` next to the result. The same options apply to
+    ``normalize_pubmed`` and ``normalize_trials``.
     """
-    out = df.copy()
+    out = _output_frame(df, columns, inplace, ("drug", "atccode"))
     if "drug" in out.columns:
-        out["drug"] = normalize_text_series(out["drug"])
+        out["drug"] = normalize_text_series(out["drug"], as_category=True)
     if "atccode" in out.columns:
-        out["atccode"] = out["atccode"].astype(str).str.strip()
+        out["atccode"] = out["atccode"].astype(str).str.strip().astype("category")
     return out
 
 
-def normalize_pubmed(df: pd.DataFrame) -> pd.DataFrame:
+@instrument
+def normalize_pubmed(
+    df: pd.DataFrame, columns: Optional[Sequence[str]] = None, inplace: bool = False
+) -> pd.DataFrame:
     """Normalize the pubmed dataframe.
 
-    - Normalize text in ``title`` and ``journal``
+    - Normalize text in ``title`` and ``journal`` (as a ``category`` column)
     - If present, parse ``date`` into ``datetime.date`` objects
+
+    ``columns`` and ``inplace`` work as in ``normalize_drugs``.
     """
-    out = df.copy()
+    out = _output_frame(df, columns, inplace, ("title", "journal", "date"))
     if "title" in out.columns:
         out["title"] = normalize_text_series(out["title"])
     if "journal" in out.columns:
-        out["journal"] = normalize_text_series(out["journal"])
+        out["journal"] = normalize_text_series(out["journal"], as_category=True)
     if "date" in out.columns:
         out["date"] = normalize_dates(out["date"])
     return out
 
 
-def normalize_trials(df: pd.DataFrame) -> pd.DataFrame:
+@instrument
+def normalize_trials(
+    df: pd.DataFrame, columns: Optional[Sequence[str]] = None, inplace: bool = False
+) -> pd.DataFrame:
     """Normalize the clinical trials dataframe.
 
-    - Normalize text in ``scientific_title`` and ``journal``
+    - Normalize text in ``scientific_title`` and ``journal`` (as a ``category`` column)
     - If present, parse ``date`` into ``datetime.date`` objects
+
+    ``columns`` and ``inplace`` work as in ``normalize_drugs``.
     """
-    out = df.copy()
+    out = _output_frame(df, columns, inplace, ("scientific_title", "journal", "date"))
     if "scientific_title" in out.columns:
         out["scientific_title"] = normalize_text_series(out["scientific_title"])
     if "journal" in out.columns:
-        out["journal"] = normalize_text_series(out["journal"])
+        out["journal"] = normalize_text_series(out["journal"], as_category=True)
     if "date" in out.columns:
         out["date"] = normalize_dates(out["date"])
     return out
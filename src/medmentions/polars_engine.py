@@ -0,0 +1,383 @@
+"""Polars engine: readers, normalizers, mentions and graph on lazy frames.
+
+Same function names and signatures as ``readers``, ``normalizers`` and
+``mentions``, built on ``polars.LazyFrame``: each step adds to a query plan
+that polars optimizes (projection and predicate pushdown) and runs on all
+cores when collected. Requires the ``polars`` package.
+
+Functions accept pandas or polars frames and return lazy frames; text
+columns stay ``String`` and dates are ``Date``. ``to_pandas`` converts a
+result to the dtypes of the pandas engine (categoricals, ``datetime.date``
+objects), which it matches value for value.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from .index import InvertedIndex
+from .mentions import CATEGORICAL_EDGE_COLUMNS, MATCH_MODES, SOURCE_TYPES
+from .metrics import instrument
+from .readers import iter_json_records
+from .utils import DATE_FORMATS, parse_dates_with_fallbacks
+
+# Strings ``pd.read_csv`` reads as missing by default
+_NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+# Tokens of ``index.tokenize``: runs of letters, digits and underscores
+_TOKEN_PATTERN = r"[\p{L}\p{N}_]+"
+
+
+def _lazy(df: Any) -> pl.LazyFrame:
+    if isinstance(df, pl.LazyFrame):
+        return df
+    if isinstance(df, pl.DataFrame):
+        return df.lazy()
+    return pl.from_pandas(df).lazy()
+
+
+def to_pandas(frame: Any) -> pd.DataFrame:
+    """Collect ``frame`` into a pandas frame with the pandas engine's dtypes.
+
+    Columns the pandas engine carries as ``category`` (journals, drug names
+    and codes, edge ``source_type``) become categoricals with sorted
+    categories (``SOURCE_TYPES`` for ``source_type``), dates become
+    ``datetime.date`` objects and other text columns ``object`` columns.
+    """
+    df = frame.collect() if isinstance(frame, pl.LazyFrame) else frame
+    out = pd.DataFrame(
+        {
+            name: pd.Series(df[name].to_list(), dtype=object if dtype == pl.String else None)
+            for name, dtype in df.schema.items()
+        },
+        columns=df.columns,
+    )
+    categorical = {"atccode", "drug", "journal", *CATEGORICAL_EDGE_COLUMNS}
+    for col in out.columns:
+        if col == "source_type":
+            out[col] = out[col].astype(pd.CategoricalDtype(SOURCE_TYPES))
+        elif col in categorical and df.schema[col] == pl.String:
+            out[col] = out[col].astype("category")
+    return out
+
+
+# ---------- readers ----------
+
+
+def _scan_csv(path: str | Path, columns: List[str]) -> pl.LazyFrame:
+    # All columns as strings, like ``pd.read_csv(dtype=str)``
+    frame = pl.scan_csv(path, infer_schema=False, null_values=_NA_VALUES)
+    return frame.rename(str.lower).select(columns)
+
+
+@instrument
+def read_drugs_csv(path: str | Path) -> pl.LazyFrame:
+    return _scan_csv(path, ["atccode", "drug"])
+
+
+@instrument
+def read_pubmed_csv(path: str | Path) -> pl.LazyFrame:
+    return _scan_csv(path, ["id", "title", "journal", "date"])
+
+
+@instrument
+def read_pubmed_json(path: str | Path) -> pl.LazyFrame:
+    """Records parsed by ``readers.iter_json_records`` (trailing commas tolerated).
+
+    Values are stringified like the CSV columns: ids are ints in the JSON feed.
+    """
+    columns = ["id", "title", "journal", "date"]
+    values: Dict[str, List[Optional[str]]] = {col: [] for col in columns}
+    for record in iter_json_records(path):
+        record = {str(k).lower(): v for k, v in record.items()}
+        for col in columns:
+            value = record.get(col)
+            values[col].append(None if value is None else str(value))
+    return pl.DataFrame(values, schema={col: pl.String for col in columns}).lazy()
+
+
+@instrument
+def read_clinical_trials_csv(path: str | Path) -> pl.LazyFrame:
+    return _scan_csv(path, ["id", "scientific_title", "journal", "date"])
+
+
+# ---------- normalizers ----------
+
+
+def _normalize_text(expr: pl.Expr) -> pl.Expr:
+    """``utils.normalize_text`` as an expression; missing values stay missing."""
+    return (
+        expr.cast(pl.String)
+        .str.normalize("NFKD")
+        .str.replace_all(r"\p{Mn}", "")
+        .str.to_lowercase()
+        # ``str.split()`` separators: Unicode whitespace and \x1c-\x1f
+        .str.replace_all(r"[\s\x1c-\x1f]+", " ")
+        .str.strip_chars(" ")
+    )
+
+
+def _parse_dates(series: pl.Series) -> pl.Series:
+    """``utils.normalize_dates`` on a string column, parsing each distinct value once.
+
+    Values are tried against ``DATE_FORMATS`` in order, the rest go through
+    the pandas fallbacks. Raises ``ValueError`` on values none can parse
+    (missing ones included, as the pandas engine does).
+    """
+    stripped = series.cast(pl.String).str.strip_chars()
+    uniques = stripped.unique(maintain_order=True)
+    parsed = pl.select(
+        pl.coalesce([uniques.str.strptime(pl.Date, fmt, strict=False) for fmt in DATE_FORMATS])
+    ).to_series()
+    rest = parsed.is_null().to_numpy()
+    if rest.any():
+        values = np.asarray(uniques.to_list(), dtype=object)
+        fallback = parse_dates_with_fallbacks(pd.Series(values[rest].astype(str), dtype=object))
+        filled = parsed.to_list()
+        for i, value in zip(np.flatnonzero(rest), fallback):
+            filled[i] = None if pd.isna(value) else value.date()
+        parsed = pl.Series(filled, dtype=pl.Date)
+        failed = parsed.is_null().to_numpy()
+        if failed.any():
+            bad = [str(v) for v in values[failed]]
+            raise ValueError(f"Unrecognized date formats: {bad[:5]}{'...' if len(bad) > 5 else ''}")
+    lookup = pl.DataFrame({"value": uniques, "parsed": parsed})
+    result = pl.DataFrame({"value": stripped}).join(
+        lookup, on="value", how="left", nulls_equal=True, maintain_order="left"
+    )
+    return result["parsed"].alias(series.name)
+
+
+def _normalize_docs(df: Any, title_col: str) -> pl.LazyFrame:
+    out = _lazy(df)
+    columns = out.collect_schema().names()
+    exprs = [_normalize_text(pl.col(c)) for c in (title_col, "journal") if c in columns]
+    if "date" in columns:
+        exprs.append(pl.col("date").map_batches(_parse_dates, return_dtype=pl.Date))
+    return out.with_columns(exprs)
+
+
+@instrument
+def normalize_drugs(df: Any) -> pl.LazyFrame:
+    """Normalize the drugs frame: text in ``drug``, whitespace trimmed in ``atccode``."""
+    out = _lazy(df)
+    columns = out.collect_schema().names()
+    exprs = []
+    if "drug" in columns:
+        exprs.append(_normalize_text(pl.col("drug")))
+    if "atccode" in columns:
+        # ``astype(str)`` in the pandas engine: missing codes become "nan"
+        exprs.append(pl.col("atccode").cast(pl.String).fill_null("nan").str.strip_chars())
+    return out.with_columns(exprs)
+
+
+@instrument
+def normalize_pubmed(df: Any) -> pl.LazyFrame:
+    """Normalize the pubmed frame: text in ``title`` and ``journal``, ``date`` parsed."""
+    return _normalize_docs(df, "title")
+
+
+@instrument
+def normalize_trials(df: Any) -> pl.LazyFrame:
+    """Normalize the trials frame: text in ``scientific_title`` and ``journal``, ``date`` parsed."""
+    return _normalize_docs(df, "scientific_title")
+
+
+# ---------- mentions ----------
+
+
+def _tokens(expr: pl.Expr) -> pl.Expr:
+    return expr.str.extract_all(_TOKEN_PATTERN)
+
+
+def _substring_pairs(drugs: pl.LazyFrame, titles: pl.LazyFrame) -> pl.LazyFrame:
+    """Names found anywhere in the titles: one Aho-Corasick scan of each title."""
+    names = drugs.select(name=pl.col("name").unique()).drop_nulls().collect()["name"]
+    # An empty name occurs in every title; ``extract_many`` never reports it
+    patterns = names.filter(names != "")
+    parts = [titles.select("doc_pos", name=pl.lit(""))] if len(patterns) < len(names) else []
+    if len(patterns):
+        found = pl.col("title").str.extract_many(patterns.to_list(), overlapping=True)
+        parts.append(titles.select("doc_pos", name=found).explode("name"))
+    if not parts:
+        return pl.LazyFrame(schema={"drug_pos": pl.UInt32, "doc_pos": pl.UInt32})
+    hits = pl.concat(parts).drop_nulls().unique()
+    return hits.join(drugs.select("drug_pos", "name"), on="name").select("drug_pos", "doc_pos")
+
+
+def _token_pairs(drugs: pl.LazyFrame, titles: pl.LazyFrame, contiguous: bool) -> pl.LazyFrame:
+    """Names whose tokens are all title tokens (consecutive ones if ``contiguous``)."""
+    drug_tokens = (
+        drugs.select("drug_pos", token=_tokens(pl.col("name")))
+        .with_columns(n=pl.col("token").list.len(), i=pl.int_ranges(pl.col("token").list.len()))
+        .explode("token", "i")
+        .drop_nulls("token")
+    )
+    doc_tokens = (
+        titles.select("doc_pos", token=_tokens(pl.col("title")))
+        .with_columns(i=pl.int_ranges(pl.col("token").list.len()))
+        .explode("token", "i")
+        .drop_nulls("token")
+    )
+    if contiguous:
+        # All tokens of the name match at the same offset in the title
+        joined = drug_tokens.join(doc_tokens, on="token", suffix="_doc")
+        return (
+            joined.group_by("drug_pos", "doc_pos", offset=pl.col("i_doc") - pl.col("i"))
+            .agg(matched=pl.len(), n=pl.col("n").first())
+            .filter(pl.col("matched") == pl.col("n"))
+            .select("drug_pos", "doc_pos")
+            .unique()
+        )
+    drug_tokens = drug_tokens.select("drug_pos", "token").unique()
+    sizes = drug_tokens.group_by("drug_pos").agg(n=pl.len())
+    doc_tokens = doc_tokens.select("doc_pos", "token").unique()
+    return (
+        drug_tokens.join(doc_tokens, on="token")
+        .group_by("drug_pos", "doc_pos")
+        .agg(matched=pl.len())
+        .join(sizes, on="drug_pos")
+        .filter(pl.col("matched") == pl.col("n"))
+        .select("drug_pos", "doc_pos")
+    )
+
+
+def _source_edges(
+    drugs: pl.LazyFrame, docs: Any, title_col: str, source_type: str, match_mode: str
+) -> pl.LazyFrame:
+    docs = _lazy(docs).with_row_index("doc_pos")
+    titles = docs.select("doc_pos", title=pl.col(title_col).cast(pl.String).str.to_lowercase())
+    titles = titles.drop_nulls("title")
+    if match_mode == "substring":
+        pairs = _substring_pairs(drugs, titles)
+    else:
+        pairs = _token_pairs(drugs, titles, contiguous=match_mode == "phrase")
+    return (
+        pairs.join(drugs, on="drug_pos")
+        .join(docs, on="doc_pos")
+        .sort("drug_pos", "doc_pos")
+        .select(
+            drug_atccode=pl.col("atccode").cast(pl.String),
+            drug_name=pl.col("drug").cast(pl.String),
+            source_type=pl.lit(source_type),
+            source_id=pl.col("id").cast(pl.String),
+            source_title=pl.col(title_col).cast(pl.String),
+            journal=pl.col("journal").cast(pl.String),
+            date=pl.col("date"),
+        )
+    )
+
+
+@instrument
+def compute_mentions(
+    drugs: Any,
+    pubmed: Any,
+    trials: Any,
+    pubmed_index: Optional[InvertedIndex] = None,
+    trials_index: Optional[InvertedIndex] = None,
+    match_mode: str = "substring",
+    n_workers: int = 1,
+) -> pl.LazyFrame:
+    """``mentions.compute_mentions`` as joins on lazy frames: same edges, same order.
+
+    ``"substring"`` mode scans each title once with polars' Aho-Corasick
+    ``extract_many``; ``"word"`` and ``"phrase"`` modes join title tokens to
+    name tokens (at a common offset for phrases). Polars parallelizes every
+    step itself: ``n_workers`` is accepted for compatibility and ignored, as
+    are prebuilt indexes (titles are tokenized in the query).
+    """
+    if match_mode not in MATCH_MODES:
+        raise ValueError(f"match_mode must be one of {MATCH_MODES}, got {match_mode!r}")
+    if match_mode == "substring" and (pubmed_index is not None or trials_index is not None):
+        raise ValueError("Title indexes require match_mode 'word' or 'phrase'")
+    if n_workers < 1:
+        raise ValueError(f"n_workers must be at least 1, got {n_workers}")
+    drugs_lf = (
+        _lazy(drugs)
+        .select("atccode", "drug")
+        .with_row_index("drug_pos")
+        .with_columns(name=pl.col("drug").cast(pl.String).str.to_lowercase())
+    )
+    return pl.concat(
+        [
+            _source_edges(drugs_lf, pubmed, "title", "pubmed", match_mode),
+            _source_edges(drugs_lf, trials, "scientific_title", "clinical", match_mode),
+        ],
+        how="vertical_relaxed",
+    )
+
+
+# ---------- graph ----------
+
+
+def _collect(edges: Any) -> pl.DataFrame:
+    if isinstance(edges, pl.LazyFrame):
+        return edges.collect()
+    if isinstance(edges, pl.DataFrame):
+        return edges
+    return pl.from_pandas(edges)
+
+
+@instrument
+def build_graph_df(edges: Any) -> Dict[str, Any]:
+    """``mentions.build_graph_df``: drug nodes, sorted journals and edge records."""
+    df = _collect(edges)
+    drugs = (
+        df.select("drug_atccode", "drug_name")
+        .unique(maintain_order=True)
+        .sort("drug_atccode", maintain_order=True, nulls_last=True)
+    )
+    journals = df["journal"].drop_nulls().unique().sort()
+    records = df.with_columns(
+        pl.col("date").cast(pl.Date).dt.strftime("%Y-%m-%d").fill_null("NaT")
+    ).to_dicts()
+    return {
+        "drugs": [
+            {"atccode": atccode, "name": name}
+            for atccode, name in zip(drugs["drug_atccode"].to_list(), drugs["drug_name"].to_list())
+        ],
+        "journals": journals.to_list(),
+        "edges": records,
+    }
+
+
+@instrument
+def journal_with_most_distinct_drugs(edges: Any) -> Dict[str, Any]:
+    """``mentions.journal_with_most_distinct_drugs``: ties go to the first journal by name."""
+    counts = (
+        _lazy(edges)
+        .drop_nulls(["journal", "drug_atccode"])
+        .group_by("journal")
+        .agg(distinct_drugs=pl.col("drug_atccode").n_unique())
+        .sort(["distinct_drugs", "journal"], descending=[True, False])
+        .head(1)
+        .collect()
+    )
+    if counts.is_empty():
+        return {"journal": None, "distinct_drugs": 0}
+    return {"journal": counts["journal"][0], "distinct_drugs": int(counts["distinct_drugs"][0])}
@@ -3,34 +3,196 @@ from __future__ import annotations
 import json
 import re
 from pathlib import Path
+from typing import Any, Callable, Iterator, List
 
 import pandas as pd
 
+from .metrics import instrument
 
+# Rows per frame yielded by the ``iter_*`` readers
+DEFAULT_CHUNKSIZE = 100_000
+
+
+@instrument
 def read_drugs_csv(path: str | Path) -> pd.DataFrame:
-    df = pd.read_csv(path, dtype=str).rename(columns=str.lower)
     # Expected columns: atccode, drug
-    return df[["atccode", "drug"]]
+    return _read_csv(path, ["atccode", "drug"])
 
 
+@instrument
 def read_pubmed_csv(path: str | Path) -> pd.DataFrame:
-    df = pd.read_csv(path, dtype=str).rename(columns=str.lower)
-
     # id, title, journal, date
-    return df[["id", "title", "journal", "date"]]
+    return _read_csv(path, ["id", "title", "journal", "date"])
 
 
+@instrument
 def read_pubmed_json(path: str | Path) -> pd.DataFrame:
     # Be tolerant to trailing commas in the JSON (present in the sample file)
-    text = Path(path).read_text(encoding="utf-8")
-    # Remove trailing commas before closing braces/brackets: ", }" or ", ]"
-    cleaned = re.sub(r",\s*([}\]])", r"\1", text)
-    data = json.loads(cleaned)
-    df = pd.DataFrame(data).rename(columns=str.lower)
-    return df[["id", "title", "journal", "date"]]
+    return _pubmed_json_frame(list(iter_json_records(path)))
+
+
+def _pubmed_json_frame(records: List[Any]) -> pd.DataFrame:
+    columns = ["id", "title", "journal", "date"]
+    if not records:
+        return pd.DataFrame(columns=columns, dtype=str)
+    # dtype=str like the CSV readers: ids are ints in the JSON feed
+    df = pd.DataFrame(records, dtype=str).rename(columns=str.lower)
+    return df[columns]
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Characters a JSON number may go on with
+_NUMBER_TAIL = re.compile(r"[0-9eE+\-.]*")
+# Text up to the next trailing comma (a comma before a closing bracket),
+# skipping over JSON strings; stops early at a string cut by the buffer end
+_UNTIL_TRAILING_COMMA = re.compile(r'(?:[^",]+|"(?:[^"\\]|\\.)*"|,(?!\s*[}\]]))*')
+
+
+def _drop_trailing_commas(text: str) -> str:
+    """Drop the commas closing an object or array in ``text``, never inside strings.
+
+    Only single trailing commas go: a comma right after ``[``, ``{`` or
+    another comma is kept, and the JSON stays invalid.
+    """
+    parts = []
+    i = 0
+    while True:
+        j = _UNTIL_TRAILING_COMMA.match(text, i).end()  # type: ignore[union-attr]
+        if j == len(text) or text[j] != ",":
+            parts.append(text[i:])
+            return "".join(parts)
+        kept = text[:j].rstrip()[-1:] in ("", ",", "[", "{")
+        parts.append(text[i : j + 1] if kept else text[i:j])
+        i = j + 1
+
+
+def iter_json_records(path: str | Path, block_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time.
+
+    The file is read in blocks of ``block_size`` characters, so memory is
+    bounded by the block plus the largest record. Elements are separated by
+    exactly one comma; a single trailing comma is tolerated after the last
+    element, and after the last member of an element: when the C decoder
+    rejects an element, trailing commas are dropped from the unread part of
+    the buffer (never inside strings) and the element is decoded again. An
+    element followed by nothing but number characters up to the end of the
+    buffer is decoded again with the next block: a number may go on there.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def read_more() -> None:
+            nonlocal buf, pos, eof
+            more = f.read(block_size)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+
+        def peek() -> str:
+            """Skip whitespace, reading on as needed; the next character ("" at the end)."""
+            nonlocal pos
+            while True:
+                pos = _WHITESPACE.match(buf, pos).end()  # type: ignore[union-attr]
+                if pos < len(buf) or eof:
+                    return buf[pos : pos + 1]
+                read_more()
 
+        if peek() != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+        expect_element = True  # after "[" or a comma
+        while True:
+            char = peek()
+            if char == "":
+                raise ValueError(f"{path}: unterminated JSON array")
+            if char == "]":
+                return
+            if char == ",":
+                if expect_element:
+                    raise ValueError(f"{path}: unexpected ',' in the JSON array")
+                pos += 1
+                expect_element = True
+                continue
+            if not expect_element:
+                raise ValueError(f"{path}: expected ',' or ']' after a JSON array element")
+            while True:
+                try:
+                    record, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    rest = buf[pos:]
+                    cleaned = _drop_trailing_commas(rest)
+                    if cleaned == rest:
+                        if eof:
+                            raise
+                        read_more()  # element cut at the block boundary
+                    else:
+                        buf, pos = cleaned, 0
+                    continue
+                # A number cut by the buffer end decodes as a shorter one
+                if eof or _NUMBER_TAIL.match(buf, end).end() < len(buf):  # type: ignore[union-attr]
+                    break
+                read_more()
+            pos = end
+            expect_element = False
+            yield record
 
+
+@instrument
+def iter_pubmed_json(
+    path: str | Path, chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[pd.DataFrame]:
+    """Like ``read_pubmed_json`` but yields frames of at most ``chunksize`` rows.
+
+    Records are parsed incrementally, so the whole file is never held in
+    memory. Row indexes continue across chunks.
+    """
+    batch: List[Any] = []
+    start = 0
+    for record in iter_json_records(path):
+        batch.append(record)
+        if len(batch) == chunksize:
+            yield _pubmed_json_frame(batch).set_axis(pd.RangeIndex(start, start + len(batch)))
+            start += len(batch)
+            batch = []
+    if batch or start == 0:
+        yield _pubmed_json_frame(batch).set_axis(pd.RangeIndex(start, start + len(batch)))
+
+
+@instrument
 def read_clinical_trials_csv(path: str | Path) -> pd.DataFrame:
-    df = pd.read_csv(path, dtype=str).rename(columns=str.lower)
     # id, scientific_title, journal, date
-    return df[["id", "scientific_title", "journal", "date"]]
+    return _read_csv(path, ["id", "scientific_title", "journal", "date"])
+
+
+def _usecols(columns: List[str]) -> Callable[[str], bool]:
+    """``usecols`` of ``pd.read_csv`` parsing only ``columns`` (header case ignored)."""
+    wanted = set(columns)
+    return lambda name: name.lower() in wanted
+
+
+def _read_csv(path: str | Path, columns: List[str]) -> pd.DataFrame:
+    df = pd.read_csv(path, dtype=str, usecols=_usecols(columns)).rename(columns=str.lower)
+    return df[columns]
+
+
+def _iter_csv(path: str | Path, columns: List[str], chunksize: int) -> Iterator[pd.DataFrame]:
+    with pd.read_csv(path, dtype=str, usecols=_usecols(columns), chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk.rename(columns=str.lower)[columns]
+
+
+@instrument
+def iter_pubmed_csv(path: str | Path, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Like ``read_pubmed_csv`` but yields frames of at most ``chunksize`` rows.
+
+    Row indexes continue across chunks, as if the file had been read whole.
+    """
+    return _iter_csv(path, ["id", "title", "journal", "date"], chunksize)
+
+
+@instrument
+def iter_clinical_trials_csv(
+    path: str | Path, chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[pd.DataFrame]:
+    """Like ``read_clinical_trials_csv`` but yields frames of at most ``chunksize`` rows."""
+    return _iter_csv(path, ["id", "scientific_title", "journal", "date"], chunksize)
@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import unicodedata
 from datetime import date
-from typing import Any
+from typing import Any, Tuple
 
+import numpy as np
 import pandas as pd
 
+from .metrics import instrument
+
 # Data formats that needs to be normalized
-_DATE_FORMATS = [
+DATE_FORMATS = [
     "%d %B %Y",  # 12 January 2023
     "%d %b %Y",  # 12 Jan 2023
     "%d/%m/%Y",  # 01/04/2024
@@ -38,14 +41,34 @@ def normalize_text(text: str) -> str:
     return collapsed
 
 
-def normalize_text_series(series: pd.Series[Any]) -> pd.Series[Any]:
+def _normalize_unique_texts(texts: np.ndarray) -> np.ndarray:
+    """Normalize an array of distinct strings, with a fast path for ASCII.
+
+    For pure-ASCII text NFKD decomposition and accent stripping are no-ops,
+    so ``normalize_text`` reduces to lowercasing and whitespace collapsing
+    with C-level string methods. Other values go through ``normalize_text``.
+    """
+    return np.fromiter(
+        (" ".join(t.lower().split()) if t.isascii() else normalize_text(t) for t in texts),
+        dtype=object,
+        count=len(texts),
+    )
+
+
+@instrument
+def normalize_text_series(series: pd.Series[Any], as_category: bool = False) -> pd.Series[Any]:
     """Normalize a pandas Series of text using ``normalize_text``.
 
     - Preserves NaN values
     - Converts non-string values to string before normalizing
 
+    Each distinct value is normalized once and broadcast back to its rows,
+    so heavily repeated values (e.g. journal names) are cheap.
+
     Args:
         series: A pandas Series containing text values.
+        as_category: Return a ``category`` Series (sorted categories, missing
+            values as NaN), built from the codes without rehashing the rows.
 
     Returns:
         A new pandas Series with normalized text.
@@ -53,23 +76,75 @@ def normalize_text_series(series: pd.Series[Any]) -> pd.Series[Any]:
     if not isinstance(series, pd.Series):
         raise TypeError("normalize_text_series expects a pandas Series")
 
-    # Build a normalized object series while preserving None/NaN as-is
-    values: list[Any] = []
-    for x in series:
-        if pd.isna(x):  # preserves None, NaN, pd.NA
-            values.append(x)
-        else:
-            values.append(normalize_text(str(x)))
+    values = series.to_numpy(dtype=object)
+    codes, uniques = pd.factorize(values)
+    if not all(isinstance(u, str) for u in uniques):
+        # factorize merges equal non-strings (1, 1.0, True) that stringify
+        # differently: stringify first, keeping None/NaN as-is
+        na = pd.isna(values)
+        values = values.copy()
+        values[~na] = [str(x) for x in values[~na]]
+        codes, uniques = pd.factorize(values)
+
+    normalized = _normalize_unique_texts(np.asarray(uniques, dtype=object))
+    if as_category:
+        # Distinct values may normalize to the same text: factorize again
+        cat_codes, categories = pd.factorize(normalized, sort=True)
+        found = codes >= 0
+        codes[found] = cat_codes[codes[found]]
+        return pd.Series(pd.Categorical.from_codes(codes, categories), index=series.index)
+    out = np.empty(len(values), dtype=object)
+    found = codes >= 0
+    out[found] = normalized[codes[found]]
+    out[~found] = values[~found]  # preserves None, NaN, pd.NA
+
+    return pd.Series(out, index=series.index, dtype="object")
+
+
+def _guess_date_format(value: str) -> str | None:
+    """Pick the only ``DATE_FORMATS`` entry ``value`` can match from its shape.
+
+    Only the separator and the length of the first/middle part are checked,
+    e.g. ``"2023-01-12"`` (dash, 4-digit first part) -> ``"%Y-%m-%d"``. A
+    wrong guess is harmless: the value then goes through the full fallback
+    chain.
+    """
+    for sep in (" ", "/", "-"):
+        parts = value.split(sep)
+        if len(parts) == 3:
+            if sep == " ":
+                return "%d %b %Y" if len(parts[1]) == 3 else "%d %B %Y"
+            return f"%Y{sep}%m{sep}%d" if len(parts[0]) == 4 else f"%d{sep}%m{sep}%Y"
+    return None
+
+
+def parse_dates_with_fallbacks(s: pd.Series[Any]) -> pd.Series[Any]:
+    """Try each of ``DATE_FORMATS`` in order, then pandas inference."""
+    parsed = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    mask = pd.Series(True, index=s.index)
 
-    return pd.Series(values, index=series.index, dtype="object")
+    for fmt in DATE_FORMATS:
+        part = pd.to_datetime(s[mask], format=fmt, errors="coerce", dayfirst=True)
+        fill = part.notna()
+        parsed.loc[fill.index[fill]] = part[fill]
+        mask &= ~fill
 
+    # Fallback: let pandas infer
+    if mask.any():
+        part = pd.to_datetime(s[mask], errors="coerce", dayfirst=True, infer_datetime_format=True)
+        fill = part.notna()
+        parsed.loc[fill.index[fill]] = part[fill]
 
+    return parsed
+
+
+@instrument
 def normalize_dates(series: pd.Series[Any]) -> pd.Series[date]:
     """
     Normalize a pandas Series of date-like strings into Python ``date`` objects.
 
     This function attempts to parse each value in the Series into a date using
-    a predefined set of formats (``_DATE_FORMATS``). If none of the formats
+    a predefined set of formats (``DATE_FORMATS``). If none of the formats
     match, it falls back to pandas' automatic date inference. If parsing fails
     for any values, a ``ValueError`` is raised listing the problematic entries.
 
@@ -93,29 +168,88 @@ def normalize_dates(series: pd.Series[Any]) -> pd.Series[date]:
     Notes
     -----
     - Leading and trailing whitespace is stripped from all input values.
-    - Parsing tries formats in ``_DATE_FORMATS`` first, then falls back to
+    - Parsing tries formats in ``DATE_FORMATS`` first, then falls back to
       pandas' automatic inference.
+    - Each distinct value is parsed once. Its format is guessed from its
+      shape so that each format group is parsed in a single vectorized call;
+      only values the guess does not resolve try every format in turn.
     - Parsing assumes ``dayfirst=True`` (i.e., "01-02-2023" → 1 Feb 2023).
     """
     s = series.astype(str).str.strip()
-    parsed = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
-    mask = pd.Series(True, index=s.index)
 
-    for fmt in _DATE_FORMATS:
-        part = pd.to_datetime(s[mask], format=fmt, errors="coerce", dayfirst=True)
-        fill = part.notna()
-        parsed.loc[fill.index[fill]] = part[fill]
-        mask &= ~fill
+    # Parse each distinct string once; dates repeat heavily in publication dumps
+    codes, uniques = pd.factorize(s)
+    uniques = np.asarray(uniques, dtype=object)
+    parsed = np.full(len(uniques), np.datetime64("NaT"), dtype="datetime64[ns]")
+
+    # One vectorized call per detected format
+    guesses = np.array([_guess_date_format(v) for v in uniques], dtype=object)
+    for fmt in DATE_FORMATS:
+        group = guesses == fmt
+        if group.any():
+            parsed[group] = pd.to_datetime(uniques[group], format=fmt, errors="coerce")
+
+    # Values with no or a wrong guess: every format in order, then inference
+    rest = np.isnat(parsed)
+    if rest.any():
+        parsed[rest] = parse_dates_with_fallbacks(pd.Series(uniques[rest], dtype=object))
+
+    failed = np.isnat(parsed)
+    if failed.any():
+        bad = uniques[failed].tolist()
+        raise ValueError(f"Unrecognized date formats: {bad[:5]}{'...' if len(bad) > 5 else ''}")
 
-    # Fallback: let pandas infer
-    if mask.any():
-        part = pd.to_datetime(s[mask], errors="coerce", dayfirst=True, infer_datetime_format=True)
-        fill = part.notna()
-        parsed.loc[fill.index[fill]] = part[fill]
-        mask &= ~fill
+    return pd.Series(parsed[codes], index=s.index).dt.date
 
-    if parsed.isna().any():
-        bad = s[parsed.isna()].unique().tolist()
-        raise ValueError(f"Unrecognized date formats: {bad[:5]}{'...' if len(bad) > 5 else ''}")
 
-    return parsed.dt.date
+def factorize_sorted(values: pd.Series[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """``pd.factorize(values, sort=True)``, also sorting categoricals by value.
+
+    Categoricals are factorized on their integer codes, but pandas then
+    sorts them in category order: their uniques are sorted by value here.
+    Missing values get code -1. Returns the codes and the uniques.
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = pd.factorize(values, sort=True)
+        return codes, np.asarray(uniques, dtype=object)
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+    order = np.argsort(uniques, kind="stable")
+    rank = np.empty(len(order), dtype=codes.dtype)
+    rank[order] = np.arange(len(order))
+    found = codes >= 0
+    codes[found] = rank[codes[found]]
+    return codes, uniques[order]
+
+
+def encode_strings(values: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack strings as their UTF-8 bytes end to end, for ``np.save``/``np.savez``.
+
+    Returns ``(data, offsets)``: string ``i`` is
+    ``data[offsets[i]:offsets[i + 1]]`` (``uint8`` and ``int64`` arrays). Unlike
+    a fixed-width unicode array, the size follows the total length of the
+    strings, not ``len(values)`` times the longest one.
+    """
+    encoded = [str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def decode_strings(data: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Strings packed by ``encode_strings``, as an object array."""
+    buf = np.asarray(data, dtype=np.uint8).tobytes()
+    bounds = np.asarray(offsets).tolist()
+    return np.fromiter(
+        (buf[lo:hi].decode("utf-8") for lo, hi in zip(bounds[:-1], bounds[1:])),
+        dtype=object,
+        count=max(len(bounds) - 1, 0),
+    )
+
+
+def isin_sorted(values: np.ndarray, sorted_ref: np.ndarray) -> np.ndarray:
+    """``np.isin`` against an already sorted reference array."""
+    if len(sorted_ref) == 0:
+        return np.zeros(len(values), dtype=bool)
+    pos = np.searchsorted(sorted_ref, values).clip(max=len(sorted_ref) - 1)
+    return sorted_ref[pos] == values
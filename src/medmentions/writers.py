@@ -1,13 +1,157 @@
 from __future__ import annotations
 
+import gzip
 import json
+import tempfile
 from pathlib import Path
-from typing import Dict
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Set
 
+import pandas as pd
 
+from .mentions import distinct_drug_pairs, graph_drugs, graph_edges
+from .metrics import instrument
+
+# Edges serialized at once by ``write_graph_stream``: bounds its peak memory
+GRAPH_CHUNKSIZE = 50_000
+
+
+@instrument
 def write_graph(graph: Dict, out_path: str | Path) -> str:
     out_path = Path(out_path)
     out_path.parent.mkdir(parents=True, exist_ok=True)
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(graph, f, ensure_ascii=False, indent=2)
     return str(out_path)
+
+
+def _open_text(path: Path) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+def _dump_items(items: List[Any], compact: bool) -> str:
+    """JSON text of ``items`` as elements of a list nested in the top-level object.
+
+    Matches what ``json.dump`` writes between the brackets of such a list,
+    so that consecutive pieces joined by the list separator form the list.
+    Items are scalars or non-empty flat dicts (graph nodes and edges).
+    """
+    if not items:
+        return ""
+    if compact:
+        return json.dumps(items, ensure_ascii=False)[1:-1]
+    # ``indent`` would switch json to its pure-Python encoder: encode with
+    # the C one, separating with newlines, and indent afterwards. JSON
+    # strings never hold raw newlines or NULs, so these are all separators.
+    text = json.dumps(items, ensure_ascii=False, separators=(",\n", ": "))
+    if not isinstance(items[0], dict):
+        return "    " + text[1:-1].replace(",\n", ",\n    ")
+    body = text[2:-2].replace("},\n{", "\0").replace(",\n", ",\n      ")
+    return "    {\n      " + body.replace("\0", "\n    },\n    {\n      ") + "\n    }"
+
+
+def _joined(pieces: Iterable[str], compact: bool) -> Iterator[str]:
+    """The non-empty ``pieces``, with the list separator between them."""
+    sep = ", " if compact else ",\n"
+    first = True
+    for piece in pieces:
+        if piece:
+            yield piece if first else sep + piece
+            first = False
+
+
+def _write_lists(f: IO[str], lists: Dict[str, Iterable[str]], compact: bool) -> None:
+    """Write ``{"key": [...], ...}`` laid out like ``json.dump``.
+
+    ``lists`` maps each key to the text of its list elements, in fragments.
+    """
+    newline, indent, sep = ("", "", ", ") if compact else ("\n", "  ", ",\n")
+    f.write("{" + newline)
+    for i, (key, fragments) in enumerate(lists.items()):
+        f.write(f'{indent}"{key}": [')
+        empty = True
+        for text in fragments:
+            if empty:
+                f.write(newline)
+                empty = False
+            f.write(text)
+        if not empty:
+            f.write(newline + indent)
+        f.write("]" + (sep if i < len(lists) - 1 else newline))
+    f.write("}")
+
+
+def _edge_pieces(chunks: Iterable[pd.DataFrame], compact: bool) -> Iterator[str]:
+    for chunk in chunks:
+        for start in range(0, len(chunk), GRAPH_CHUNKSIZE):
+            yield _dump_items(graph_edges(chunk.iloc[start : start + GRAPH_CHUNKSIZE]), compact)
+
+
+def _write_graph(
+    f: IO[str],
+    drug_pairs: pd.DataFrame,
+    journals: List[Any],
+    edge_fragments: Iterable[str],
+    compact: bool,
+) -> None:
+    lists = {
+        "drugs": _joined([_dump_items(graph_drugs(drug_pairs), compact)], compact),
+        "journals": _joined([_dump_items(journals, compact)], compact),
+        "edges": edge_fragments,
+    }
+    _write_lists(f, lists, compact)
+
+
+@instrument
+def write_graph_stream(
+    edges: pd.DataFrame | Iterable[pd.DataFrame],
+    out_path: str | Path,
+    compact: bool = False,
+) -> str:
+    """Write ``build_graph_df(edges)`` as JSON without building it in memory.
+
+    ``edges`` is an edge frame or an iterable of edge chunks. The output is
+    byte for byte what ``write_graph`` writes (``compact=True``: without
+    indentation, like ``json.dump`` defaults), gzip-compressed when
+    ``out_path`` ends with ``.gz``.
+
+    Edges are serialized ``GRAPH_CHUNKSIZE`` at a time. As drugs and journals
+    come first in the document, edges given as chunks are spooled to a
+    temporary file next to the output, so peak memory only depends on the
+    chunk size and on the number of distinct drugs and journals.
+    """
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(edges, pd.DataFrame):
+        drug_pairs = distinct_drug_pairs(edges)
+        journals = sorted(edges["journal"].dropna().unique().tolist())
+        with _open_text(out_path) as f:
+            _write_graph(
+                f, drug_pairs, journals, _joined(_edge_pieces([edges], compact), compact), compact
+            )
+        return str(out_path)
+
+    # First pass: spool the edges, collecting the drugs and journals
+    drug_pairs: Optional[pd.DataFrame] = None
+    journal_set: Set[Any] = set()
+
+    def collected(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        nonlocal drug_pairs
+        for chunk in chunks:
+            pairs = distinct_drug_pairs(chunk)
+            if drug_pairs is not None:
+                pairs = distinct_drug_pairs(pd.concat([drug_pairs, pairs]))
+            drug_pairs = pairs
+            journal_set.update(chunk["journal"].dropna().unique().tolist())
+            yield chunk
+
+    with tempfile.TemporaryFile("w+", encoding="utf-8", dir=out_path.parent) as spool:
+        spool.writelines(_joined(_edge_pieces(collected(edges), compact), compact))
+        spool.seek(0)
+        with _open_text(out_path) as f:
+            blocks = iter(lambda: spool.read(1 << 20), "")
+            if drug_pairs is None:  # no chunks at all
+                drug_pairs = pd.DataFrame(columns=["drug_atccode", "drug_name"])
+            _write_graph(f, drug_pairs, sorted(journal_set), blocks, compact)
+    return str(out_path)
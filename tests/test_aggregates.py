@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import medmentions.aggregates as aggregates
+from medmentions.aggregates import JournalDrugAggregates, load_aggregates, save_aggregates
+from medmentions.mentions import EDGE_COLUMNS, journal_with_most_distinct_drugs
+
+
+def make_edges(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    journals = np.array([f"J{i}" for i in range(12)] + [None], dtype=object)
+    return pd.DataFrame(
+        {
+            "drug_atccode": [f"D{i:02d}" for i in rng.integers(0, 20, n)],
+            "drug_name": "name",
+            "source_type": "pubmed",
+            "source_id": [str(i) for i in rng.integers(0, 100, n)],
+            "source_title": "title",
+            # Skewed, so that the journals have distinct drug counts
+            "journal": journals[np.minimum(rng.geometric(0.15, n) - 1, 12)],
+            "date": "2020-01-01",
+        },
+        columns=EDGE_COLUMNS,
+    )
+
+
+def test_journal_queries_match_the_edges():
+    edges = make_edges()
+    agg = JournalDrugAggregates.build(edges)
+
+    counts = edges.groupby("journal")["drug_atccode"].nunique()
+    expected = counts.sort_values(ascending=False, kind="stable")
+    assert agg.top_journals(5) == [
+        {"journal": j, "distinct_drugs": n} for j, n in expected.iloc[:5].items()
+    ]
+    assert agg.journal_with_most_distinct_drugs() == journal_with_most_distinct_drugs(edges)
+    for journal, drugs in edges.groupby("journal")["drug_atccode"]:
+        assert agg.drugs_in_journal(journal) == sorted(drugs.unique())
+    assert agg.drugs_in_journal("unknown") == []
+
+
+def test_drug_queries_match_the_edges():
+    edges = make_edges()
+    agg = JournalDrugAggregates.build(edges)
+    with_journal = edges.dropna(subset=["journal"])
+    pairs = with_journal[["drug_atccode", "journal"]].drop_duplicates()
+
+    for drug, group in with_journal.groupby("drug_atccode"):
+        mentions = group["journal"].value_counts().sort_index()
+        expected = mentions.sort_values(ascending=False, kind="stable").iloc[:3]
+        assert agg.top_journals_for_drug(drug, k=3) == [
+            {"journal": j, "mentions": n} for j, n in expected.items()
+        ]
+
+        journals = pairs.loc[pairs["drug_atccode"] == drug, "journal"]
+        others = pairs[pairs["journal"].isin(journals) & (pairs["drug_atccode"] != drug)]
+        shared = others.groupby("drug_atccode").size()
+        expected_shared = shared.sort_values(ascending=False, kind="stable")
+        assert agg.drugs_sharing_journals(drug) == [
+            {"drug": d, "shared_journals": n} for d, n in expected_shared.items()
+        ]
+
+    assert agg.top_journals_for_drug("unknown") == []
+    assert agg.drugs_sharing_journals("unknown") == []
+
+
+def test_journal_with_most_distinct_drugs_ties_match_the_edges():
+    edges = make_edges().assign(journal="J1")
+    edges.loc[::2, "journal"] = "J0"
+
+    agg = JournalDrugAggregates.build(edges)
+
+    assert agg.journal_with_most_distinct_drugs() == journal_with_most_distinct_drugs(edges)
+    assert agg.journal_with_most_distinct_drugs()["journal"] == "J0"
+
+
+def test_empty_edges():
+    agg = JournalDrugAggregates.build(pd.DataFrame(columns=EDGE_COLUMNS))
+
+    assert agg.journal_with_most_distinct_drugs() == {"journal": None, "distinct_drugs": 0}
+    assert agg.top_journals() == []
+
+
+def test_save_and_load_aggregates_roundtrip(tmp_path: Path):
+    agg = JournalDrugAggregates.build(make_edges())
+
+    loaded = load_aggregates(save_aggregates(agg, tmp_path / "sub" / "agg.npz"))
+
+    assert loaded.top_journals(20) == agg.top_journals(20)
+    assert loaded.drugs_sharing_journals("D03") == agg.drugs_sharing_journals("D03")
+    assert (loaded.bitsets == agg.bitsets).all()
+    assert loaded.journals.dtype == object
+    assert loaded.drugs_in_journal("J3") == agg.drugs_in_journal("J3")
+
+
+def test_load_aggregates_rejects_other_versions(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(aggregates, "AGGREGATES_FORMAT_VERSION", 0)
+    path = save_aggregates(JournalDrugAggregates.build(make_edges()), tmp_path / "agg.npz")
+    monkeypatch.undo()
+
+    with pytest.raises(ValueError, match="version 0"):
+        load_aggregates(path)
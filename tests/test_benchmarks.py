@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+import benchmarks.harness as harness
+from benchmarks.harness import compare
+from benchmarks.synthetic import (
+    CORPUS_FILES,
+    MANIFEST_NAME,
+    corpus_config,
+    ensure_corpus,
+    make_corpus,
+    read_manifest,
+    write_corpus,
+)
+from medmentions.mentions import compute_mentions
+from medmentions.normalizers import normalize_drugs, normalize_pubmed, normalize_trials
+from medmentions.readers import (
+    read_clinical_trials_csv,
+    read_drugs_csv,
+    read_pubmed_csv,
+    read_pubmed_json,
+)
+
+CONFIG = {"corpus": {"docs": 100, "drugs": 10, "seed": 0}, "match_mode": "word", "workers": 1}
+
+
+def make_report(config=CONFIG, **stages):
+    """A harness report of ``(seconds, mem_peak_mb)`` pairs by stage."""
+    return {
+        "config": config,
+        "stages": {
+            name: {"rows": 1, "seconds": seconds, "mem_peak_mb": mem}
+            for name, (seconds, mem) in stages.items()
+        },
+    }
+
+
+# ---------- compare ----------
+
+
+def test_compare_flags_slowdowns_beyond_the_tolerance():
+    baseline = make_report(read=(1.0, 10.0), normalize=(1.0, 10.0))
+    current = make_report(read=(1.3, 10.0), normalize=(1.2, 10.0))
+
+    regressions = compare(baseline, current, max_slowdown=0.25)
+
+    assert regressions == ["read: time 1.300 s vs 1.000 s in the baseline (+30%)"]
+
+
+def test_compare_flags_memory_growth_beyond_the_tolerance():
+    baseline = make_report(read=(1.0, 100.0), normalize=(1.0, 100.0))
+    current = make_report(read=(1.0, 130.0), normalize=(1.0, 120.0))
+
+    regressions = compare(baseline, current, max_memory_growth=0.25)
+
+    assert regressions == ["read: memory 130.000 MB vs 100.000 MB in the baseline (+30%)"]
+
+
+def test_compare_ignores_regressions_under_the_absolute_floor():
+    baseline = make_report(read=(0.01, 0.2))
+    current = make_report(read=(0.04, 0.9))
+
+    assert compare(baseline, current, min_seconds=0.05, min_memory_mb=1.0) == []
+    assert len(compare(baseline, current, min_seconds=0.0, min_memory_mb=0.0)) == 2
+
+
+def test_compare_skips_stages_and_measures_missing_from_either_report():
+    baseline = make_report(read=(1.0, None), write_graph=(1.0, 1.0))
+    current = make_report(read=(1.0, 50.0), pipeline=(9.0, 90.0))
+
+    assert compare(baseline, current) == []
+
+
+def test_compare_rejects_reports_of_different_configurations():
+    other = dict(CONFIG, match_mode="phrase")
+
+    with pytest.raises(ValueError, match="different configurations"):
+        compare(make_report(read=(1.0, 1.0)), make_report(other, read=(1.0, 1.0)))
+
+
+@pytest.mark.parametrize("option", [["--match-mode", "phrase"], ["--workers", "2"]])
+def test_main_rejects_a_baseline_of_other_options_before_running(
+    tmp_path: Path, monkeypatch, option
+):
+    config = harness.run_config(corpus_config(100, 10, 0), "substring", 1)
+    baseline = tmp_path / "baseline.json"
+    report = dict(make_report(config, read=(1.0, 1.0)), version=harness.REPORT_FORMAT_VERSION)
+    baseline.write_text(json.dumps(report), encoding="utf-8")
+
+    def run_benchmarks(*args, **kwargs):
+        raise AssertionError("ran the benchmarks")
+
+    monkeypatch.setattr(harness, "run_benchmarks", run_benchmarks)
+    argv = ["harness.py", "--docs", "100", "--drugs", "10", "--baseline", str(baseline)]
+    monkeypatch.setattr("sys.argv", argv + option)
+    with pytest.raises(SystemExit) as exc:
+        harness.main()
+    assert exc.value.code == 2
+
+
+# ---------- synthetic corpus ----------
+
+
+def test_write_corpus_is_seeded_and_readable(tmp_path: Path):
+    paths = write_corpus(tmp_path / "a", n_docs=200, n_drugs=20, seed=3)
+    again = write_corpus(tmp_path / "b", n_docs=200, n_drugs=20, seed=3)
+    other = write_corpus(tmp_path / "c", n_docs=200, n_drugs=20, seed=4)
+
+    assert sorted(paths) == sorted(CORPUS_FILES)
+    for name in CORPUS_FILES:
+        assert paths[name].read_bytes() == again[name].read_bytes()
+    assert paths["pubmed.csv"].read_bytes() != other["pubmed.csv"].read_bytes()
+    assert read_manifest(tmp_path / "a") == corpus_config(200, 20, 3)
+
+    drugs = normalize_drugs(read_drugs_csv(paths["drugs.csv"]))
+    pubmed_csv = read_pubmed_csv(paths["pubmed.csv"])
+    pubmed_json = read_pubmed_json(paths["pubmed.json"])
+    trials = read_clinical_trials_csv(paths["clinical_trials.csv"])
+    assert (len(drugs), len(pubmed_csv), len(pubmed_json), len(trials)) == (20, 140, 20, 40)
+
+    edges = compute_mentions(
+        drugs, normalize_pubmed(pubmed_csv), normalize_trials(trials), match_mode="word"
+    )
+    assert set(edges["source_type"]) == {"pubmed", "clinical"}
+
+
+def test_ensure_corpus_reuses_a_complete_corpus(tmp_path: Path):
+    ensure_corpus(tmp_path, n_docs=50, n_drugs=5, seed=0)
+    (tmp_path / "pubmed.csv").write_text("kept\n", encoding="utf-8")
+
+    ensure_corpus(tmp_path, n_docs=50, n_drugs=5, seed=0)
+    assert (tmp_path / "pubmed.csv").read_text(encoding="utf-8") == "kept\n"
+
+    ensure_corpus(tmp_path, n_docs=60, n_drugs=5, seed=0)
+    assert (tmp_path / "pubmed.csv").read_text(encoding="utf-8") != "kept\n"
+    assert json.loads((tmp_path / MANIFEST_NAME).read_text())["docs"] == 60
+
+
+def test_make_corpus_is_seeded():
+    drugs, pubmed, trials = make_corpus(100, n_drugs=10, seed=1)
+    drugs_again, pubmed_again, trials_again = make_corpus(100, n_drugs=10, seed=1)
+
+    assert (len(drugs), len(pubmed), len(trials)) == (10, 80, 20)
+    assert drugs.equals(drugs_again) and pubmed.equals(pubmed_again)
+    assert trials.equals(trials_again)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+
+import pytest
+
+from medmentions.cache import ArtifactCache, cache_key, file_digest, link_file
+
+
+def write(path: Path, text: str) -> Path:
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_file_digest_and_cache_key_follow_content(tmp_path: Path):
+    a = write(tmp_path / "a.csv", "id\n1\n")
+    b = write(tmp_path / "b.csv", "id\n1\n")
+    c = write(tmp_path / "c.csv", "id\n2\n")
+
+    assert file_digest(a) == file_digest(b) != file_digest(c)
+    assert file_digest(a, block_size=2) == file_digest(a)
+    assert cache_key("drugs", file_digest(a), 1) == cache_key("drugs", file_digest(b), 1)
+    assert cache_key("drugs", file_digest(a), 1) != cache_key("drugs", file_digest(a), 2)
+
+
+def test_get_or_build_builds_once_and_logs_hits_and_misses(tmp_path: Path, caplog):
+    cache = ArtifactCache(tmp_path / "cache")
+    calls = []
+
+    def build(out: Path) -> None:
+        calls.append(out)
+        write(out / "data.txt", "normalized")
+
+    with caplog.at_level(logging.INFO, logger="medmentions.cache"):
+        first = cache.get_or_build("k1", build, label="drugs.csv")
+        second = ArtifactCache(tmp_path / "cache").get_or_build("k1", build, label="drugs.csv")
+
+    assert first == second == tmp_path / "cache" / "k1"
+    assert len(calls) == 1
+    assert (first / "data.txt").read_text(encoding="utf-8") == "normalized"
+    assert [r.getMessage() for r in caplog.records] == [
+        "drugs.csv: cache miss (k1), building",
+        "drugs.csv: cache hit (k1)",
+    ]
+
+
+def test_failed_build_leaves_no_entry(tmp_path: Path):
+    cache = ArtifactCache(tmp_path / "cache")
+
+    def build(out: Path) -> None:
+        write(out / "partial.txt", "half")
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.build("k1", build)
+
+    assert cache.get("k1") is None
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_evict_by_count_and_age_keeps_used_entries(tmp_path: Path):
+    root = tmp_path / "cache"
+    for i, key in enumerate(["a", "b", "c", "d"]):
+        ArtifactCache(root).build(key, lambda out: None)
+        os.utime(root / key, (1000 + i, 1000 + i))  # last used long ago, "d" last
+    stale = root / ".tmp-e-1"
+    stale.mkdir()
+    os.utime(stale, (0, 0))
+
+    cache = ArtifactCache(root, max_entries=2)
+    cache.get("a")  # used: now the most recent, and never evicted by this cache
+
+    assert cache.evict() == ["c", "b"]
+    assert sorted(p.name for p in root.iterdir()) == ["a", "d"]
+    assert ArtifactCache(root, max_age=3600).evict() == ["d"]
+    assert [p.name for p in root.iterdir()] == ["a"]
+
+
+def test_link_file_replaces_without_writing_through(tmp_path: Path):
+    src = write(tmp_path / "entry.txt", "cached")
+    dst = tmp_path / "out" / "inter.txt"
+
+    link_file(src, dst)
+    assert dst.read_text(encoding="utf-8") == "cached"
+    link_file(write(tmp_path / "other.txt", "other"), dst)
+
+    assert dst.read_text(encoding="utf-8") == "other"
+    assert src.read_text(encoding="utf-8") == "cached"
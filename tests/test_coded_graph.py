@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import medmentions.coded_graph as coded_graph
+from medmentions.coded_graph import CodedGraph, load_coded_graph, save_coded_graph
+from medmentions.mentions import EDGE_COLUMNS, build_graph_df
+
+
+def make_edges():
+    return pd.DataFrame(
+        [
+            ["B01", "Heparin", "pubmed", "1", "Heparin and aspirin", "J2", "2020-01-01"],
+            ["A01", "Aspirin", "pubmed", "1", "Heparin and aspirin", "J2", "2020-01-01"],
+            ["A01", "Aspirin", "clinical", "NCT1", "Café trial", None, "2020-02-01"],
+            ["B01", "Heparin", "pubmed", "2", "Heparin again", "J1", "2019-12-31"],
+        ],
+        columns=EDGE_COLUMNS,
+    )
+
+
+def expected_edges(edges):
+    edges = edges.copy()
+    edges["date"] = pd.to_datetime(edges["date"]).dt.date.astype(str)
+    return edges
+
+
+def test_from_edges_codes_each_node_once():
+    graph = CodedGraph.from_edges(make_edges())
+
+    assert graph.drugs.to_dict("records") == build_graph_df(make_edges())["drugs"]
+    assert graph.journals.tolist() == ["J1", "J2"]
+    assert graph.documents["source_id"].tolist() == ["1", "NCT1", "2"]
+    assert graph.documents["journal"].tolist() == [1, -1, 0]
+    assert graph.edge_drugs.tolist() == [1, 0, 0, 1]
+    assert graph.edge_docs.tolist() == [0, 0, 1, 2]
+    assert graph.edge_drugs.dtype == np.int32
+
+
+def test_to_edges_roundtrip():
+    edges = make_edges()
+
+    out = CodedGraph.from_edges(edges).to_edges()
+
+    pd.testing.assert_frame_equal(out, expected_edges(edges))
+
+
+def test_from_edges_on_categorical_edges():
+    edges = make_edges()
+    categorical = edges.astype({"drug_atccode": "category", "journal": "category"})
+    # Category order differs from the value order
+    categorical["journal"] = categorical["journal"].cat.reorder_categories(["J2", "J1"])
+
+    graph = CodedGraph.from_edges(categorical)
+
+    expected = CodedGraph.from_edges(edges)
+    assert graph.journals.tolist() == expected.journals.tolist()
+    assert graph.edge_drugs.tolist() == expected.edge_drugs.tolist()
+    assert graph.edge_docs.tolist() == expected.edge_docs.tolist()
+    pd.testing.assert_frame_equal(graph.documents, expected.documents)
+
+
+@pytest.mark.parametrize("name", ["graph.coded.json", "graph.coded"])
+@pytest.mark.parametrize("n_edges", [4, 0])
+def test_save_and_load_coded_graph_roundtrip(tmp_path: Path, name: str, n_edges: int):
+    edges = make_edges().iloc[:n_edges]
+
+    path = save_coded_graph(CodedGraph.from_edges(edges), tmp_path / "out" / name)
+    loaded = load_coded_graph(path)
+
+    assert path == str(tmp_path / "out" / name)
+    assert loaded.edge_drugs.dtype == np.int32 and loaded.edge_docs.dtype == np.int32
+    pd.testing.assert_frame_equal(
+        loaded.to_edges(), expected_edges(edges).reset_index(drop=True), check_dtype=False
+    )
+
+
+def test_load_coded_graph_memory_maps_edges(tmp_path: Path):
+    path = save_coded_graph(CodedGraph.from_edges(make_edges()), tmp_path / "graph.coded")
+
+    loaded = load_coded_graph(path)
+
+    assert not loaded.edge_docs.flags.writeable
+    assert loaded.edge_docs.tolist() == [0, 0, 1, 2]
+
+
+def test_load_coded_graph_rejects_other_versions(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(coded_graph, "CODED_GRAPH_FORMAT_VERSION", 0)
+    path = save_coded_graph(CodedGraph.from_edges(make_edges()), tmp_path / "graph.coded.json")
+    monkeypatch.undo()
+
+    with pytest.raises(ValueError, match="version 0"):
+        load_coded_graph(path)
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from medmentions.comentions import CoMentionIndex
+from medmentions.mentions import EDGE_COLUMNS
+
+
+def make_edges(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    drugs = rng.integers(0, 30, n)
+    journals = np.array([f"J{i}" for i in range(15)] + [None], dtype=object)
+    return pd.DataFrame(
+        {
+            "drug_atccode": [f"D{i:02d}" for i in drugs],
+            "drug_name": [f"Drug{i}" for i in drugs],
+            "source_type": rng.choice(["pubmed", "clinical"], n),
+            "source_id": "1",
+            "source_title": "title",
+            "journal": journals[np.minimum(rng.geometric(0.1, n) - 1, 15)],
+            "date": "2020-01-01",
+        },
+        columns=EDGE_COLUMNS,
+    )
+
+
+def brute_force(edges, drug, source_types):
+    pairs = edges[edges["source_type"].isin(source_types)].dropna(subset=["journal"])
+    pairs = pairs[["drug_atccode", "journal"]].drop_duplicates()
+    journals = set(pairs.loc[pairs["drug_atccode"] == drug, "journal"])
+    shared = {}
+    for other, journal in pairs.itertuples(index=False):
+        if other != drug and journal in journals:
+            shared[other] = shared.get(other, 0) + 1
+    return sorted(shared.items(), key=lambda kv: (-kv[1], kv[0]))
+
+
+@pytest.mark.parametrize("include_clinical", [False, True])
+def test_co_mentioned_matches_brute_force(include_clinical):
+    edges = make_edges()
+    excluded = () if include_clinical else ("clinical",)
+    source_types = ["pubmed", "clinical"] if include_clinical else ["pubmed"]
+
+    index = CoMentionIndex.build(edges, excluded)
+
+    for drug in sorted(edges["drug_atccode"].unique()):
+        got = [(r["drug"], r["shared_journals"]) for r in index.co_mentioned(drug)]
+        assert got == brute_force(edges, drug, source_types)
+
+
+def test_co_mentioned_top_k_names_and_unknown_drugs():
+    edges = make_edges()
+    index = CoMentionIndex.build(edges)
+
+    top = index.co_mentioned("drug3", k=3)
+
+    assert top == index.co_mentioned("D03")[:3]
+    assert top[0]["name"] == f"Drug{int(top[0]['drug'][1:])}"
+    assert index.co_mentioned("unknown") == []
+    assert index.journals_of("unknown") == []
+
+
+def test_shared_journals_and_journals_of():
+    edges = pd.DataFrame(
+        [
+            ["A01", "Aspirin", "pubmed", "1", "t", "J1", "2020-01-01"],
+            ["A01", "Aspirin", "pubmed", "2", "t", "J2", "2020-01-01"],
+            ["B01", "Heparin", "pubmed", "3", "t", "J2", "2020-01-01"],
+            ["B01", "Heparin", "clinical", "4", "t", "J1", "2020-01-01"],
+            ["C01", "Ibuprofen", "pubmed", "5", "t", None, "2020-01-01"],
+        ],
+        columns=EDGE_COLUMNS,
+    )
+
+    index = CoMentionIndex.build(edges)
+
+    assert index.journals_of("A01") == ["J1", "J2"]
+    assert index.journals_of("C01") == []
+    assert index.shared_journals("Aspirin", "heparin") == ["J2"]
+    assert index.co_mentioned("B01") == [{"drug": "A01", "name": "Aspirin", "shared_journals": 1}]
+    assert index.co_mentioned("C01") == []
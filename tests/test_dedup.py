@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from medmentions.dedup import Deduplicator, dedup_keys
+
+
+def make_docs(rows):
+    return pd.DataFrame(rows, columns=["id", "title", "journal", "date"])
+
+
+def test_dedup_keys_use_id_then_title_and_date():
+    docs = make_docs(
+        [
+            ["1", "a title", "j1", date(2020, 1, 1)],
+            [" 1 ", "another title", "j2", date(2021, 1, 1)],
+            ["", "a title", "j1", date(2020, 1, 1)],
+            [None, "a title", "j3", date(2020, 1, 1)],
+            [np.nan, "a title", "j1", date(2020, 1, 2)],
+        ]
+    )
+
+    keys = dedup_keys(docs, "title")
+
+    assert keys.dtype == np.uint64
+    assert keys[0] == keys[1]  # same id, whatever the content
+    assert keys[2] == keys[3] != keys[0]  # no id: same title and date
+    assert keys[4] != keys[2]
+
+
+def test_deduplicator_drops_repeats_within_and_across_chunks():
+    dedup = Deduplicator("title")
+    first = make_docs(
+        [
+            ["1", "a", "j", date(2020, 1, 1)],
+            ["2", "b", "j", date(2020, 1, 1)],
+            ["1", "a", "j", date(2020, 1, 1)],
+            ["", "c", "j", date(2020, 1, 1)],
+        ]
+    )
+    second = make_docs(
+        [
+            ["2", "b", "j", date(2020, 1, 1)],
+            [None, "c", "other journal", date(2020, 1, 1)],
+            ["3", "c", "j", date(2020, 1, 1)],
+        ]
+    )
+
+    out = pd.concat([dedup(first), dedup(second)])
+
+    assert out["id"].tolist() == ["1", "2", "", "3"]
+    assert out.index.tolist() == [0, 1, 3, 2]
+    assert (dedup.n_rows, dedup.n_dropped) == (7, 3)
+
+
+def test_deduplicator_matches_drop_duplicates_on_random_keys():
+    rng = np.random.default_rng(0)
+    keys = rng.integers(0, 500, 2000).astype(np.uint64)
+    dedup = Deduplicator("title")
+
+    keep = np.concatenate([dedup.keep_keys(keys[i : i + 300]) for i in range(0, 2000, 300)])
+
+    assert keep.tolist() == (~pd.Series(keys).duplicated()).tolist()
+    assert dedup.n_dropped == 2000 - len(np.unique(keys))
+    assert dedup(make_docs([])).empty
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medmentions.drug_matcher import MATCHER_FORMAT_VERSION, DrugMatcher, load_matcher, save_matcher
+from medmentions.incremental import update_mentions
+from medmentions.mentions import compute_mentions
+from medmentions.normalizers import normalize_drugs, normalize_pubmed, normalize_trials
+
+
+def make_inputs():
+    drugs = normalize_drugs(
+        pd.DataFrame(
+            {
+                "atccode": ["A01", "B02", "C03", "D04", "E05"],
+                "drug": ["Epinephrine", "ATROPINE", "épinéphrine", None, "Cycline"],
+            }
+        )
+    )
+    pubmed = normalize_pubmed(
+        pd.DataFrame(
+            {
+                "id": ["1", "2", "3"],
+                "title": ["Epinephrine and atropine", "Tetracycline resistance", None],
+                "journal": ["J1", "J2", "J1"],
+                "date": ["2020-01-01", "01/02/2020", "3 March 2021"],
+            }
+        )
+    )
+    trials = normalize_trials(
+        pd.DataFrame(
+            {
+                "id": ["NCT1"],
+                "scientific_title": ["Atropine and doxycycline"],
+                "journal": ["J3"],
+                "date": ["2020-01-01"],
+            }
+        )
+    )
+    return drugs, pubmed, trials
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_and_load_matcher_round_trip(tmp_path, mmap):
+    drugs, _, _ = make_inputs()
+    path = save_matcher(DrugMatcher.build(drugs), tmp_path / "drugs.matcher")
+
+    loaded = load_matcher(path, mmap=mmap)
+
+    assert isinstance(loaded.arrays["transitions"], np.memmap) == mmap
+    assert loaded.n_drugs == 5
+    assert loaded.arrays["drug_category_bytes"].dtype == np.uint8
+    pd.testing.assert_frame_equal(loaded.drugs, drugs)
+    # Duplicated names share a pattern; missing names have none
+    assert loaded.rows_by_pattern() == [[0, 2], [1], [4]]
+    assert loaded.automaton.search("atropine, epinephrine") == {0, 1}
+
+
+def test_load_matcher_rejects_other_format_versions(tmp_path):
+    path = tmp_path / "drugs.matcher"
+    with open(path, "wb") as f:
+        np.save(f, np.int64(MATCHER_FORMAT_VERSION + 1))
+
+    with pytest.raises(ValueError, match="Unsupported matcher format version"):
+        load_matcher(path)
+
+
+def test_loaded_matcher_pickles_as_its_path(tmp_path):
+    drugs, _, _ = make_inputs()
+    built = DrugMatcher.build(drugs)
+    loaded = load_matcher(save_matcher(built, tmp_path / "drugs.matcher"))
+
+    assert len(pickle.dumps(loaded)) < len(pickle.dumps(built))
+    unpickled = pickle.loads(pickle.dumps(loaded))
+    assert unpickled.path == loaded.path
+    assert isinstance(unpickled.arrays["transitions"], np.memmap)
+    pd.testing.assert_frame_equal(pickle.loads(pickle.dumps(built)).drugs, drugs)
+
+
+@pytest.mark.parametrize("match_mode", ["substring", "word", "phrase"])
+def test_compute_mentions_with_a_loaded_matcher(tmp_path, match_mode):
+    drugs, pubmed, trials = make_inputs()
+    matcher = load_matcher(save_matcher(DrugMatcher.build(drugs), tmp_path / "drugs.matcher"))
+
+    expected = compute_mentions(drugs, pubmed, trials, match_mode=match_mode)
+    got = compute_mentions(
+        matcher.drugs, pubmed, trials, match_mode=match_mode, drug_matcher=matcher
+    )
+
+    assert len(got)
+    pd.testing.assert_frame_equal(got, expected)
+    edges, _ = update_mentions(
+        matcher.drugs, [pubmed], [trials], match_mode=match_mode, drug_matcher=matcher
+    )
+    pd.testing.assert_frame_equal(edges, expected)
+
+
+def test_compute_mentions_with_a_matcher_in_pool_workers(tmp_path):
+    drugs, pubmed, trials = make_inputs()
+    matcher = load_matcher(save_matcher(DrugMatcher.build(drugs), tmp_path / "drugs.matcher"))
+
+    got = compute_mentions(drugs, pubmed, trials, n_workers=2, drug_matcher=matcher)
+
+    pd.testing.assert_frame_equal(got, compute_mentions(drugs, pubmed, trials))
+
+
+def test_compute_mentions_rejects_a_matcher_of_other_drugs():
+    drugs, pubmed, trials = make_inputs()
+
+    with pytest.raises(ValueError, match="Drug matcher covers 2 drugs"):
+        compute_mentions(drugs, pubmed, trials, drug_matcher=DrugMatcher.build(drugs.iloc[:2]))
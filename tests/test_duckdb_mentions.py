@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medmentions.intermediary_io import load_df, save_df
+from medmentions.mentions import compute_mentions, concat_edges, iter_mentions
+from medmentions.normalizers import normalize_drugs, normalize_pubmed, normalize_trials
+
+pytest.importorskip("duckdb")
+
+from medmentions.duckdb_mentions import compute_mentions_duckdb  # noqa: E402
+
+
+def make_inputs():
+    drugs = pd.DataFrame(
+        {
+            "atccode": ["A01", "B02", "C03", "D04", "E05", "F06"],
+            "drug": ["Epinephrine", "ATROPINE", "epinephrine", "beta blocker", "Cycline", None],
+        }
+    )
+    pubmed = pd.DataFrame(
+        {
+            "id": ["1", "2", "3", "4", "5", "6"],
+            "title": [
+                "Epinephrine and atropine in shock",
+                "Tetracycline resistance",
+                "A blocker of beta receptors",
+                "Beta blocker, then epinephrine",
+                None,
+                "Atropine-induced tachycardia",
+            ],
+            "journal": ["J1", "J2", None, "J1", "J3", "J2"],
+            "date": [
+                "2020-01-01",
+                "01/02/2020",
+                "3 March 2021",
+                "2019/12/31",
+                "2020-01-01",
+                "2020-05-05",
+            ],
+        }
+    )
+    trials = pd.DataFrame(
+        {
+            "id": ["NCT1", "NCT2", "NCT3"],
+            "scientific_title": ["Atropine dosage", "Doxycycline versus placebo", "Nothing here"],
+            "journal": ["J4", "J4", "J5"],
+            "date": ["2020-01-01", "2020-01-02", "2020-01-03"],
+        }
+    )
+    return normalize_drugs(drugs), normalize_pubmed(pubmed), normalize_trials(trials)
+
+
+def save_inputs(tmp_path, fmt):
+    paths = [tmp_path / f"{name}.{fmt}" for name in ("drugs", "pubmed", "trials")]
+    for df, path in zip(make_inputs(), paths):
+        save_df(df, path)
+    return paths
+
+
+def plain(edges):
+    """Edges with object columns: category sets differ between the backends."""
+    return edges.astype(object).where(edges.notna(), None)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather", "csv"])
+@pytest.mark.parametrize("match_mode", ["substring", "word", "phrase"])
+def test_compute_mentions_duckdb_matches_pandas(tmp_path, fmt, match_mode):
+    paths = save_inputs(tmp_path, fmt)
+
+    got = compute_mentions_duckdb(*paths, match_mode=match_mode, threads=1)
+    expected = compute_mentions(*(load_df(p) for p in paths), match_mode=match_mode)
+
+    assert len(got)
+    assert list(got.dtypes.astype(str)) == list(expected.dtypes.astype(str))
+    pd.testing.assert_frame_equal(plain(got), plain(expected))
+
+
+def test_compute_mentions_duckdb_row_positions_in_chunk_order(tmp_path):
+    paths = save_inputs(tmp_path, "csv")
+    drugs, pubmed, trials = (load_df(p) for p in paths)
+    positions = np.array([0, 3, 5])
+
+    got = compute_mentions_duckdb(
+        *paths, pubmed_rows=positions, trials_rows=np.array([], dtype=np.int64), chunk_size=2
+    )
+    pubmed_chunks = [pubmed.iloc[i : i + 2] for i in range(0, len(pubmed), 2)]
+    expected = concat_edges(
+        list(iter_mentions(drugs, [c[c.index.isin(positions)] for c in pubmed_chunks], []))
+    )
+
+    assert set(got["source_id"].astype(str)) == {"1", "4", "6"}
+    pd.testing.assert_frame_equal(plain(got), plain(expected))
+
+
+def test_compute_mentions_duckdb_rejects_unknown_match_mode(tmp_path):
+    with pytest.raises(ValueError, match="match_mode"):
+        compute_mentions_duckdb(*save_inputs(tmp_path, "parquet"), match_mode="fuzzy")
@@ -0,0 +1,156 @@
+import pandas as pd
+import pytest
+
+import medmentions.incremental as incremental
+import medmentions.mentions as mentions
+from medmentions.incremental import load_state, save_state, update_mentions
+from medmentions.mentions import compute_mentions
+
+
+def make_df(data, columns):
+    return pd.DataFrame(data, columns=columns)
+
+
+def inputs():
+    drugs = make_df([["A01", "Aspirin"], ["B02", "Heparin"]], ["atccode", "drug"])
+    pubmed = make_df(
+        [
+            ["1", "Aspirin and heparin", "J1", "2020-01-01"],
+            ["2", "Heparin only", "J2", "2020-01-02"],
+            ["3", "Nothing here", "J1", "2020-01-03"],
+        ],
+        ["id", "title", "journal", "date"],
+    )
+    trials = make_df(
+        [["NCT1", "Aspirin trial of ibuprofen", "J3", "2020-02-01"]],
+        ["id", "scientific_title", "journal", "date"],
+    )
+    return drugs, pubmed, trials
+
+
+def chunks(df, size=2):
+    return [df.iloc[i : i + size] for i in range(0, len(df), size)]
+
+
+@pytest.mark.parametrize("match_mode", ["substring", "word", "phrase"])
+def test_update_mentions_from_scratch_equals_compute_mentions(match_mode):
+    drugs, pubmed, trials = inputs()
+
+    edges, state = update_mentions(drugs, chunks(pubmed), chunks(trials), match_mode=match_mode)
+
+    expected = compute_mentions(drugs, pubmed, trials, match_mode=match_mode)
+    pd.testing.assert_frame_equal(edges, expected, check_categorical=False)
+    assert len(state.edge_docs) == len(edges)
+
+
+@pytest.mark.parametrize("match_mode", ["substring", "phrase"])
+def test_update_mentions_applies_additions_changes_and_deletions(match_mode):
+    drugs, pubmed, trials = inputs()
+    edges, state = update_mentions(drugs, chunks(pubmed), chunks(trials), match_mode=match_mode)
+
+    # New drug, removed drug, changed and deleted documents, new document
+    drugs2 = make_df([["A01", "Aspirin"], ["C03", "Ibuprofen"]], ["atccode", "drug"])
+    pubmed2 = pubmed.drop(index=0).reset_index(drop=True)
+    pubmed2.loc[1, "title"] = "Aspirin after all"
+    pubmed2.loc[2] = ["4", "Ibuprofen and aspirin", "J4", "2020-01-04"]
+
+    edges2, state2 = update_mentions(
+        drugs2, chunks(pubmed2), chunks(trials), edges, state, match_mode=match_mode
+    )
+
+    expected = compute_mentions(drugs2, pubmed2, trials, match_mode=match_mode)
+    pd.testing.assert_frame_equal(edges2, expected, check_categorical=False)
+    assert len(state2.edge_docs) == len(edges2)
+
+
+def test_update_mentions_only_matches_the_delta(monkeypatch):
+    drugs, pubmed, trials = inputs()
+    edges, state = update_mentions(drugs, chunks(pubmed), chunks(trials))
+
+    matched = []
+    match = incremental._Matcher.match
+
+    def spy(self, rank, docs):
+        matched.append((rank, list(docs["id"])))
+        return match(self, rank, docs)
+
+    monkeypatch.setattr(incremental._Matcher, "match", spy)
+    pubmed2 = pd.concat(
+        [pubmed, make_df([["5", "More aspirin", "J1", "2020-01-05"]], pubmed.columns)],
+        ignore_index=True,
+    )
+    edges2, _ = update_mentions(drugs, chunks(pubmed2), chunks(trials), edges, state)
+
+    assert matched == [(0, ["5"])]
+    pd.testing.assert_frame_equal(
+        edges2, compute_mentions(drugs, pubmed2, trials), check_categorical=False
+    )
+
+
+def test_update_mentions_starts_one_pool_per_drug_set(monkeypatch):
+    drugs, pubmed, trials = inputs()
+    edges, state = update_mentions(drugs, chunks(pubmed, 1), chunks(trials, 1))
+
+    pools = []
+
+    class Pool(mentions.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(mentions, "ProcessPoolExecutor", Pool)
+    drugs2 = pd.concat([drugs, make_df([["C03", "Ibuprofen"]], drugs.columns)])
+    pubmed2 = pubmed.assign(title=pubmed["title"] + " again")
+    edges2, _ = update_mentions(
+        drugs2, chunks(pubmed2, 1), chunks(trials, 1), edges, state, n_workers=2
+    )
+
+    # New documents against all drugs, unchanged ones against the new drug
+    assert len(pools) == 2
+    pd.testing.assert_frame_equal(
+        edges2, compute_mentions(drugs2, pubmed2, trials), check_categorical=False
+    )
+
+
+def test_update_mentions_matches_exact_duplicate_rows():
+    drugs, pubmed, trials = inputs()
+    edges, state = update_mentions(drugs, [pubmed.iloc[:1]], [trials])
+
+    # The same row again, in another chunk; a duplicated drug too
+    pubmed2 = pd.concat([pubmed, pubmed.iloc[:1]], ignore_index=True)
+    drugs2 = pd.concat([drugs, drugs.iloc[:1]], ignore_index=True)
+    edges2, state2 = update_mentions(drugs2, chunks(pubmed2), chunks(trials), edges, state)
+
+    expected = compute_mentions(drugs2, pubmed2, trials)
+    pd.testing.assert_frame_equal(edges2, expected, check_categorical=False)
+    assert (edges2["source_id"] == "1").sum() == 6
+
+    # Dropping one copy drops its edges only
+    edges3, _ = update_mentions(drugs, chunks(pubmed2.iloc[1:]), chunks(trials), edges2, state2)
+    expected = compute_mentions(drugs, pubmed2.iloc[1:], trials)
+    pd.testing.assert_frame_equal(edges3, expected, check_categorical=False)
+
+
+def test_update_mentions_recomputes_when_match_mode_changes():
+    drugs, pubmed, trials = inputs()
+    edges, state = update_mentions(drugs, chunks(pubmed), chunks(trials), match_mode="phrase")
+
+    edges2, state2 = update_mentions(
+        drugs, chunks(pubmed), chunks(trials), edges, state, match_mode="substring"
+    )
+
+    pd.testing.assert_frame_equal(
+        edges2, compute_mentions(drugs, pubmed, trials), check_categorical=False
+    )
+    assert state2.match_mode == "substring"
+
+
+def test_save_and_load_state_roundtrip(tmp_path):
+    drugs, pubmed, trials = inputs()
+    _, state = update_mentions(drugs, [pubmed], [trials], match_mode="word")
+
+    loaded = load_state(save_state(state, tmp_path / "sub" / "state.npz"))
+
+    assert loaded.match_mode == "word"
+    for name in ["drugs", "pubmed", "trials", "edge_drugs", "edge_docs"]:
+        assert (getattr(loaded, name) == getattr(state, name)).all()
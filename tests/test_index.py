@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medmentions import index as index_module
+from medmentions.index import (
+    IndexWriter,
+    InvertedIndex,
+    iter_index_parts,
+    load_index,
+    lookup_index,
+    save_index,
+    tokenize,
+)
+
+
+def make_index() -> InvertedIndex:
+    titles = pd.Series(
+        [
+            "Use of tetracycline in acne",
+            None,
+            "Acne: tetracycline, then isotretinoin",
+            "Acne use of tetracycline",
+        ]
+    )
+    return InvertedIndex.build(titles)
+
+
+def test_tokenize_lowercases_and_drops_punctuation():
+    assert tokenize("Acne: Tetracycline, (ISO)") == ["acne", "tetracycline", "iso"]
+
+
+def test_build_posting_lists_by_row_position():
+    index = make_index()
+    assert index.n_docs == 4
+    assert index.token_postings("tetracycline").tolist() == [0, 2, 3]
+    assert index.token_postings("isotretinoin").tolist() == [2]
+    assert index.token_postings("missing").tolist() == []
+
+
+def test_lookup_verifies_multi_word_phrases():
+    index = make_index()
+    # all three tokens appear in rows 0 and 3, but only row 0 has them in order
+    assert index.lookup(["of", "tetracycline", "in"]).tolist() == [0]
+    assert index.lookup(["use", "of"]).tolist() == [0, 3]
+    assert index.lookup(["acne", "unknown"]).tolist() == []
+    assert index.lookup([]).tolist() == []
+
+
+def test_concat_equals_index_of_stacked_documents():
+    first = pd.Series(["tetracycline in acne", None])
+    second = pd.Series(["acne", "Use of tetracycline"])
+
+    stacked = InvertedIndex.concat([InvertedIndex.build(first), InvertedIndex.build(second)])
+    whole = InvertedIndex.build(pd.concat([first, second]))
+
+    assert stacked.n_docs == 4
+    for attr in ("vocab", "token_offsets", "postings", "doc_offsets", "doc_tokens"):
+        assert getattr(stacked, attr).tolist() == getattr(whole, attr).tolist()
+    assert stacked.lookup(["tetracycline"]).tolist() == [0, 3]
+
+
+def test_concat_of_many_parts_with_empty_ones():
+    rng = np.random.default_rng(0)
+    words = np.array(["acne", "of", "tetracycline", "use", "ethanol", "in"])
+    titles = pd.Series([" ".join(rng.choice(words, rng.integers(0, 6))) for _ in range(200)])
+    bounds = [0, 0, 13, 50, 50, 51, 120, 200]
+
+    stacked = InvertedIndex.concat(
+        [InvertedIndex.build(titles.iloc[lo:hi]) for lo, hi in zip(bounds, bounds[1:])]
+    )
+    whole = InvertedIndex.build(titles)
+
+    for attr in ("vocab", "token_offsets", "postings", "doc_offsets", "doc_tokens"):
+        assert getattr(stacked, attr).tolist() == getattr(whole, attr).tolist()
+
+
+def test_select_equals_index_of_kept_documents():
+    rng = np.random.default_rng(1)
+    words = np.array(["acne", "of", "tetracycline", "use", "ethanol", "in"])
+    titles = pd.Series([" ".join(rng.choice(words, rng.integers(0, 4))) for _ in range(100)])
+    titles[::7] = None
+    index = InvertedIndex.build(titles)
+
+    for keep in [rng.random(100) < 0.3, np.ones(100, dtype=bool), np.zeros(100, dtype=bool)]:
+        selected = index.select(keep)
+        kept = InvertedIndex.build(titles[keep])
+        for attr in ("vocab", "token_offsets", "postings", "doc_offsets", "doc_tokens"):
+            assert getattr(selected, attr).tolist() == getattr(kept, attr).tolist()
+
+
+def test_save_and_load_index_roundtrip(tmp_path: Path):
+    index = make_index()
+    out_file = tmp_path / "nested" / "titles.index"
+
+    returned = save_index(index, out_file)
+
+    assert returned == str(out_file)
+    loaded = load_index(out_file)
+    assert loaded.n_docs == index.n_docs
+    assert loaded.vocab.tolist() == index.vocab.tolist()
+    assert loaded.lookup(["use", "of"]).tolist() == [0, 3]
+
+
+def test_saved_vocab_is_sized_by_its_tokens(tmp_path: Path):
+    titles = pd.Series(["é" * 5000, *(f"t{i}" for i in range(2000))])
+    index = InvertedIndex.build(titles)
+    out_file = save_index(index, tmp_path / "titles.index")
+
+    # Fixed-width tokens would take 2001 x 5000 x 4 bytes
+    assert Path(out_file).stat().st_size < 200_000
+    loaded = load_index(out_file)
+    assert loaded.vocab.dtype == object
+    assert loaded.vocab.tolist() == index.vocab.tolist()
+    assert loaded.token_postings("é" * 5000).tolist() == [0]
+
+
+def test_index_written_by_parts(tmp_path: Path):
+    rng = np.random.default_rng(2)
+    words = np.array(["acne", "of", "tetracycline", "use", "ethanol", "in"])
+    titles = pd.Series([" ".join(rng.choice(words, rng.integers(0, 5))) for _ in range(90)])
+    bounds = [0, 40, 40, 90]
+    path = tmp_path / "titles.index"
+
+    with IndexWriter(path) as writer:
+        for lo, hi in zip(bounds, bounds[1:]):
+            writer.append(InvertedIndex.build(titles.iloc[lo:hi]))
+
+    assert [part.n_docs for part in iter_index_parts(path)] == [40, 0, 50]
+    whole = InvertedIndex.build(titles)
+    for attr in ("vocab", "token_offsets", "postings", "doc_offsets", "doc_tokens"):
+        assert getattr(load_index(path), attr).tolist() == getattr(whole, attr).tolist()
+    for phrase in (["use", "of"], ["acne"], ["in", "acne"], ["unknown"]):
+        assert lookup_index(path, phrase).tolist() == whole.lookup(phrase).tolist()
+
+
+def test_load_index_rejects_other_versions(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(index_module, "INDEX_FORMAT_VERSION", 0)
+    path = save_index(make_index(), tmp_path / "titles.index")
+    monkeypatch.undo()
+
+    with pytest.raises(ValueError, match="version 0"):
+        load_index(path)
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
 import json
+from datetime import date
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pandas.testing as pdt
+import pytest
 
-from medmentions.intermediary_io import load_df_csv, save_df_csv, save_json
+from medmentions.intermediary_io import (
+    concat_df_files,
+    iter_df_chunks,
+    load_df,
+    load_df_csv,
+    save_df,
+    save_df_chunks,
+    save_df_csv,
+    save_json,
+)
 
 
 def test_save_json_creates_parent_and_writes_json(tmp_path: Path):
@@ -43,3 +55,136 @@ def test_save_and_load_df_csv_roundtrip(tmp_path: Path):
 
     loaded = load_df_csv(out_file)
     pdt.assert_frame_equal(loaded, df)
+
+
+@pytest.mark.parametrize("suffix", ["parquet", "feather"])
+def test_columnar_roundtrip_keeps_dates_and_categories(tmp_path: Path, suffix: str):
+    pytest.importorskip("pyarrow")
+    df = pd.DataFrame(
+        {
+            "id": ["1", "2", "3"],
+            "journal": pd.Categorical(["j1", "j2", "j1"]),
+            "date": [date(2020, 1, 1), date(2021, 2, 3), date(2019, 12, 31)],
+        },
+        index=[5, 6, 7],
+    )
+
+    out_file = tmp_path / "dir" / f"table.{suffix}"
+    returned = save_df(df, out_file)
+
+    assert returned == str(out_file)
+    loaded = load_df(out_file)
+    pdt.assert_frame_equal(loaded, df.reset_index(drop=True))
+    assert list(load_df(out_file, columns=["id"]).columns) == ["id"]
+
+
+def test_save_and_load_df_dispatch_csv_and_reject_unknown_suffix(tmp_path: Path):
+    df = pd.DataFrame({"id": [1, 2], "name": ["a", "b"]})
+
+    save_df(df, tmp_path / "table.csv")
+
+    pdt.assert_frame_equal(load_df(tmp_path / "table.csv"), df)
+    pdt.assert_frame_equal(load_df(tmp_path / "table.csv", columns=["name"]), df[["name"]])
+    with pytest.raises(ValueError):
+        save_df(df, tmp_path / "table.xlsx")
+
+
+@pytest.mark.parametrize("suffix", ["csv", "parquet", "feather"])
+def test_save_df_chunks_and_iter_df_chunks_roundtrip(tmp_path: Path, suffix: str):
+    if suffix != "csv":
+        pytest.importorskip("pyarrow")
+    # The first chunk has an all-null column: later chunks must still fit
+    chunks = [
+        pd.DataFrame({"id": ["1", "2"], "journal": [None, None]}),
+        pd.DataFrame({"id": ["3"], "journal": ["j3"]}, index=[7]),
+    ]
+
+    out_file = tmp_path / "dir" / f"table.{suffix}"
+    returned = save_df_chunks(iter(chunks), out_file)
+
+    assert returned == str(out_file)
+    expected = pd.DataFrame({"id": ["1", "2", "3"], "journal": [None, None, "j3"]})
+    loaded = load_df(out_file)
+    assert loaded["id"].astype(str).tolist() == expected["id"].tolist()
+    assert loaded["journal"].where(loaded["journal"].notna(), None).tolist() == [None, None, "j3"]
+
+    parts = list(iter_df_chunks(out_file, chunksize=2, columns=["id"]))
+    assert [p.index.tolist() for p in parts] == [[0, 1], [2]]
+    assert all(list(p.columns) == ["id"] for p in parts)
+
+
+@pytest.mark.parametrize("suffix", ["parquet", "feather"])
+def test_save_df_chunks_keeps_categories_across_chunks(tmp_path: Path, suffix: str):
+    pytest.importorskip("pyarrow")
+    # Each chunk has its own categories, the first one none at all
+    chunks = [
+        pd.DataFrame({"journal": pd.Categorical([None, None])}),
+        pd.DataFrame({"journal": pd.Categorical(["j2", "j1"])}),
+        pd.DataFrame({"journal": pd.Categorical(["j3", "j2"])}),
+    ]
+    out_file = tmp_path / f"table.{suffix}"
+    save_df_chunks(iter(chunks), out_file)
+
+    loaded = load_df(out_file)
+    assert loaded["journal"].dtype == "category"
+    assert loaded["journal"].astype(object).tolist()[2:] == ["j2", "j1", "j3", "j2"]
+    assert loaded["journal"].iloc[:2].isna().all()
+    parts = list(iter_df_chunks(out_file, chunksize=4))
+    assert all(p["journal"].dtype == "category" for p in parts)
+    assert pd.concat(parts)["journal"].astype(object).tolist()[2:] == ["j2", "j1", "j3", "j2"]
+
+
+@pytest.mark.parametrize("suffix", ["csv", "parquet", "feather"])
+def test_concat_df_files_stacks_saved_frames(tmp_path: Path, suffix: str):
+    if suffix != "csv":
+        pytest.importorskip("pyarrow")
+    frames = [
+        pd.DataFrame({"id": ["007", "2"], "journal": pd.Categorical(["j2", None])}),
+        pd.DataFrame({"id": pd.Series([], dtype=object), "journal": pd.Categorical([])}),
+        pd.DataFrame({"id": ["3"], "journal": pd.Categorical(["j1"])}),
+    ]
+    paths = [save_df(df, tmp_path / f"part{i}.{suffix}") for i, df in enumerate(frames)]
+
+    out_file = tmp_path / "dir" / f"all.{suffix}"
+    assert concat_df_files(paths, out_file, chunksize=1) == str(out_file)
+    kept_file = tmp_path / f"kept.{suffix}"
+    concat_df_files(paths, kept_file, chunksize=1, keep=np.array([True, False, True]))
+
+    if suffix == "csv":  # concatenated as text: ids are not re-parsed
+        assert out_file.read_text(encoding="utf-8").splitlines() == [
+            "id,journal",
+            "007,j2",
+            "2,",
+            "3,j1",
+        ]
+        assert kept_file.read_text(encoding="utf-8").splitlines() == [
+            "id,journal",
+            "007,j2",
+            "3,j1",
+        ]
+    else:
+        loaded = load_df(out_file)
+        assert loaded["id"].tolist() == ["007", "2", "3"]
+        assert loaded["journal"].dtype == "category"
+        assert loaded["journal"].astype(object).tolist()[::2] == ["j2", "j1"]
+        kept = load_df(kept_file)
+        assert kept["id"].tolist() == ["007", "3"]
+        assert kept["journal"].astype(object).tolist() == ["j2", "j1"]
+    concat_df_files(paths[1:2], tmp_path / f"empty.{suffix}", chunksize=1)
+    assert list(load_df(tmp_path / f"empty.{suffix}").columns) == ["id", "journal"]
+
+
+def test_iter_df_chunks_reads_csv_as_strings(tmp_path: Path):
+    out_file = tmp_path / "table.csv"
+    out_file.write_text("id,journal\n007,1\n2,j2\n3,\n", encoding="utf-8")
+
+    parts = list(iter_df_chunks(out_file, chunksize=1))
+
+    assert [p["id"].tolist() for p in parts] == [["007"], ["2"], ["3"]]
+    assert [p["journal"].dtype for p in parts] == [object] * 3
+    assert parts[0]["journal"].tolist() == ["1"] and parts[2]["journal"].isna().all()
+
+
+def test_save_df_chunks_rejects_empty_stream(tmp_path: Path):
+    with pytest.raises(ValueError):
+        save_df_chunks(iter([]), tmp_path / "table.csv")
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import random
+
+from medmentions.matcher import AhoCorasick, AhoCorasickTable
+
+
+def test_search_finds_all_overlapping_patterns():
+    ac = AhoCorasick(["he", "she", "his", "hers"])
+    assert ac.search("ushers") == {0, 1, 3}
+    assert ac.search("this") == {2}
+    assert ac.search("nothing") == set()
+
+
+def test_search_is_literal_not_regex():
+    ac = AhoCorasick(["a.c", "(x)"])
+    assert ac.search("abc") == set()
+    assert ac.search("a.c and (x)") == {0, 1}
+
+
+def test_search_with_empty_pattern_matches_any_text():
+    ac = AhoCorasick(["", "b"])
+    assert ac.search("") == {0}
+    assert ac.search("ab") == {0, 1}
+    assert ac.n_patterns == 2
+
+
+def test_table_searches_like_the_automaton():
+    rng = random.Random(0)
+    for _ in range(200):
+        patterns = [
+            "".join(rng.choices("abc", k=rng.randint(0, 4))) for _ in range(rng.randint(0, 6))
+        ]
+        ac = AhoCorasick(patterns)
+        table = AhoCorasickTable.from_automaton(ac)
+        for _ in range(10):
+            text = "".join(rng.choices("abcd", k=rng.randint(0, 12)))
+            assert table.search(text) == ac.search(text), (patterns, text)
+
+
+def test_table_search_finds_all_overlapping_patterns():
+    table = AhoCorasickTable.from_automaton(AhoCorasick(["he", "she", "his", "hers"]))
+    assert table.search("ushers") == {0, 1, 3}
+    assert table.search("thé his") == {2}
+    assert list(table.alphabet) == ["e", "h", "i", "r", "s"]
@@ -1,6 +1,18 @@
+from datetime import date
+
 import pandas as pd
+import pytest
 
-from medmentions.mentions import build_graph_df, compute_mentions, journal_with_most_distinct_drugs
+from medmentions.index import InvertedIndex
+from medmentions.mentions import (
+    EDGE_COLUMNS,
+    build_graph_df,
+    compute_mentions,
+    concat_edges,
+    iter_mentions,
+    journal_with_most_distinct_drugs,
+    merge_edge_parts,
+)
 
 
 def make_df(data, columns):
@@ -100,7 +112,9 @@ def test_compute_mentions_case_insensitive_and_multi_hit():
     assert len(out) == 4
 
     # Validate counts per (drug, source_type)
-    counts = out.groupby(["drug_name", "source_type"]).size().rename("n").reset_index()
+    counts = (
+        out.groupby(["drug_name", "source_type"], observed=True).size().rename("n").reset_index()
+    )
     expected = {
         ("Aspirin", "pubmed"): 1,
         ("Paracetamol", "pubmed"): 1,
@@ -131,6 +145,119 @@ def test_compute_mentions_handles_missing_titles_and_no_hits():
     ]
 
 
+@pytest.mark.parametrize("match_mode", ["substring", "phrase"])
+@pytest.mark.parametrize("prebuilt_index", [False, True])
+def test_iter_mentions_over_chunks_matches_compute_mentions(match_mode, prebuilt_index):
+    drugs = make_df([["A01", "Aspirin"], ["B01", "Folic acid"]], ["atccode", "drug"])
+    pubmed = make_df(
+        [
+            ["p1", "aspirin and folic acid", "J1", "2020-01-01"],
+            ["p2", "unrelated", "J1", "2020-01-02"],
+            ["p3", "Folic acid alone", "J2", "2020-01-03"],
+            ["p4", "aspirin again", "J2", "2020-01-04"],
+            ["p5", "aspirin", "J3", "2020-01-05"],
+        ],
+        ["id", "title", "journal", "date"],
+    )
+    trials = make_df(
+        [["t1", "Aspirin trial", "J4", "2020-02-01"]],
+        ["id", "scientific_title", "journal", "date"],
+    )
+    indexes = {}
+    if prebuilt_index and match_mode != "substring":
+        indexes = {
+            "pubmed_index": InvertedIndex.build(pubmed["title"]),
+            "trials_index": InvertedIndex.build(trials["scientific_title"]),
+        }
+
+    chunks = list(
+        iter_mentions(
+            drugs,
+            (pubmed.iloc[i : i + 2] for i in range(0, len(pubmed), 2)),
+            [trials],
+            match_mode=match_mode,
+            **indexes,
+        )
+    )
+
+    whole = compute_mentions(drugs, pubmed, trials, match_mode=match_mode)
+    streamed = concat_edges(chunks)
+    key = ["source_type", "drug_atccode", "source_id"]
+    pd.testing.assert_frame_equal(
+        streamed.sort_values(key).reset_index(drop=True),
+        whole.sort_values(key).reset_index(drop=True),
+        check_categorical=False,
+    )
+
+
+def test_iter_mentions_yields_empty_frame_when_nothing_matches():
+    drugs = make_df([["A01", "Aspirin"]], ["atccode", "drug"])
+    pubmed = make_df([["p1", "unrelated", "J1", "2020-01-01"]], ["id", "title", "journal", "date"])
+    trials = make_df([], ["id", "scientific_title", "journal", "date"])
+
+    chunks = list(iter_mentions(drugs, [pubmed], [trials]))
+
+    assert len(chunks) == 1
+    assert chunks[0].empty
+    assert list(chunks[0].columns) == [
+        "drug_atccode",
+        "drug_name",
+        "source_type",
+        "source_id",
+        "source_title",
+        "journal",
+        "date",
+    ]
+
+
+@pytest.mark.parametrize("match_mode", ["substring", "word", "phrase"])
+def test_compute_mentions_in_parallel_equals_serial(match_mode):
+    drugs = make_df(
+        [["A01", "Aspirin"], ["B01", "Folic acid"], ["C01", "aspirin"]], ["atccode", "drug"]
+    )
+    titles = ["aspirin and folic acid", "unrelated", "acid folic", None, "ASPIRIN", "folic"]
+    pubmed = make_df(
+        [[f"p{i}", t, "J1", "2020-01-01"] for i, t in enumerate(titles * 3)],
+        ["id", "title", "journal", "date"],
+    )
+    trials = make_df(
+        [["t1", "Aspirin trial", "J4", "2020-02-01"], ["t2", "none", "J4", "2020-02-02"]],
+        ["id", "scientific_title", "journal", "date"],
+    )
+
+    serial = compute_mentions(drugs, pubmed, trials, match_mode=match_mode)
+    parallel = compute_mentions(drugs, pubmed, trials, match_mode=match_mode, n_workers=4)
+
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+def test_merge_edge_parts_equals_matching_the_row_ranges_in_order():
+    drugs = make_df([["A01", "Aspirin"], ["B01", "Heparin"]], ["atccode", "drug"])
+    pubmed = make_df(
+        [[f"p{i}", t, "J1", "2020-01-01"] for i, t in enumerate(["heparin", "aspirin"] * 3)],
+        ["id", "title", "journal", "date"],
+    )
+    trials = make_df(
+        [[f"t{i}", "aspirin", "J2", "2020-01-01"] for i in range(4)],
+        ["id", "scientific_title", "journal", "date"],
+    )
+
+    parts = [
+        compute_mentions(drugs, pubmed.iloc[:3], trials.iloc[:1]),
+        compute_mentions(drugs, pubmed.iloc[3:3], trials.iloc[1:1]),
+        compute_mentions(drugs, pubmed.iloc[3:], trials.iloc[1:]),
+    ]
+
+    streamed = concat_edges(
+        list(
+            iter_mentions(
+                drugs, [pubmed.iloc[:3], pubmed.iloc[3:]], [trials.iloc[:1], trials.iloc[1:]]
+            )
+        )
+    )
+    pd.testing.assert_frame_equal(merge_edge_parts(parts), streamed, check_categorical=False)
+
+
 # ---------- build_graph_df ----------
 
 
@@ -185,6 +312,47 @@ def test_build_graph_df_structure_and_dates_normalization():
     assert g["edges"][1]["date"] == "2021-03-04"
 
 
+@pytest.mark.parametrize(
+    "dates",
+    [
+        ["2020-02-01", "2021-03-04", None, "2020-02-01"],
+        [date(2020, 2, 1), date(2021, 3, 4), None, date(2020, 2, 1)],
+        pd.to_datetime(["2020-02-01 10:30", "2021-03-04", None, "2020-02-01"], format="mixed"),
+    ],
+    ids=["normalized-strings", "date-objects", "datetime64"],
+)
+def test_build_graph_df_formats_dates_without_modifying_edges(dates):
+    edges = make_df(
+        [
+            ["B02", "Aspirin", "pubmed", "p1", "Aspirin study", "J2", None],
+            ["A01", "Epinephrine", "pubmed", "p2", "Epinephrine study", None, None],
+            ["B02", "Aspirin", "clinical", "t1", "Aspirin trial", "J1", None],
+            ["A01", "Epinephrine", "clinical", "t2", "Epinephrine trial", "J1", None],
+        ],
+        EDGE_COLUMNS,
+    ).astype({"drug_name": "category"})
+    edges["date"] = dates
+    before = edges.copy()
+
+    g = build_graph_df(edges)
+
+    assert [e["date"] for e in g["edges"]] == ["2020-02-01", "2021-03-04", "NaT", "2020-02-01"]
+    assert g["drugs"] == [
+        {"atccode": "A01", "name": "Epinephrine"},
+        {"atccode": "B02", "name": "Aspirin"},
+    ]
+    assert g["edges"][1] == {
+        "drug_atccode": "A01",
+        "drug_name": "Epinephrine",
+        "source_type": "pubmed",
+        "source_id": "p2",
+        "source_title": "Epinephrine study",
+        "journal": None,
+        "date": "2021-03-04",
+    }
+    pd.testing.assert_frame_equal(edges, before)
+
+
 # ---------- journal_with_most_distinct_drugs ----------
 
 
@@ -229,3 +397,130 @@ def test_journal_with_most_distinct_drugs_basic():
     top = journal_with_most_distinct_drugs(edges)
     # J1 has two distinct drugs (A01, B02); others have 1
     assert top == {"journal": "J1", "distinct_drugs": 2}
+    # Same answer on categoricals, whatever the category order
+    categorical = edges.astype({"drug_atccode": "category", "journal": "category"})
+    categorical["journal"] = categorical["journal"].cat.reorder_categories(["J3", "J2", "J1"])
+    assert journal_with_most_distinct_drugs(categorical) == top
+
+
+def test_journal_with_most_distinct_drugs_breaks_ties_by_name():
+    columns = ["drug_atccode", "journal"]
+    journals = ["J9", "J10", "J2", "J9", "J10", "J2", None]
+    edges = make_df([[f"A{i % 2}", j] for i, j in enumerate(journals)], columns)
+
+    # J10, J2 and J9 all have both drugs
+    assert journal_with_most_distinct_drugs(edges) == {"journal": "J10", "distinct_drugs": 2}
+    assert journal_with_most_distinct_drugs(edges.iloc[::-1]) == {
+        "journal": "J10",
+        "distinct_drugs": 2,
+    }
+    assert journal_with_most_distinct_drugs(edges.iloc[-1:]) == {
+        "journal": None,
+        "distinct_drugs": 0,
+    }
+
+
+def test_compute_mentions_edges_are_categorical_and_concat_edges_keeps_them():
+    drugs = make_df([["A01", "abc"], ["B01", "xyz"]], ["atccode", "drug"])
+    pubmed = make_df(
+        [["p1", "abc", "J1", "2020-01-01"], ["p2", "xyz", "J2", "2020-01-02"]],
+        ["id", "title", "journal", "date"],
+    )
+    trials = make_df([], ["id", "scientific_title", "journal", "date"])
+
+    parts = [compute_mentions(drugs, pubmed.iloc[[i]], trials) for i in range(2)]
+    out = concat_edges(parts)
+
+    for col in ["drug_atccode", "drug_name", "source_type", "journal"]:
+        assert all(p[col].dtype == "category" for p in parts)
+        assert out[col].dtype == "category"
+    assert out["journal"].astype(object).tolist() == ["J1", "J2"]
+    assert out["drug_atccode"].astype(object).tolist() == ["A01", "B01"]
+    assert out.index.tolist() == [0, 1]
+
+
+def test_compute_mentions_treats_drug_names_literally_and_keeps_drug_order():
+    drugs = make_df([["Z01", "b.c"], ["A01", "abc"]], ["atccode", "drug"])
+    pubmed = make_df(
+        [
+            ["p1", "abc only", "J1", "2020-01-01"],
+            ["p2", "B.C and abc", "J2", "2020-01-02"],
+        ],
+        ["id", "title", "journal", "date"],
+    )
+    trials = make_df([], ["id", "scientific_title", "journal", "date"])
+
+    out = compute_mentions(drugs, pubmed, trials)
+
+    # "b.c" is not a regex: it only matches p2; edges are ordered by drug then doc
+    assert list(zip(out["drug_atccode"], out["source_id"])) == [
+        ("Z01", "p2"),
+        ("A01", "p1"),
+        ("A01", "p2"),
+    ]
+
+
+def test_compute_mentions_with_title_indexes_matches_whole_tokens():
+    drugs = make_df([["A01", "Ethanol"], ["B01", "Folic Acid"]], ["atccode", "drug"])
+    pubmed = make_df(
+        [
+            ["p1", "ethanol intake", "J1", "2020-01-01"],
+            ["p2", "methanolic extract", "J1", "2020-01-02"],
+            ["p3", "folic acid and acid folic", "J2", "2020-01-03"],
+        ],
+        ["id", "title", "journal", "date"],
+    )
+    trials = make_df(
+        [["t1", "Acid, folic trial", "J3", "2020-01-04"]],
+        ["id", "scientific_title", "journal", "date"],
+    )
+
+    out = compute_mentions(
+        drugs,
+        pubmed,
+        trials,
+        pubmed_index=InvertedIndex.build(pubmed["title"]),
+        trials_index=InvertedIndex.build(trials["scientific_title"]),
+        match_mode="phrase",
+    )
+
+    assert list(zip(out["drug_atccode"], out["source_id"])) == [("A01", "p1"), ("B01", "p3")]
+
+
+@pytest.mark.parametrize(
+    "match_mode,expected",
+    [
+        ("substring", ["p1", "p2"]),
+        ("word", ["p1", "p3", "p4"]),
+        ("phrase", ["p1", "p3"]),
+    ],
+)
+def test_compute_mentions_match_modes(match_mode, expected):
+    drugs = make_df([["A01", "Iron (III)"]], ["atccode", "drug"])
+    pubmed = make_df(
+        [
+            ["p1", "Oral iron (III) therapy", "J1", "2020-01-01"],
+            ["p2", "Sidiron (III) extract", "J1", "2020-01-02"],
+            ["p3", "IRON III deficiency", "J1", "2020-01-03"],
+            ["p4", "III trial of iron", "J1", "2020-01-04"],
+        ],
+        ["id", "title", "journal", "date"],
+    )
+    trials = make_df([], ["id", "scientific_title", "journal", "date"])
+
+    out = compute_mentions(drugs, pubmed, trials, match_mode=match_mode)
+
+    assert list(out["source_id"]) == expected
+
+
+def test_compute_mentions_rejects_unknown_mode_and_index_with_substring():
+    drugs = make_df([["A01", "x"]], ["atccode", "drug"])
+    pubmed = make_df([["p1", "x", "J", "2020-01-01"]], ["id", "title", "journal", "date"])
+    trials = make_df([], ["id", "scientific_title", "journal", "date"])
+
+    with pytest.raises(ValueError):
+        compute_mentions(drugs, pubmed, trials, match_mode="regex")
+    with pytest.raises(ValueError):
+        compute_mentions(drugs, pubmed, trials, pubmed_index=InvertedIndex.build(pubmed["title"]))
+    with pytest.raises(ValueError):
+        compute_mentions(drugs, pubmed, trials, n_workers=0)
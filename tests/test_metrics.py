@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from medmentions import metrics
+from medmentions.metrics import collect, instrument
+
+
+@instrument
+def double(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.concat([df, df])
+
+
+@instrument
+def chunks(df: pd.DataFrame, size: int):
+    for start in range(0, len(df), size):
+        yield df.iloc[start : start + size]
+
+
+@instrument
+def allocate(n: int) -> np.ndarray:
+    return np.ones(n, dtype=np.uint8)
+
+
+@instrument
+def allocate_twice(n: int) -> int:
+    return len(allocate(n)) + len(allocate(n))
+
+
+def test_disabled_records_nothing():
+    df = pd.DataFrame({"a": [1, 2]})
+
+    assert len(double(df)) == 4
+    assert double.__name__ == "double"
+    assert metrics._recorder is None
+
+
+def test_collect_records_calls_rows_and_time():
+    df = pd.DataFrame({"a": [1, 2, 3]})
+
+    with collect() as recorder:
+        double(df)
+        double(df.iloc[:1])
+    report = recorder.report()
+
+    stage = report["stages"]["test_metrics.double"]
+    assert stage["calls"] == 2
+    assert stage["rows_in"] == 4
+    assert stage["rows_out"] == 8
+    assert stage["seconds"] > 0
+    assert stage["mem_peak_mb"] is None
+    assert report["seconds"] >= stage["seconds"]
+    assert metrics._recorder is None  # restored on exit
+
+
+def test_generators_are_timed_while_iterated():
+    df = pd.DataFrame({"a": range(5)})
+
+    with collect() as recorder:
+        parts = chunks(df, 2)
+        assert recorder.stages["test_metrics.chunks"].rows_out is None
+        assert [len(p) for p in parts] == [2, 2, 1]
+
+    stage = recorder.stages["test_metrics.chunks"]
+    assert stage.calls == 1
+    assert stage.rows_in == 5
+    assert stage.rows_out == 5
+
+
+def test_traced_memory_peak_covers_nested_stages():
+    n = 8 << 20
+
+    with collect(trace_memory=True) as recorder:
+        allocate_twice(n)
+
+    inner = recorder.stages["test_metrics.allocate"].mem_peak
+    outer = recorder.stages["test_metrics.allocate_twice"].mem_peak
+    assert n <= inner < 2 * n
+    assert outer >= inner
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import pandas as pd
+import pytest
 
 from medmentions.normalizers import normalize_drugs, normalize_pubmed, normalize_trials
 
@@ -23,6 +24,9 @@ def test_normalize_drugs_normalizes_text_and_trims_atccode():
     assert list(out["drug"]) == ["cafe", "hello world"]
     # other column preserved
     assert list(out["other"]) == [1, 2]
+    # repeated strings are carried as categoricals
+    assert out["atccode"].dtype == "category"
+    assert out["drug"].dtype == "category"
 
 
 def test_normalize_pubmed_normalizes_title_journal_and_parses_date():
@@ -40,6 +44,7 @@ def test_normalize_pubmed_normalizes_title_journal_and_parses_date():
     assert list(out.columns) == ["id", "title", "journal", "date"]
     assert list(out["title"]) == ["hello world", "cafe au lait"]
     assert list(out["journal"]) == ["the journal", "another journal"]
+    assert out["journal"].dtype == "category"
     assert list(out["date"]) == [
         pd.Timestamp("2023-01-12").date(),
         pd.Timestamp("2024-04-01").date(),
@@ -65,3 +70,56 @@ def test_normalize_trials_normalizes_scientific_title_journal_and_parses_date():
         pd.Timestamp("1999-09-03").date(),
         pd.Timestamp("2023-01-12").date(),
     ]
+
+
+def test_normalize_pubmed_projects_columns():
+    df = pd.DataFrame(
+        {
+            "id": ["1"],
+            "title": [" Café "],
+            "abstract": ["never normalized"],
+            "journal": [" J "],
+            "date": ["not a date"],
+        }
+    )
+
+    out = normalize_pubmed(df, columns=["title", "id", "journal"])
+
+    assert list(out.columns) == ["title", "id", "journal"]
+    assert out["title"].tolist() == ["cafe"]
+    assert out["journal"].tolist() == ["j"]
+    # the input is left as it was
+    assert df["title"].tolist() == [" Café "]
+
+
+def test_normalizers_inplace_normalize_the_frame_they_are_handed():
+    raw = {
+        "id": ["t1", "t2"],
+        "scientific_title": ["  Epinephrine Study ", "  Café  Study"],
+        "journal": [" Clin\nTrials  ", "  J\tMed  "],
+        "date": ["03-09-1999", "2023/01/12"],
+    }
+    expected = normalize_trials(pd.DataFrame(raw))
+    df = pd.DataFrame(raw)
+
+    out = normalize_trials(df, inplace=True)
+
+    assert out is df
+    pd.testing.assert_frame_equal(out, expected)
+
+    drugs = pd.DataFrame({"atccode": [" A01 "], "drug": [" Café "], "other": [1]})
+    out = normalize_drugs(drugs, columns=["drug", "atccode"], inplace=True)
+    assert out is drugs
+    assert list(out.columns) == ["drug", "atccode"]
+    assert out["atccode"].tolist() == ["A01"]
+
+
+def test_normalizers_copy_the_columns_they_do_not_normalize():
+    df = pd.DataFrame({"id": ["1"], "title": ["T"], "journal": ["J"], "date": ["2020-01-01"]})
+
+    out = normalize_pubmed(df)
+    out.loc[0, "id"] = "changed"
+
+    assert df["id"].tolist() == ["1"]
+    with pytest.raises(KeyError, match="missing"):
+        normalize_pubmed(df, columns=["id", "missing"])
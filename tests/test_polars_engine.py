@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+
+import pandas as pd
+import pytest
+
+from medmentions import mentions, normalizers, readers
+
+pl = pytest.importorskip("polars")
+
+from medmentions import polars_engine  # noqa: E402
+
+DRUGS_CSV = """ATCCODE,DRUG
+A01,Epinephrine
+B02,ATROPINE
+C03,épinéphrine
+D04,beta  blocker
+E05,Cycline
+F06,
+"""
+
+PUBMED_CSV = """id,title,journal,date
+1,Epinephrine and atropine in shock,Journal of Émergency,2020-01-01
+2,Tetracycline resistance,J2,01/02/2020
+3,A blocker of beta receptors,,3 March 2021
+4,"Beta blocker, then EPINEPHRINE",Journal of Emergency,2019/12/31
+5,,J3,2020-01-01
+"""
+
+PUBMED_JSON = """[
+  {"id": 6, "title": "Atropine-induced tachycardia", "journal": "J2", "date": "5 May 2020"},
+  {"id": "", "title": "Cycline\\tand  beta blocker", "journal": "J1", "date": "12-06-2020",},
+]
+"""
+
+TRIALS_CSV = """id,scientific_title,journal,date
+NCT1,Atropine dosage,J4,1 January 2020
+NCT2,Doxycycline versus placebo,J4,02/01/2020
+NCT3,Nothing here,J5,2020-01-03
+"""
+
+
+def write_inputs(tmp_path):
+    paths = {}
+    for name, text in (
+        ("drugs.csv", DRUGS_CSV),
+        ("pubmed.csv", PUBMED_CSV),
+        ("pubmed.json", PUBMED_JSON),
+        ("clinical_trials.csv", TRIALS_CSV),
+    ):
+        paths[name] = tmp_path / name
+        paths[name].write_text(text, encoding="utf-8")
+    return paths
+
+
+def read_inputs(read, normalize, paths):
+    """Normalized drugs, PubMed CSV, PubMed JSON and trials of an engine."""
+    return (
+        normalize.normalize_drugs(read.read_drugs_csv(paths["drugs.csv"])),
+        normalize.normalize_pubmed(read.read_pubmed_csv(paths["pubmed.csv"])),
+        normalize.normalize_pubmed(read.read_pubmed_json(paths["pubmed.json"])),
+        normalize.normalize_trials(read.read_clinical_trials_csv(paths["clinical_trials.csv"])),
+    )
+
+
+def plain(df):
+    """Object columns with None for missing values: category sets differ."""
+    return df.astype(object).where(df.notna(), None)
+
+
+@pytest.mark.parametrize(
+    "reader", ["read_drugs_csv", "read_pubmed_csv", "read_pubmed_json", "read_clinical_trials_csv"]
+)
+def test_readers_match_pandas(tmp_path, reader):
+    paths = write_inputs(tmp_path)
+    name = {
+        "read_drugs_csv": "drugs.csv",
+        "read_pubmed_csv": "pubmed.csv",
+        "read_pubmed_json": "pubmed.json",
+        "read_clinical_trials_csv": "clinical_trials.csv",
+    }[reader]
+
+    got = polars_engine.to_pandas(getattr(polars_engine, reader)(paths[name]))
+    expected = getattr(readers, reader)(paths[name])
+
+    pd.testing.assert_frame_equal(plain(got), plain(expected))
+
+
+def test_normalizers_match_pandas(tmp_path):
+    paths = write_inputs(tmp_path)
+
+    got = [polars_engine.to_pandas(df) for df in read_inputs(polars_engine, polars_engine, paths)]
+    expected = read_inputs(readers, normalizers, paths)
+
+    for g, e in zip(got, expected):
+        assert list(g.dtypes.astype(str)) == list(e.dtypes.astype(str))
+        pd.testing.assert_frame_equal(plain(g), plain(e))
+    assert got[0]["drug"].tolist()[:3] == ["epinephrine", "atropine", "epinephrine"]
+
+
+def test_normalize_dates_rejects_unknown_formats():
+    with pytest.raises(ValueError, match="Unrecognized date formats"):
+        polars_engine.normalize_pubmed(
+            pd.DataFrame({"title": ["t"], "date": ["not a date"]})
+        ).collect()
+
+
+@pytest.mark.parametrize("match_mode", mentions.MATCH_MODES)
+def test_compute_mentions_and_graph_match_pandas(tmp_path, match_mode):
+    paths = write_inputs(tmp_path)
+    drugs, pubmed_csv, pubmed_json, trials = read_inputs(polars_engine, polars_engine, paths)
+    pubmed = pl.concat([pubmed_csv, pubmed_json])
+    e_drugs, e_pubmed_csv, e_pubmed_json, e_trials = read_inputs(readers, normalizers, paths)
+    e_pubmed = pd.concat([e_pubmed_csv, e_pubmed_json], ignore_index=True)
+
+    edges = polars_engine.compute_mentions(drugs, pubmed, trials, match_mode=match_mode)
+    expected = mentions.compute_mentions(e_drugs, e_pubmed, e_trials, match_mode=match_mode)
+
+    got = polars_engine.to_pandas(edges)
+    assert len(got)
+    assert list(got.dtypes.astype(str)) == list(expected.dtypes.astype(str))
+    pd.testing.assert_frame_equal(plain(got), plain(expected))
+
+    graph = json.loads(json.dumps(polars_engine.build_graph_df(edges)))
+    expected_graph = json.loads(json.dumps(mentions.build_graph_df(plain(expected))))
+    assert graph == expected_graph
+    assert polars_engine.journal_with_most_distinct_drugs(
+        edges
+    ) == mentions.journal_with_most_distinct_drugs(expected)
+
+
+def test_compute_mentions_accepts_pandas_frames_and_rejects_bad_arguments():
+    drugs = pd.DataFrame({"atccode": ["A01"], "drug": ["aspirin"]})
+    pubmed = pd.DataFrame(
+        {"id": ["1"], "title": ["Aspirin daily"], "journal": ["j"], "date": ["2020-01-01"]}
+    )
+    trials = pd.DataFrame(
+        {"id": [], "scientific_title": [], "journal": [], "date": []}, dtype=object
+    )
+
+    edges = polars_engine.to_pandas(polars_engine.compute_mentions(drugs, pubmed, trials))
+    assert edges["source_id"].tolist() == ["1"]
+    assert polars_engine.journal_with_most_distinct_drugs(edges.iloc[:0]) == {
+        "journal": None,
+        "distinct_drugs": 0,
+    }
+
+    with pytest.raises(ValueError, match="match_mode"):
+        polars_engine.compute_mentions(drugs, pubmed, trials, match_mode="fuzzy")
@@ -1,3 +1,16 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from medmentions.readers import (
+    iter_json_records,
+    iter_pubmed_csv,
+    iter_pubmed_json,
+    read_pubmed_csv,
+    read_pubmed_json,
+)
+
 # from pathlib import Path
 
 # from medmentions.readers import (
@@ -42,3 +55,110 @@
 #     assert not df.empty
 #     # Contains an epinephrine related trial
 #     assert df["scientific_title"].str.contains("Epinephrine", case=False, na=False).any()
+
+
+# ---------- tests on small inline fixtures ----------
+
+
+def test_read_pubmed_json_keeps_ids_as_strings(tmp_path: Path):
+    path = tmp_path / "pubmed.json"
+    path.write_text(
+        '[{"id": 9, "title": "A", "journal": "J", "date": "2020-01-01"},\n'
+        ' {"id": "", "title": "B", "journal": null, "date": "2020-01-02",},\n]',
+        encoding="utf-8",
+    )
+
+    df = read_pubmed_json(path)
+
+    assert list(df.columns) == ["id", "title", "journal", "date"]
+    assert list(df["id"]) == ["9", ""]
+    assert df["journal"].iloc[1] is None
+
+
+def test_iter_pubmed_csv_yields_bounded_chunks_equal_to_full_read(tmp_path: Path):
+    path = tmp_path / "pubmed.csv"
+    rows = "\n".join(f"{i},Title {i},J{i % 2},01/01/2020" for i in range(5))
+    path.write_text("ID,Title,Journal,Date\n" + rows + "\n", encoding="utf-8")
+
+    chunks = list(iter_pubmed_csv(path, chunksize=2))
+
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert all(list(c.columns) == ["id", "title", "journal", "date"] for c in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks), read_pubmed_csv(path))
+
+
+@pytest.mark.parametrize("block_size", [1, 5, 1 << 16])
+def test_iter_json_records_tolerates_trailing_commas_outside_strings(tmp_path: Path, block_size):
+    path = tmp_path / "records.json"
+    path.write_text(
+        '[\n  {"id": 1, "title": "a, ]", "tags": ["x", "y",],},\n'
+        '  {"id": 2, "title": "b \\" ,}"},\n]\n',
+        encoding="utf-8",
+    )
+
+    records = list(iter_json_records(path, block_size=block_size))
+
+    assert records == [
+        {"id": 1, "title": "a, ]", "tags": ["x", "y"]},
+        {"id": 2, "title": 'b " ,}'},
+    ]
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 3, 4, 7, 1 << 16])
+def test_iter_json_records_reads_values_across_block_boundaries(tmp_path: Path, block_size):
+    path = tmp_path / "records.json"
+    path.write_text(
+        " " * 10 + '[12345, 678, -0.25E-3, 1.5e10, true, null, "x,]", [1,], {"a": 2,},]',
+        encoding="utf-8",
+    )
+
+    records = list(iter_json_records(path, block_size=block_size))
+
+    assert records == [12345, 678, -0.00025, 1.5e10, True, None, "x,]", [1], {"a": 2}]
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 1 << 16])
+@pytest.mark.parametrize(
+    "text",
+    [
+        '[{"id": 1,, "title": "a"}]',
+        "[1 2 ,,3]",
+        "[1, 2,,]",
+        "[,1]",
+        '[{"a": [1,,]}]',
+        "[1.x]",
+        "[1, 2",
+        '{"id": 1}',
+    ],
+)
+def test_iter_json_records_rejects_invalid_json(tmp_path: Path, block_size, text):
+    path = tmp_path / "records.json"
+    path.write_text(text, encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        list(iter_json_records(path, block_size=block_size))
+
+
+def test_iter_pubmed_json_yields_bounded_chunks_equal_to_full_read(tmp_path: Path):
+    path = tmp_path / "pubmed.json"
+    rows = ",\n".join(
+        f'{{"id": {i}, "title": "Title {i}", "journal": "J", "date": "01/01/2020",}}'
+        for i in range(5)
+    )
+    path.write_text(f"[\n{rows},\n]", encoding="utf-8")
+
+    chunks = list(iter_pubmed_json(path, chunksize=2))
+
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks), read_pubmed_json(path))
+
+
+def test_iter_pubmed_json_empty_array_yields_one_empty_frame(tmp_path: Path):
+    path = tmp_path / "pubmed.json"
+    path.write_text("[ ]", encoding="utf-8")
+
+    chunks = list(iter_pubmed_json(path))
+
+    assert len(chunks) == 1
+    assert list(chunks[0].columns) == ["id", "title", "journal", "date"]
+    assert chunks[0].empty
@@ -1,7 +1,15 @@
+import numpy as np
 import pandas as pd
 import pytest
 
-from medmentions.utils import normalize_dates, normalize_text, normalize_text_series
+from medmentions.utils import (
+    decode_strings,
+    encode_strings,
+    factorize_sorted,
+    normalize_dates,
+    normalize_text,
+    normalize_text_series,
+)
 
 
 # ---------- normalize_text ----------
@@ -34,6 +42,46 @@ def test_normalize_text_series_preserves_nan():
     assert out.iloc[2] == "a"
 
 
+def test_normalize_text_series_matches_normalize_text_on_repeats_and_mixed_types():
+    s = pd.Series(
+        ["Journal  A", "Café\u00A0B", "Journal  A", "Café\u00A0B", 1, 1.0, True, "\x1cX\x1f"],
+        index=[10, 11, 12, 13, 14, 15, 16, 17],
+    )
+    out = normalize_text_series(s)
+    assert list(out.index) == list(s.index)
+    assert list(out) == [normalize_text(str(x)) for x in s]
+    assert list(out) == ["journal a", "cafe b", "journal a", "cafe b", "1", "1.0", "true", "x"]
+
+
+def test_normalize_text_series_as_category():
+    s = pd.Series(["Journal  B", None, "journal b", "Café"], index=[3, 4, 5, 6])
+    out = normalize_text_series(s, as_category=True)
+    assert out.dtype == "category"
+    assert list(out.cat.categories) == ["cafe", "journal b"]
+    assert list(out.index) == [3, 4, 5, 6]
+    assert list(out.astype(object).where(out.notna(), None)) == [
+        "journal b",
+        None,
+        "journal b",
+        "cafe",
+    ]
+    assert normalize_text_series(pd.Series([None, None]), as_category=True).isna().all()
+
+
+# ---------- factorize_sorted ----------
+def test_factorize_sorted_sorts_categoricals_by_value():
+    values = ["j2", None, "j1", "j2", "j3"]
+    plain = pd.Series(values, dtype=object)
+    categorical = pd.Series(pd.Categorical(values, categories=["j3", "j2", "j1", "unused"]))
+
+    for s in (plain, categorical):
+        codes, uniques = factorize_sorted(s)
+        assert list(uniques) == ["j1", "j2", "j3"]
+        assert list(codes) == [1, -1, 0, 1, 2]
+    codes, uniques = factorize_sorted(pd.Series(pd.Categorical([None, None])))
+    assert list(codes) == [-1, -1] and len(uniques) == 0
+
+
 # ---------- normalize_dates (date objects) ----------
 def test_normalize_dates_objects():
     s = pd.Series(
@@ -55,3 +103,32 @@ def test_normalize_dates_objects():
         pd.Timestamp("2023-01-12").date(),
         pd.Timestamp("2023-01-12").date(),
     ]
+
+
+def test_normalize_dates_repeated_values_and_wrong_shape_guess():
+    # "2023-1-5" and "5-1-2023" need the fallback chain or pandas inference
+    s = pd.Series(["2023-01-12", "5-1-2023", "2023-01-12", "12 May 2023", "5-1-2023"])
+    out = normalize_dates(s)
+    assert list(out) == [
+        pd.Timestamp("2023-01-12").date(),
+        pd.Timestamp("2023-01-05").date(),
+        pd.Timestamp("2023-01-12").date(),
+        pd.Timestamp("2023-05-12").date(),
+        pd.Timestamp("2023-01-05").date(),
+    ]
+
+
+def test_normalize_dates_reports_unparseable_values():
+    s = pd.Series(["2023-01-12", "not a date", "not a date", "2020-13-45"])
+    with pytest.raises(ValueError, match=r"\['not a date', '2020-13-45'\]"):
+        normalize_dates(s)
+
+
+def test_encode_strings_roundtrip():
+    values = ["acne", "", "épinéphrine", "x" * 1000]
+    data, offsets = encode_strings(values)
+
+    assert data.dtype == np.uint8 and offsets.dtype == np.int64
+    assert offsets.tolist() == [0, 4, 4, 17, 1017]
+    assert decode_strings(data, offsets).tolist() == values
+    assert decode_strings(*encode_strings([])).tolist() == []
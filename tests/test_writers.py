@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import gzip
 import json
 from pathlib import Path
 
-from medmentions.writers import write_graph
+import pandas as pd
+import pytest
+
+from medmentions.mentions import EDGE_COLUMNS, build_graph_df
+from medmentions.writers import write_graph, write_graph_stream
 
 
 def test_write_graph_creates_parent_and_writes_json(tmp_path: Path):
@@ -39,3 +44,47 @@ def test_write_graph_accepts_str_path(tmp_path: Path):
     assert returned == str(out_file)
     assert out_file.is_file()
     assert json.loads(out_file.read_text(encoding="utf-8")) == graph
+
+
+def make_edges():
+    return pd.DataFrame(
+        [
+            ["B01", "Heparin", "pubmed", "1", 'Heparin, "quoted"\ntitle', "J2", "2020-01-01"],
+            ["A01", "Café", "clinical", "NCT1", "Café trial", None, "2020-02-01"],
+            ["B01", "Heparin", "pubmed", "2", "Heparin again", "J1", "2019-12-31"],
+        ],
+        columns=EDGE_COLUMNS,
+    )
+
+
+@pytest.mark.parametrize("as_chunks", [False, True])
+def test_write_graph_stream_matches_write_graph(tmp_path: Path, as_chunks: bool):
+    edges = make_edges()
+    expected = tmp_path / "expected.json"
+    write_graph(build_graph_df(edges), expected)
+
+    source = [edges.iloc[:1], edges.iloc[1:1], edges.iloc[1:]] if as_chunks else edges
+    returned = write_graph_stream(source, tmp_path / "out" / "graph.json")
+
+    assert returned == str(tmp_path / "out" / "graph.json")
+    assert Path(returned).read_bytes() == expected.read_bytes()
+
+
+def test_write_graph_stream_compact_and_gzip(tmp_path: Path):
+    edges = make_edges()
+
+    out_file = Path(write_graph_stream(iter([edges]), tmp_path / "graph.json.gz", compact=True))
+
+    with gzip.open(out_file, "rt", encoding="utf-8") as f:
+        text = f.read()
+    assert text == json.dumps(build_graph_df(edges), ensure_ascii=False)
+
+
+def test_write_graph_stream_without_edges(tmp_path: Path):
+    out_file = Path(write_graph_stream(iter([]), tmp_path / "graph.json"))
+
+    assert json.loads(out_file.read_text(encoding="utf-8")) == {
+        "drugs": [],
+        "journals": [],
+        "edges": [],
+    }